@@ -0,0 +1,204 @@
+"""
+Hot/cold split of appointments
+
+Completed and cancelled appointments older than ARCHIVE_HORIZON_DAYS are
+moved from `appointments` to `appointments_archive` in batches of
+ARCHIVE_BATCH_SIZE, one short transaction per batch, so per-doctor and
+per-patient queries only walk recent rows. The archive has the same
+columns (plus `archived_at`) and the same ids, and its rows are read-only
+for the API. On SQLite `appointments` is an AUTOINCREMENT table (migration
+8), so ids of archived or deleted rows are never handed out again and
+cannot appear twice in the union below.
+
+The appointment endpoints read the hot table by default; with
+`?include_archived=true` they read `appointment_source(True)`, an alias of
+the Appointment model over UNION ALL of both tables, so filters, keyset
+pagination, ?expand= and columnar pages work unchanged.
+
+Moving a row keeps the dashboard counts (app/stats.py): the archive has
+its own counting triggers, so the delete from the hot table and the
+insert into the archive cancel out. It also has its own version counter
+in `table_versions` for the ETags of responses that include it.
+
+    python -m app.archive                   # ARCHIVE_* settings
+    python -m app.archive --horizon-days 730 --batch-size 5000
+    python -m app.archive --dry-run         # count only
+"""
+
+import argparse
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional
+
+from sqlalchemy import Column, DateTime, Index, MetaData, Table, delete, func, literal, select, text, union_all
+from sqlalchemy.orm import aliased
+from sqlalchemy.schema import CreateTable
+
+from app.config import archive_settings
+from app.database import engine
+from app.models.appointment import Appointment
+
+ARCHIVE_TABLE = "appointments_archive"
+
+metadata = MetaData()
+
+# Same columns as appointments, without defaults or foreign keys: rows arrive complete and outlive their patients
+appointments_archive = Table(
+    ARCHIVE_TABLE,
+    metadata,
+    *(Column(c.name, c.type, primary_key=c.primary_key) for c in Appointment.__table__.columns),
+    Column("archived_at", DateTime, nullable=False),
+    Index("ix_appointments_archive_doctor_id_date", "doctor_id", "appointment_date"),
+    Index("ix_appointments_archive_patient_id_date", "patient_id", "appointment_date"),
+    Index("ix_appointments_archive_appointment_date", "appointment_date"),
+)
+
+APPOINTMENT_COLUMNS = [c.name for c in Appointment.__table__.columns]
+
+
+def create_archive(conn):
+    """The archive table with its version counter and counting triggers"""
+    from app.conditional import table_versions
+    from app.stats import count_archived_appointments
+
+    metadata.create_all(conn)
+    if not conn.execute(select(table_versions.c.version).where(table_versions.c.table_name == ARCHIVE_TABLE)).first():
+        conn.execute(table_versions.insert().values(table_name=ARCHIVE_TABLE, version=0))
+
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        for operation in ("INSERT", "UPDATE", "DELETE"):
+            conn.execute(text(f"""
+                CREATE TRIGGER IF NOT EXISTS {ARCHIVE_TABLE}_version_{operation.lower()}
+                AFTER {operation} ON {ARCHIVE_TABLE} BEGIN
+                    UPDATE table_versions SET version = version + 1 WHERE table_name = '{ARCHIVE_TABLE}';
+                END
+            """))
+    elif dialect == "postgresql":
+        conn.execute(text(f"DROP TRIGGER IF EXISTS {ARCHIVE_TABLE}_version ON {ARCHIVE_TABLE}"))
+        conn.execute(text(f"""
+            CREATE TRIGGER {ARCHIVE_TABLE}_version AFTER INSERT OR UPDATE OR DELETE ON {ARCHIVE_TABLE}
+            FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version()
+        """))
+    count_archived_appointments(conn)
+
+
+def keep_appointment_ids_unique(conn):
+    """
+    SQLite reuses max(id) + 1 once the newest rows are gone, which would give
+    a new appointment the id of an archived one. Rebuild `appointments` as an
+    AUTOINCREMENT table (new databases get it from the model) and start its
+    sequence past every archived id. PostgreSQL sequences never go back.
+    """
+    if conn.dialect.name != "sqlite":
+        return
+    hot = Appointment.__table__
+    table_sql = conn.scalar(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'appointments'"))
+    if "AUTOINCREMENT" not in table_sql.upper():
+        # Indexes and triggers go with the old table; recreate them from their stored SQL
+        dependents = conn.execute(text(
+            "SELECT sql FROM sqlite_master WHERE tbl_name = 'appointments' AND type IN ('index', 'trigger') AND sql IS NOT NULL"
+        )).scalars().all()
+        columns = ", ".join(
+            name for name in (row[1] for row in conn.execute(text("PRAGMA table_info(appointments)")))
+            if name in hot.c
+        )
+        create = str(CreateTable(hot).compile(dialect=conn.dialect))
+        conn.execute(text(create.replace("CREATE TABLE appointments", "CREATE TABLE appointments_rebuilt", 1)))
+        conn.execute(text(f"INSERT INTO appointments_rebuilt ({columns}) SELECT {columns} FROM appointments"))
+        # Dropping a table does not fire its delete triggers: the dashboard counts stay as they are
+        conn.execute(text("DROP TABLE appointments"))
+        conn.execute(text("ALTER TABLE appointments_rebuilt RENAME TO appointments"))
+        for sql in dependents:
+            conn.execute(text(sql))
+    start = conn.scalar(select(func.max(appointments_archive.c.id)))
+    if start:
+        conn.execute(text("DELETE FROM sqlite_sequence WHERE name = 'appointments'"))
+        conn.execute(text(
+            "INSERT INTO sqlite_sequence (name, seq) SELECT 'appointments', max(:start, coalesce(max(id), 0)) FROM appointments"
+        ), {"start": start})
+
+
+def all_appointments():
+    """Hot and archived appointments as one subquery with the appointments columns"""
+    return union_all(
+        select(*(Appointment.__table__.c[name] for name in APPOINTMENT_COLUMNS)),
+        select(*(appointments_archive.c[name] for name in APPOINTMENT_COLUMNS)),
+    ).subquery("appointments_all")
+
+
+def appointment_source(include_archived: bool):
+    """The entity appointment queries select from: the model itself, or the model over both tables"""
+    return aliased(Appointment, all_appointments(), name="appointment") if include_archived else Appointment
+
+
+def archive_appointments(
+    bind=engine,
+    before: Optional[datetime] = None,
+    batch_size: int = archive_settings.batch_size,
+    statuses: List[str] = archive_settings.statuses,
+    progress: Optional[Callable[[int], None]] = None,
+) -> int:
+    """Move matching appointments older than `before` to the archive; returns how many were moved"""
+    if before is None:
+        before = datetime.now() - timedelta(days=archive_settings.horizon_days)
+    hot = Appointment.__table__
+    moved = 0
+    while True:
+        with bind.begin() as conn:
+            ids = conn.execute(
+                select(hot.c.id)
+                .where(hot.c.status.in_(statuses), hot.c.appointment_date < before)
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+            ).scalars().all()
+            if not ids:
+                break
+            conn.execute(appointments_archive.insert().from_select(
+                [*APPOINTMENT_COLUMNS, "archived_at"],
+                select(*(hot.c[name] for name in APPOINTMENT_COLUMNS), literal(datetime.utcnow(), DateTime))
+                .where(hot.c.id.in_(ids)),
+            ))
+            conn.execute(delete(hot).where(hot.c.id.in_(ids)))
+        moved += len(ids)
+        if progress:
+            progress(moved)
+        if len(ids) < batch_size:
+            break
+    return moved
+
+
+def count_candidates(bind=engine, before: Optional[datetime] = None, statuses: List[str] = archive_settings.statuses) -> int:
+    if before is None:
+        before = datetime.now() - timedelta(days=archive_settings.horizon_days)
+    hot = Appointment.__table__
+    with bind.connect() as conn:
+        return conn.scalar(
+            select(func.count()).where(hot.c.status.in_(statuses), hot.c.appointment_date < before)
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--horizon-days", type=int, default=archive_settings.horizon_days)
+    parser.add_argument("--batch-size", type=int, default=archive_settings.batch_size)
+    parser.add_argument("--dry-run", action="store_true", help="Only count the appointments that would move")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    before = datetime.now() - timedelta(days=args.horizon_days)
+    if args.dry_run:
+        print(f"Мұрағатқа көшетін тағайындар ({before:%Y-%m-%d} дейін): {count_candidates(engine, before)}")
+        return
+
+    started = time.perf_counter()
+    moved = archive_appointments(
+        engine, before, args.batch_size,
+        progress=lambda n: logging.info("Archived %s appointments", n),
+    )
+    print(f"Мұрағатқа көшірілді: {moved} тағайын ({before:%Y-%m-%d} дейін), {time.perf_counter() - started:.1f} с")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Free-slot computation for doctors
+
+Booked appointments are merged into a sorted, non-overlapping interval
+list; free time is the working-hours windows minus that list. Lookups use
+bisect, so a query over weeks of dense bookings stays O(log n + k).
+"""
+
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from typing import Collection, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import select
+
+from app.booking import MAX_APPOINTMENT_MINUTES
+from app.config import schedule_settings
+from app.models.appointment import Appointment
+
+Interval = Tuple[datetime, datetime]
+
+
+class IntervalSet:
+    """Sorted, merged set of half-open [start, end) busy intervals"""
+
+    def __init__(self, intervals: Iterable[Interval] = ()):
+        self.starts: List[datetime] = []
+        self.ends: List[datetime] = []
+        for start, end in sorted(intervals):
+            if self.ends and start <= self.ends[-1]:
+                self.ends[-1] = max(self.ends[-1], end)
+            else:
+                self.starts.append(start)
+                self.ends.append(end)
+
+    def add(self, start: datetime, end: datetime):
+        """Insert an interval, merging it with any neighbours it touches"""
+        lo = bisect_left(self.ends, start)
+        hi = lo
+        while hi < len(self.starts) and self.starts[hi] <= end:
+            start = min(start, self.starts[hi])
+            end = max(end, self.ends[hi])
+            hi += 1
+        self.starts[lo:hi] = [start]
+        self.ends[lo:hi] = [end]
+
+    def __len__(self):
+        return len(self.starts)
+
+    def overlaps(self, start: datetime, end: datetime) -> bool:
+        i = bisect_right(self.ends, start)
+        return i < len(self.starts) and self.starts[i] < end
+
+    def free(self, start: datetime, end: datetime) -> Iterator[Interval]:
+        """Gaps between busy intervals inside [start, end)"""
+        cursor = start
+        i = bisect_right(self.ends, start)
+        while i < len(self.starts) and self.starts[i] < end:
+            if self.starts[i] > cursor:
+                yield cursor, self.starts[i]
+            cursor = max(cursor, self.ends[i])
+            i += 1
+        if cursor < end:
+            yield cursor, end
+
+
+def working_windows(start: datetime, end: datetime, settings=schedule_settings) -> Iterator[Interval]:
+    """Working-hours windows clipped to [start, end)"""
+    day = start.date()
+    while day <= end.date():
+        if day.weekday() in settings.work_days:
+            window_start = max(start, datetime.combine(day, settings.work_start))
+            window_end = min(end, datetime.combine(day, settings.work_end))
+            if window_start < window_end:
+                yield window_start, window_end
+        day += timedelta(days=1)
+
+
+def _align(moment: datetime, step: timedelta) -> datetime:
+    """Round up to the next multiple of `step` since midnight"""
+    midnight = datetime.combine(moment.date(), datetime.min.time())
+    remainder = (moment - midnight) % step
+    return moment if not remainder else moment + (step - remainder)
+
+
+def free_slots(
+    busy: IntervalSet,
+    start: datetime,
+    end: datetime,
+    duration: timedelta,
+    limit: Optional[int] = None,
+    settings=schedule_settings,
+) -> Iterator[Interval]:
+    """Bookable [slot_start, slot_end) candidates, in time order, starting on the slot step grid"""
+    step = timedelta(minutes=settings.slot_step_minutes)
+    produced = 0
+    for window_start, window_end in working_windows(start, end, settings):
+        for gap_start, gap_end in busy.free(window_start, window_end):
+            slot_start = _align(gap_start, step)
+            while slot_start + duration <= gap_end:
+                yield slot_start, slot_start + duration
+                produced += 1
+                if limit is not None and produced >= limit:
+                    return
+                slot_start += step
+
+
+def first_free_slot(busy: IntervalSet, start: datetime, end: datetime, duration: timedelta) -> Optional[Interval]:
+    return next(free_slots(busy, start, end, duration, limit=1), None)
+
+
+def validate_range(start: datetime, end: datetime, settings=schedule_settings) -> Optional[str]:
+    """Return an error message for an unusable range, None when it is fine"""
+    if start >= end:
+        return "from мәні to мәнінен бұрын болуы керек"
+    if end - start > timedelta(days=settings.max_range_days):
+        return f"Аралық {settings.max_range_days} күннен аспауы керек"
+    return None
+
+
+async def load_busy(
+    db, doctor_ids: Collection[int], start: datetime, end: datetime, exclude_ids: Collection[int] = ()
+) -> Dict[int, IntervalSet]:
+    """
+    Busy intervals per doctor overlapping [start, end), read in one query
+    through the (doctor_id, appointment_date) index. Cancelled visits do
+    not block time; `exclude_ids` skips appointments being rescheduled.
+    """
+    lookback = start - timedelta(minutes=MAX_APPOINTMENT_MINUTES)
+    query = select(Appointment.doctor_id, Appointment.appointment_date, Appointment.duration_minutes).where(
+        Appointment.doctor_id.in_(doctor_ids),
+        Appointment.appointment_date >= lookback,
+        Appointment.appointment_date < end,
+        Appointment.status != "cancelled",
+    )
+    if exclude_ids:
+        query = query.where(Appointment.id.not_in(list(exclude_ids)))
+    result = await db.execute(query)
+    intervals: Dict[int, List[Interval]] = {doctor_id: [] for doctor_id in doctor_ids}
+    for doctor_id, appointment_date, duration_minutes in result:
+        intervals[doctor_id].append(
+            (appointment_date, appointment_date + timedelta(minutes=duration_minutes or 30))
+        )
+    return {doctor_id: IntervalSet(items) for doctor_id, items in intervals.items()}
+
+
+async def is_slot_taken(db, doctor_id: int, start: datetime, duration_minutes: int, exclude_id: Optional[int] = None) -> bool:
+    end = start + timedelta(minutes=duration_minutes or 30)
+    busy = await load_busy(db, [doctor_id], start, end, exclude_ids=[exclude_id] if exclude_id is not None else ())
+    return busy[doctor_id].overlaps(start, end)
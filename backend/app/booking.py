@@ -0,0 +1,63 @@
+"""
+Database-level guard against double-booking a doctor
+
+The routers check for overlaps before writing, but two concurrent requests
+can both pass that check. The guard below makes the database itself refuse
+the second write:
+
+- SQLite: BEFORE INSERT/UPDATE triggers on appointments. SQLite has a
+  single writer and the driver only opens the write transaction at the
+  INSERT/UPDATE, so the trigger always sees every committed booking.
+- PostgreSQL: an exclusion constraint over (doctor_id, time range).
+
+Cancelled appointments never conflict.
+"""
+
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+OVERLAP_ERROR = "appointment_overlap"
+
+# Longest booking the API accepts. The overlap checks (app/availability.py and
+# the SQLite trigger) only look back this far, and the trigger keeps the value
+# it was created with, so this is a constant rather than a setting.
+MAX_APPOINTMENT_MINUTES = 480
+
+_SQLITE_CONFLICT = f"""
+    SELECT RAISE(ABORT, '{OVERLAP_ERROR}')
+    WHERE NEW.status != 'cancelled' AND EXISTS (
+        SELECT 1 FROM appointments
+        WHERE doctor_id = NEW.doctor_id
+          AND id IS NOT NEW.id
+          AND status != 'cancelled'
+          AND appointment_date > strftime('%Y-%m-%d %H:%M:%f', NEW.appointment_date, '-{MAX_APPOINTMENT_MINUTES} minutes')
+          AND appointment_date < strftime('%Y-%m-%d %H:%M:%f', NEW.appointment_date, '+' || coalesce(NEW.duration_minutes, 30) || ' minutes')
+          AND strftime('%Y-%m-%d %H:%M:%f', appointment_date, '+' || coalesce(duration_minutes, 30) || ' minutes') > NEW.appointment_date
+    );
+"""
+
+
+def create_overlap_guard(conn):
+    if conn.dialect.name == "sqlite":
+        conn.execute(text(f"""
+            CREATE TRIGGER IF NOT EXISTS appointments_no_overlap_insert
+            BEFORE INSERT ON appointments BEGIN {_SQLITE_CONFLICT} END
+        """))
+        conn.execute(text(f"""
+            CREATE TRIGGER IF NOT EXISTS appointments_no_overlap_update
+            BEFORE UPDATE OF doctor_id, appointment_date, duration_minutes, status ON appointments
+            BEGIN {_SQLITE_CONFLICT} END
+        """))
+    elif conn.dialect.name == "postgresql":
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS btree_gist"))
+        conn.execute(text(f"""
+            ALTER TABLE appointments ADD CONSTRAINT {OVERLAP_ERROR}
+            EXCLUDE USING gist (
+                doctor_id WITH =,
+                tsrange(appointment_date, appointment_date + coalesce(duration_minutes, 30) * interval '1 minute') WITH &&
+            ) WHERE (status <> 'cancelled')
+        """))
+
+
+def is_overlap_error(error: Exception) -> bool:
+    return isinstance(error, IntegrityError) and OVERLAP_ERROR in str(error.orig)
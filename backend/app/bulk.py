@@ -0,0 +1,125 @@
+"""
+Helpers for the batch create/update endpoints
+
+Every router validates the whole batch first (schema, foreign keys,
+uniqueness) using set-based queries, then writes all accepted rows with a
+single executemany in one transaction. Rejected items are reported per
+index; they never abort the rest of the batch.
+"""
+
+from typing import Any, Dict, Iterable, List, Set, Tuple, Type
+
+from fastapi import HTTPException
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import insert, select, update
+
+from app.schemas.bulk import BulkItemResult, BulkResult
+
+BULK_MAX_ITEMS = 5000
+
+# Returned when a concurrent writer invalidated the batch between validation and insert
+BATCH_CONFLICT = "Топтама басқа өзгерістермен қайшылыққа түсті, қайталап көріңіз"
+
+# Keeps IN (...) lists below the SQLite bound-parameter limit
+IN_CHUNK_SIZE = 500
+
+
+class BulkReport:
+    """Collects the outcome of each batch item by its position in the request"""
+
+    def __init__(self, size: int):
+        self.results: Dict[int, BulkItemResult] = {}
+        self.size = size
+
+    def fail(self, index: int, error: str):
+        self.results[index] = BulkItemResult(index=index, success=False, error=error)
+
+    def ok(self, index: int, id: int):
+        self.results[index] = BulkItemResult(index=index, success=True, id=id)
+
+    def failed(self, index: int) -> bool:
+        return index in self.results and not self.results[index].success
+
+    def build(self) -> BulkResult:
+        results = [self.results[i] for i in sorted(self.results)]
+        succeeded = sum(1 for r in results if r.success)
+        return BulkResult(succeeded=succeeded, failed=len(results) - succeeded, results=results)
+
+
+def validate_batch(items: List[Any], schema: Type[BaseModel], report: BulkReport) -> List[Tuple[int, BaseModel]]:
+    """Validate every item against `schema`; invalid ones are recorded in the report"""
+    if len(items) > BULK_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Топтама {BULK_MAX_ITEMS} жазбадан аспауы керек")
+    valid = []
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, schema.model_validate(item)))
+        except ValidationError as e:
+            report.fail(index, validation_message(e))
+    return valid
+
+
+def validation_message(error: ValidationError) -> str:
+    """One line per pydantic error: "field: message", joined with semicolons"""
+    return "; ".join(
+        ": ".join(filter(None, (".".join(str(p) for p in err["loc"]), err["msg"])))
+        for err in error.errors()
+    )
+
+
+def first_occurrence(valid: List[Tuple[int, BaseModel]], key, report: BulkReport, error: str):
+    """Reject items whose `key` repeats an earlier item of the same batch"""
+    seen: Set[Any] = set()
+    for index, item in valid:
+        value = key(item)
+        if value is None or report.failed(index):
+            continue
+        if value in seen:
+            report.fail(index, error)
+        seen.add(value)
+
+
+async def existing_values(db, column, values: Iterable[Any]) -> Set[Any]:
+    """Which of `values` are already present in `column`, in a few IN queries"""
+    values = list({v for v in values if v is not None})
+    found: Set[Any] = set()
+    for offset in range(0, len(values), IN_CHUNK_SIZE):
+        chunk = values[offset:offset + IN_CHUNK_SIZE]
+        found.update(await db.scalars(select(column).where(column.in_(chunk))))
+    return found
+
+
+async def insert_many(db, model, rows: List[Dict[str, Any]]) -> List[int]:
+    """executemany INSERT returning the new ids in parameter order"""
+    if not rows:
+        return []
+    result = await db.execute(
+        insert(model).returning(model.id, sort_by_parameter_order=True), rows
+    )
+    return list(result.scalars())
+
+
+async def update_many(db, model, rows: List[Dict[str, Any]]):
+    """executemany UPDATE ... WHERE id = :id; every row must carry its primary key"""
+    # Group by column set so each executemany has a uniform statement
+    groups: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+    for row in rows:
+        groups.setdefault(tuple(sorted(row)), []).append(row)
+    for group in groups.values():
+        await db.execute(update(model), group)
+
+
+def update_fields(item: BaseModel) -> Dict[str, Any]:
+    """Fields explicitly sent for an update item, without its id"""
+    data = item.model_dump(exclude_unset=True)
+    data.pop("id", None)
+    return data
+
+
+async def check_update_targets(db, model, valid: List[Tuple[int, BaseModel]], report: BulkReport, not_found: str):
+    """Reject update items whose id is repeated in the batch or does not exist"""
+    first_occurrence(valid, lambda item: item.id, report, "Бұл жазба топтамада қайталанады")
+    present = await existing_values(db, model.id, (item.id for _, item in valid))
+    for index, item in valid:
+        if not report.failed(index) and item.id not in present:
+            report.fail(index, not_found)
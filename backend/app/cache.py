@@ -0,0 +1,156 @@
+"""
+Read-through cache for reference data
+
+Services and doctors change a few times a day but are read constantly.
+Read handlers go through `cache.get_or_load(key, loader)`; write handlers
+invalidate exactly the keys they affect once their transaction has
+committed. Cached values are plain JSON-compatible data, so any
+CacheBackend (the in-process LRU by default, or a wrapper around a
+Redis-compatible client) can store them.
+"""
+
+import importlib
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional
+
+from app.config import cache_settings
+
+# Returned by CacheBackend.get for absent or expired keys (None is a valid value)
+MISSING = object()
+
+
+class CacheBackend(ABC):
+    """Key/value storage with per-key TTL; implement this to plug in another store"""
+
+    name = "custom"
+
+    @abstractmethod
+    def get(self, key: str) -> Any:
+        """Stored value, or MISSING"""
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: float):
+        ...
+
+    @abstractmethod
+    def delete(self, *keys: str):
+        ...
+
+    @abstractmethod
+    def clear(self):
+        ...
+
+    def stats(self) -> dict:
+        return {}
+
+
+class MemoryBackend(CacheBackend):
+    """Per-process LRU dict; entries expire after their TTL and the oldest are evicted past max_entries"""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISSING
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {"size": len(self._entries), "max_entries": self.max_entries, "evictions": self.evictions}
+
+
+class Cache:
+    """Read-through front of a backend, with hit/miss counters"""
+
+    def __init__(self, backend: CacheBackend, ttl: float, enabled: bool = True):
+        self.backend = backend
+        self.ttl = ttl
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        # Bumped on every invalidation so a load that raced with a write is not stored
+        self._generation = 0
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]], ttl: Optional[float] = None) -> Any:
+        """Cached value of `key`, or the loader's result (stored unless it is None)"""
+        if not self.enabled:
+            return await loader()
+        value = self.backend.get(key)
+        if value is not MISSING:
+            self.hits += 1
+            return value
+        self.misses += 1
+        generation = self._generation
+        value = await loader()
+        if value is not None and generation == self._generation:
+            self.backend.set(key, value, self.ttl if ttl is None else ttl)
+        return value
+
+    def has(self, key: str) -> bool:
+        """Whether get_or_load would answer `key` without calling its loader"""
+        return self.enabled and self.backend.get(key) is not MISSING
+
+    def invalidate(self, *keys: str):
+        self._generation += 1
+        self.invalidations += len(keys)
+        self.backend.delete(*keys)
+
+    def clear(self):
+        self._generation += 1
+        self.backend.clear()
+
+    def snapshot(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "backend": self.backend.name,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "invalidations": self.invalidations,
+            **self.backend.stats(),
+        }
+
+
+def build_backend(settings=cache_settings) -> CacheBackend:
+    if settings.backend == "memory":
+        return MemoryBackend(settings.max_entries)
+    module, _, name = settings.backend.partition(":")
+    return getattr(importlib.import_module(module), name)()
+
+
+cache = Cache(build_backend(), cache_settings.ttl_seconds, cache_settings.enabled)
@@ -0,0 +1,77 @@
+"""
+Columnar list responses (?format=columnar, or MessagePack via Accept)
+
+A JSON list repeats every key once per row; a columnar page names each
+column once and carries its values as one array:
+
+    {"count": 2, "columns": {"id": [1, 2], "status": ["scheduled", "completed"], ...}}
+
+Pages are built straight from the row tuples of a Core select, with no
+ORM instances and no Pydantic models, then encoded by orjson, or by
+msgpack when the client sends `Accept: application/msgpack` (datetimes
+as ISO 8601 strings in both). msgpack is optional (`pip install msgpack`);
+without it such clients get the regular JSON response.
+"""
+
+from datetime import date, datetime
+from typing import List, Optional, Sequence
+
+import orjson
+from fastapi import Request, Response
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+
+MEDIA_TYPES = {
+    "json": "application/json",
+    "msgpack": MSGPACK_MEDIA_TYPES[0],
+}
+
+# ETag suffix per encoding: one URL has several representations, and a cached copy must not match another
+ETAG_VARIANTS = {None: "", "json": "columnar", "msgpack": "msgpack"}
+
+
+def columnar_encoding(request: Request, response: Response, fmt: Optional[str]) -> Optional[str]:
+    """
+    "msgpack", "json" or None for the regular row-per-object response. Call
+    it before the conditional check, so 304 responses carry Vary too
+    """
+    # The same URL has a MessagePack representation
+    response.headers["Vary"] = "Accept"
+    accept = request.headers.get("accept", "")
+    if msgpack is not None and any(media_type in accept for media_type in MSGPACK_MEDIA_TYPES):
+        return "msgpack"
+    if fmt == "columnar":
+        return "json"
+    return None
+
+
+def _msgpack_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def columnar_page(columns: List[str], rows: Sequence[tuple], **extra) -> dict:
+    values = list(zip(*rows)) if rows else [()] * len(columns)
+    return {"count": len(rows), "columns": {name: list(column) for name, column in zip(columns, values)}, **extra}
+
+
+def columnar_response(
+    columns: List[str], rows: Sequence[tuple], encoding: str, response: Response, **extra
+) -> Response:
+    """
+    `rows` as a columnar page; `extra` keys (e.g. next_cursor) are added to
+    the top level. Headers already set on the handler's `response` (ETag,
+    Vary) are carried over
+    """
+    page = columnar_page(columns, rows, **extra)
+    if encoding == "msgpack":
+        body = msgpack.packb(page, default=_msgpack_default)
+    else:
+        body = orjson.dumps(page)
+    return Response(body, media_type=MEDIA_TYPES[encoding], headers=dict(response.headers))
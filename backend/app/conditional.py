@@ -0,0 +1,174 @@
+"""
+Conditional GET support (weak ETags, Last-Modified, 304 Not Modified)
+
+Each versioned table has a counter in `table_versions` that triggers bump
+on every insert, update and delete (per row on SQLite, per statement on
+PostgreSQL). A list ETag therefore costs one small primary-key lookup,
+whatever the table size, and catches deletes that max(updated_at) would
+miss. Detail ETags and Last-Modified come from the row's `updated_at`,
+which a conditional request reads on its own before the full row. The
+check runs before the real query and serialization, so a client whose
+copy is current gets an empty 304.
+
+The counter update is transactional: readers never see a new version
+before the data it describes. On PostgreSQL it does serialize concurrent
+writers of the same table on that counter row until commit.
+"""
+
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Iterable, Optional, Union
+
+from fastapi import Request, Response
+from sqlalchemy import Column, Integer, MetaData, String, Table, inspect, select, text
+
+VERSIONED_TABLES = ("doctors", "patients", "appointments", "services")
+
+table_versions = Table(
+    "table_versions",
+    MetaData(),
+    Column("table_name", String, primary_key=True),
+    Column("version", Integer, nullable=False),
+)
+
+
+def create_version_tracking(conn):
+    """Add `updated_at` where it is missing, then the version counters and their triggers"""
+    dialect = conn.dialect.name
+    inspector = inspect(conn)
+    for table in VERSIONED_TABLES:
+        if "updated_at" in {c["name"] for c in inspector.get_columns(table)}:
+            continue
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN updated_at {'TIMESTAMP' if dialect == 'postgresql' else 'DATETIME'}"))
+        backfill = "coalesce(created_at, CURRENT_TIMESTAMP)" if table == "appointments" else "CURRENT_TIMESTAMP"
+        conn.execute(text(f"UPDATE {table} SET updated_at = {backfill}"))
+
+    table_versions.create(conn, checkfirst=True)
+    present = set(conn.execute(select(table_versions.c.table_name)).scalars())
+    missing = [{"table_name": t, "version": 0} for t in VERSIONED_TABLES if t not in present]
+    if missing:
+        conn.execute(table_versions.insert(), missing)
+
+    if dialect == "sqlite":
+        for table in VERSIONED_TABLES:
+            for operation in ("INSERT", "UPDATE", "DELETE"):
+                conn.execute(text(f"""
+                    CREATE TRIGGER IF NOT EXISTS {table}_version_{operation.lower()}
+                    AFTER {operation} ON {table} BEGIN
+                        UPDATE table_versions SET version = version + 1 WHERE table_name = '{table}';
+                    END
+                """))
+    elif dialect == "postgresql":
+        conn.execute(text("""
+            CREATE OR REPLACE FUNCTION bump_table_version() RETURNS trigger AS $$
+            BEGIN
+                UPDATE table_versions SET version = version + 1 WHERE table_name = TG_TABLE_NAME;
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql
+        """))
+        for table in VERSIONED_TABLES:
+            conn.execute(text(f"DROP TRIGGER IF EXISTS {table}_version ON {table}"))
+            conn.execute(text(f"""
+                CREATE TRIGGER {table}_version AFTER INSERT OR UPDATE OR DELETE ON {table}
+                FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version()
+            """))
+
+
+async def load_versions(db, tables: Iterable[str]) -> Dict[str, int]:
+    tables = list(tables)
+    result = await db.execute(
+        select(table_versions.c.table_name, table_versions.c.version).where(table_versions.c.table_name.in_(tables))
+    )
+    versions = dict(result.all())
+    return {table: versions.get(table, 0) for table in tables}
+
+
+def versions_etag(versions: Dict[str, int], variant: str = "") -> str:
+    """`variant` tells apart responses that depend on more than the tables (a day, an encoding)"""
+    tag = "-".join(f"{table}.{version}" for table, version in versions.items())
+    return f'W/"{tag}-{variant}"' if variant else f'W/"{tag}"'
+
+
+def row_etag(table: str, row_id: int, updated_at: Optional[datetime]) -> str:
+    return f'W/"{table}/{row_id}@{updated_at.isoformat() if updated_at else 0}"'
+
+
+def _http_date(moment: datetime) -> str:
+    return format_datetime(moment.replace(microsecond=0, tzinfo=timezone.utc), usegmt=True)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """Weak comparison against an If-None-Match list"""
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in header.split(","))
+
+
+def _not_modified_since(header: str, last_modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified.replace(microsecond=0, tzinfo=timezone.utc) <= since
+
+
+def not_modified(
+    request: Request, response: Response, etag: str, last_modified: Optional[datetime] = None
+) -> Optional[Response]:
+    """
+    Put the validators on `response`; return a bodiless 304 when the client's
+    copy is current. If-None-Match takes precedence over If-Modified-Since.
+    Timestamps are naive UTC, as stored by the models.
+    """
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = _http_date(last_modified)
+
+    if_none_match = request.headers.get("if-none-match")
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_none_match is not None:
+        fresh = _etag_matches(if_none_match, etag)
+    else:
+        fresh = bool(last_modified and if_modified_since and _not_modified_since(if_modified_since, last_modified))
+
+    if fresh:
+        # A 304 must repeat the Vary of the full response
+        if "vary" in response.headers:
+            headers["Vary"] = response.headers["vary"]
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
+async def check_tables(request: Request, response: Response, db, *tables: str, variant: str = "") -> Optional[Response]:
+    """Conditional check for a response built from whole tables (lists, exports)"""
+    return not_modified(request, response, versions_etag(await load_versions(db, tables), variant))
+
+
+def check_row(
+    request: Request, response: Response, table: str, row_id: int, updated_at: Union[datetime, str, None]
+) -> Optional[Response]:
+    """Conditional check for a single-row response"""
+    if isinstance(updated_at, str):
+        updated_at = datetime.fromisoformat(updated_at)
+    return not_modified(request, response, row_etag(table, row_id, updated_at), updated_at)
+
+
+async def check_stored_row(request: Request, response: Response, db, table: str, row_id: int, *sources) -> Optional[Response]:
+    """
+    Conditional check before a detail endpoint loads its row: selects only
+    `updated_at` by primary key from the first of `sources` holding the row,
+    and only when the request carries a validator. None means the full row
+    has to be loaded (and passed to check_row as usual).
+    """
+    if "if-none-match" not in request.headers and "if-modified-since" not in request.headers:
+        return None
+    for source in sources:
+        found = (await db.execute(select(source.updated_at).where(source.id == row_id))).first()
+        if found is not None:
+            return check_row(request, response, table, row_id, found[0])
+    return None
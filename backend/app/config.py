@@ -0,0 +1,235 @@
+from datetime import time
+from typing import Dict, List, Optional
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+# Per-backend engine defaults; any DB_* environment variable overrides them
+ENGINE_PRESETS = {
+    "sqlite": {
+        "pool_size": 5,
+        "max_overflow": 10,
+        "pool_timeout": 30.0,
+        "pool_recycle": -1,
+        "pool_pre_ping": False,
+    },
+    "postgresql": {
+        "pool_size": 10,
+        "max_overflow": 20,
+        "pool_timeout": 30.0,
+        "pool_recycle": 1800,
+        "pool_pre_ping": True,
+    },
+}
+
+
+class DatabaseSettings(BaseSettings):
+    """Engine and connection pool settings (read from DB_* environment variables)"""
+
+    model_config = SettingsConfigDict(env_prefix="DB_", env_file=".env", extra="ignore")
+
+    # Pool (None = use the backend preset)
+    pool_size: Optional[int] = None
+    max_overflow: Optional[int] = None
+    pool_timeout: Optional[float] = None
+    pool_recycle: Optional[int] = None
+    pool_pre_ping: Optional[bool] = None
+    echo: bool = False
+
+    # SQLite pragmas applied to every new connection
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_cache_size_kib: int = 65536
+    sqlite_mmap_size: int = 268435456
+
+    def engine_options(self, backend: str) -> dict:
+        """Pool options for a backend: the preset with explicit settings applied on top"""
+        options = dict(ENGINE_PRESETS.get(backend, ENGINE_PRESETS["postgresql"]))
+        for key in options:
+            value = getattr(self, key)
+            if value is not None:
+                options[key] = value
+        options["echo"] = self.echo
+        return options
+
+    def sqlite_pragmas(self) -> dict:
+        return {
+            "journal_mode": self.sqlite_journal_mode,
+            "synchronous": self.sqlite_synchronous,
+            "busy_timeout": self.sqlite_busy_timeout_ms,
+            # Negative cache_size is interpreted by SQLite as KiB
+            "cache_size": -self.sqlite_cache_size_kib,
+            "mmap_size": self.sqlite_mmap_size,
+        }
+
+
+db_settings = DatabaseSettings()
+
+
+class ScheduleSettings(BaseSettings):
+    """Doctor working hours used for availability (read from SCHEDULE_* environment variables)"""
+
+    model_config = SettingsConfigDict(env_prefix="SCHEDULE_", env_file=".env", extra="ignore")
+
+    work_start: time = time(9, 0)
+    work_end: time = time(18, 0)
+    # Monday = 0 ... Sunday = 6
+    work_days: List[int] = [0, 1, 2, 3, 4]
+    slot_step_minutes: int = 15
+    max_range_days: int = 62
+
+
+schedule_settings = ScheduleSettings()
+
+
+class CacheSettings(BaseSettings):
+    """Read-through cache for reference data (read from CACHE_* environment variables)"""
+
+    model_config = SettingsConfigDict(env_prefix="CACHE_", env_file=".env", extra="ignore")
+
+    enabled: bool = True
+    # "memory" or "package.module:ClassName" of a CacheBackend implementation
+    backend: str = "memory"
+    ttl_seconds: float = 300.0
+    max_entries: int = 1024
+
+
+cache_settings = CacheSettings()
+
+
+class ResponseSettings(BaseSettings):
+    """Response compression (read from RESPONSE_* environment variables)"""
+
+    model_config = SettingsConfigDict(env_prefix="RESPONSE_", env_file=".env", extra="ignore")
+
+    gzip_enabled: bool = True
+    # Bodies smaller than this are sent as is; gzip costs more than it saves on them
+    gzip_minimum_size: int = 1024
+    # 1 (fastest) .. 9 (smallest); past 5 the size barely improves on JSON
+    gzip_level: int = 5
+
+
+response_settings = ResponseSettings()
+
+
+class MetricsSettings(BaseSettings):
+    """Prometheus metrics at /metrics (read from METRICS_* environment variables)"""
+
+    model_config = SettingsConfigDict(env_prefix="METRICS_", env_file=".env", extra="ignore")
+
+    enabled: bool = True
+
+
+metrics_settings = MetricsSettings()
+
+
+class ProfilerSettings(BaseSettings):
+    """Opt-in slow-query profiler (read from PROFILER_* environment variables)"""
+
+    model_config = SettingsConfigDict(env_prefix="PROFILER_", env_file=".env", extra="ignore")
+
+    enabled: bool = False
+    threshold_ms: float = 100.0
+    # Slow statements kept for /api/debug/slow-queries (oldest dropped first)
+    buffer_size: int = 200
+    # PostgreSQL only: EXPLAIN ANALYZE slow SELECTs (runs them once more)
+    explain_analyze: bool = True
+
+
+profiler_settings = ProfilerSettings()
+
+
+class LogSettings(BaseSettings):
+    """Application logging (read from LOG_* environment variables)"""
+
+    model_config = SettingsConfigDict(env_prefix="LOG_", env_file=".env", extra="ignore")
+
+    level: str = "INFO"
+    # "json" (one object per line) or "text"
+    format: str = "json"
+    # Log file; stderr when unset
+    file: Optional[str] = None
+    # Records waiting for the writer thread; when full, new records are dropped and counted
+    queue_size: int = 10000
+    # How often the writer thread drains the queue
+    flush_interval_ms: int = 100
+    # One record per request with status and duration
+    access_log: bool = True
+    # Share of successful requests whose INFO records (and access record) are kept;
+    # warnings, errors and responses with status >= 400 are always kept
+    success_sample_rate: float = 0.1
+    # Methods success_sample_rate applies to; writes keep every record (their audit lines)
+    sampled_methods: List[str] = ["GET", "HEAD"]
+    # Per-route overrides, keyed "METHOD /route/template", e.g. {"GET /api/patients/": 0.01}
+    route_sample_rates: Dict[str, float] = {}
+    # Stop collecting caller (file, line, function), thread and process details on every record.
+    # Process-wide: applies to all loggers, third-party ones included
+    skip_record_details: bool = False
+
+
+log_settings = LogSettings()
+
+
+class StartupSettings(BaseSettings):
+    """Application startup (read from STARTUP_* environment variables)"""
+
+    model_config = SettingsConfigDict(env_prefix="STARTUP_", env_file=".env", extra="ignore")
+
+    # Create tables and apply pending migrations in the lifespan hook; otherwise run `python -m app.migrations`
+    migrate: bool = False
+    # Import each API router on the first request under its prefix instead of when app.main is imported
+    lazy_routers: bool = False
+
+
+startup_settings = StartupSettings()
+
+
+class ReplicaSettings(BaseSettings):
+    """Read-replica routing for GET endpoints (read from REPLICA_* environment variables)"""
+
+    model_config = SettingsConfigDict(env_prefix="REPLICA_", env_file=".env", extra="ignore")
+
+    # After a write the client's reads compare replica table versions with the versions it wrote,
+    # and go to the primary while the replica is behind; past this window the replica is trusted
+    read_your_writes_seconds: int = 60
+    # Cookie (and X-Read-After header) carrying the primary's table versions after the client's last write
+    cookie_name: str = "read_after"
+
+
+replica_settings = ReplicaSettings()
+
+
+class ArchiveSettings(BaseSettings):
+    """Archival of old appointments (read from ARCHIVE_* environment variables)"""
+
+    model_config = SettingsConfigDict(env_prefix="ARCHIVE_", env_file=".env", extra="ignore")
+
+    # Appointments older than this many days, with one of `statuses`, move to appointments_archive
+    horizon_days: int = 365
+    # Rows moved per transaction; each batch holds the write lock only briefly
+    batch_size: int = 1000
+    statuses: List[str] = ["completed", "cancelled"]
+
+
+archive_settings = ArchiveSettings()
+
+
+class IdempotencySettings(BaseSettings):
+    """Idempotency-Key support for POST endpoints (read from IDEMPOTENCY_* environment variables)"""
+
+    model_config = SettingsConfigDict(env_prefix="IDEMPOTENCY_", env_file=".env", extra="ignore")
+
+    enabled: bool = True
+    # How long a completed request's response is replayed for its key
+    ttl_hours: float = 24.0
+    # The owner of a running claim renews it every lock_seconds / 3; a claim not renewed for this
+    # long belongs to a dead worker and can be taken over
+    lock_seconds: float = 60.0
+    # How long a duplicate waits for the first request before answering 409
+    wait_seconds: float = 30.0
+    # Poll interval while the first request runs in another worker
+    poll_interval_ms: int = 50
+    # Expired keys are deleted at most this often, by the next request that claims a key
+    purge_interval_seconds: int = 300
+
+
+idempotency_settings = IdempotencySettings()
@@ -1,29 +1,160 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from dotenv import load_dotenv
 import os
+import time
+
+from app.config import db_settings
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./medical_center.db")
 
-# Create engine
+# Async drivers used for each sync dialect when ASYNC_DATABASE_URL is not set
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
+
+
+def to_async_url(url: str) -> str:
+    """Map a sync database URL onto its async driver (aiosqlite / asyncpg)"""
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.drivername)
+    if driver is None:
+        return url
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", to_async_url(DATABASE_URL))
+
+# Optional read replica for GET endpoints (app/replica.py); unset means every read goes to the primary
+READ_DATABASE_URL = os.getenv("READ_DATABASE_URL")
+ASYNC_READ_DATABASE_URL = os.getenv(
+    "ASYNC_READ_DATABASE_URL", to_async_url(READ_DATABASE_URL) if READ_DATABASE_URL else None
+)
+
+
+def engine_kwargs(url: str) -> dict:
+    """Engine options for a URL, taken from the backend preset and DB_* settings"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    options = db_settings.engine_options(backend)
+    if backend == "sqlite" and parsed.database in (None, "", ":memory:"):
+        # In-memory SQLite uses a single static connection, pool sizing does not apply
+        return {"echo": options["echo"]}
+    if parsed.drivername == "sqlite+aiosqlite":
+        # aiosqlite defaults to NullPool; keep connections (and their pragmas) around instead
+        options["poolclass"] = AsyncAdaptedQueuePool
+    return options
+
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for pragma, value in db_settings.sqlite_pragmas().items():
+        cursor.execute(f"PRAGMA {pragma}={value}")
+    cursor.close()
+
+
+# Create engine (used by scripts and schema creation)
 engine = create_engine(
-    DATABASE_URL, 
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
+    DATABASE_URL,
+    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {},
+    **engine_kwargs(DATABASE_URL)
+)
+
+# Create async engine (used by the API routers)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_kwargs(ASYNC_DATABASE_URL))
+
+for _engine in (engine, async_engine.sync_engine):
+    if _engine.dialect.name == "sqlite":
+        event.listen(_engine, "connect", apply_sqlite_pragmas)
+
+
+# Read-only engine for the replica; writes on it fail instead of diverging from the primary
+read_async_engine = (
+    create_async_engine(ASYNC_READ_DATABASE_URL, **engine_kwargs(ASYNC_READ_DATABASE_URL))
+    if ASYNC_READ_DATABASE_URL else None
 )
 
-# Create session factory
+READ_ONLY_STATEMENTS = {
+    "sqlite": "PRAGMA query_only=ON",
+    "postgresql": "SET SESSION CHARACTERISTICS AS TRANSACTION READ ONLY",
+}
+
+if read_async_engine is not None:
+    _read_only = READ_ONLY_STATEMENTS.get(read_async_engine.dialect.name)
+
+    @event.listens_for(read_async_engine.sync_engine, "connect")
+    def make_read_only(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if read_async_engine.dialect.name == "sqlite":
+            for pragma, value in db_settings.sqlite_pragmas().items():
+                cursor.execute(f"PRAGMA {pragma}={value}")
+        if _read_only:
+            cursor.execute(_read_only)
+        cursor.close()
+
+
+class PoolStats:
+    """Connection acquisition counters for the async engine pool"""
+
+    def __init__(self):
+        self.acquired = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, wait: float):
+        self.acquired += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+    def snapshot(self) -> dict:
+        pool = async_engine.pool
+        stats = {
+            "pool_class": type(pool).__name__,
+            "acquired": self.acquired,
+            "timeouts": self.timeouts,
+            "avg_wait_ms": round(self.total_wait / self.acquired * 1000, 3) if self.acquired else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 3),
+        }
+        # Only queue-style pools report sizing
+        for name in ("size", "checkedin", "checkedout", "overflow"):
+            if hasattr(pool, name):
+                stats[name] = getattr(pool, name)()
+        return stats
+
+
+pool_stats = PoolStats()
+
+# Create session factories
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+ReadSessionLocal = (
+    async_sessionmaker(read_async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+    if read_async_engine is not None else None
+)
 
 # Create base class for models
 Base = declarative_base()
 
 # Dependency
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
+        started = time.perf_counter()
+        try:
+            await db.connection()
+        except PoolTimeoutError:
+            pool_stats.timeouts += 1
+            raise
+        pool_stats.record(time.perf_counter() - started)
         yield db
-    finally:
-        db.close()
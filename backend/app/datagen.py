@@ -0,0 +1,325 @@
+"""
+Deterministic synthetic data for sizing and benchmarks
+
+Generates doctors, patients, services and appointments with realistic
+distributions: weighted specializations, patient ages, a minority of
+frequent visitors, completed/cancelled history and scheduled future
+visits. Each doctor's working day (SCHEDULE_* settings) is laid out
+without overlaps, so the booking guard accepts every row. The same
+arguments (including --as-of) always produce the same rows and ids.
+
+Rows are inserted through Core executemany in chunks. On a database
+without tables, the search indexes, triggers and the overlap guard are
+created by the migrations after the load, which is what makes millions
+of rows take minutes; an existing database is cleared first and loaded
+with its triggers in place.
+
+    python -m app.datagen --doctors 1000 --patients 1000000 --appointments-per-day 8 --days 365 --seed 42
+"""
+
+import random
+import sys
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import inspect, text
+
+from app.config import schedule_settings
+
+DATAGEN_CHUNK_SIZE = 10000
+
+SPECIALIZATIONS = [
+    ("Терапевт", 25), ("Педиатр", 15), ("Кардиолог", 10), ("Гинеколог", 8), ("Невролог", 8),
+    ("Ортопед", 8), ("Хирург", 7), ("Окулист", 7), ("ЛОР", 6), ("Дерматолог", 6),
+]
+FIRST_NAMES = [
+    "Нұрлан", "Айнара", "Барлас", "Гүлнар", "Ерсултан", "Айгерім", "Дамир", "Асель", "Ержан", "Динара",
+    "Арман", "Жанар", "Бауыржан", "Мәдина", "Серік", "Әсем", "Қайрат", "Аружан", "Тимур", "Сабина",
+]
+LAST_NAMES = [
+    "Сәрсембаев", "Досова", "Кәрім", "Әлеуова", "Қоңғырбаев", "Ахметов", "Смагулова", "Жұмабаев",
+    "Оспанова", "Нұрғалиев", "Бекова", "Тоқтаров", "Исаева", "Сейітов", "Мұратова", "Омаров",
+]
+CITIES = ["Алматы қ.", "Астана қ.", "Шымкент қ.", "Қарағанды қ.", "Ақтөбе қ.", "Павлодар қ."]
+STREETS = ["Абай даңғылы", "Достық даңғылы", "Сәтпаев көшесі", "Төле би көшесі", "Жібек жолы", "Назарбаев даңғылы"]
+CONDITIONS = [
+    "Артериялық гипертензия", "Қант диабеті 2 типі", "Бронх демікпесі", "Созылмалы гастрит",
+    "Остеохондроз", "Жүректің ишемиялық ауруы", "Гипотиреоз", "Аллергиялық ринит",
+]
+ALLERGIES = ["Пенициллин", "Аспирин", "Шаң", "Гүл тозаңы", "Цитрус", "Йод"]
+NOTES = ["Жоспарлы тексеру", "Қайта қабылдау", "Анализ нәтижелері", "Шағым: бас ауруы", "Рецепт ұзарту"]
+# (name, description, price, minutes)
+SERVICE_CATALOGUE = [
+    ("Терапевт кеңесі", "Бастапқы қабылдау және тексеру", 6000, 30),
+    ("Кардиолог кеңесі", "Жүрек-қантамыр жүйесін тексеру", 9000, 30),
+    ("ЭКГ", "Электрокардиография, қорытындымен", 4000, 15),
+    ("Жүрек УЗИ", "Эхокардиография", 15000, 30),
+    ("Құрсақ қуысының УЗИ", "Бауыр, өт қабы, ұйқы безі, көкбауыр", 12000, 30),
+    ("Қалқанша без УЗИ", "Ультрадыбыстық зерттеу", 8000, 20),
+    ("Рентген", "Кеуде қуысының рентгенографиясы", 8000, 15),
+    ("МРТ", "Магниттік-резонанстық томография", 45000, 60),
+    ("КТ", "Компьютерлік томография", 35000, 45),
+    ("Жалпы қан анализі", "Қанның толық талдауы", 2500, 10),
+    ("Биохимиялық анализ", "Негізгі 12 көрсеткіш", 7000, 10),
+    ("Невролог кеңесі", "Неврологиялық тексеру", 9000, 30),
+    ("Окулист кеңесі", "Көру өткірлігі мен көз түбін тексеру", 7000, 30),
+    ("ЛОР кеңесі", "Құлақ, тамақ, мұрын тексеру", 7000, 30),
+    ("Дерматолог кеңесі", "Тері мен тырнақ тексеру", 7000, 30),
+    ("Педиатр кеңесі", "Бала денсаулығын тексеру", 6000, 30),
+    ("Вакцинация", "Вакцина құнысыз егу", 3000, 15),
+    ("Физиотерапия", "Бір сеанс", 5000, 45),
+    ("Массаж", "Емдік массаж, бір сеанс", 6000, 60),
+    ("Гинеколог кеңесі", "Профилактикалық тексеру", 9000, 30),
+]
+# Appointment lengths (minutes) and how often each is booked
+DURATIONS = [(15, 10), (30, 55), (45, 15), (60, 20)]
+# Age bands (years) of patients and their share
+AGE_BANDS = [((0, 17), 20), ((18, 39), 30), ((40, 64), 32), ((65, 95), 18)]
+
+
+@dataclass
+class Plan:
+    doctors: int
+    patients: int
+    appointments_per_day: int
+    days: int
+    seed: int
+    services: int = len(SERVICE_CATALOGUE)
+    # Day the data is generated "as of": the last quarter of the window is in the future
+    as_of: Optional[date] = None
+
+    def __post_init__(self):
+        if self.as_of is None:
+            self.as_of = date.today()
+
+    @property
+    def first_day(self) -> date:
+        return self.as_of - timedelta(days=self.days - self.days // 4)
+
+    @property
+    def now(self) -> datetime:
+        """Moment of generation; earlier visits are history, later ones are scheduled"""
+        return datetime.combine(self.as_of, datetime.min.time()) + timedelta(hours=12)
+
+
+def _weighted(rng: random.Random, choices: List[Tuple[object, int]]):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights)[0]
+
+
+def _phone(rng: random.Random) -> str:
+    return f"+7 (7{rng.randint(0, 99):02d}) {rng.randint(0, 999):03d}-{rng.randint(0, 9999):04d}"
+
+
+def doctor_rows(plan: Plan) -> Iterator[dict]:
+    rng = random.Random(f"{plan.seed}-doctors")
+    for i in range(1, plan.doctors + 1):
+        specialization = _weighted(rng, SPECIALIZATIONS)
+        yield {
+            "id": i,
+            "name": f"Dr. {rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            "specialization": specialization,
+            "email": f"doctor{i}@medicalcenter.kz",
+            "phone": _phone(rng),
+            "license_number": f"MED{i:07d}",
+            "bio": f"{rng.randint(2, 35)} жылдық тәжірибесі бар {specialization.lower()}",
+            "is_active": rng.random() < 0.95,
+            "updated_at": plan.now,
+        }
+
+
+def patient_rows(plan: Plan) -> Iterator[dict]:
+    rng = random.Random(f"{plan.seed}-patients")
+    for i in range(1, plan.patients + 1):
+        low, high = _weighted(rng, AGE_BANDS)
+        born = plan.as_of - timedelta(days=rng.randint(low * 365, high * 365 + 364))
+        history = "; ".join(rng.sample(CONDITIONS, rng.randint(1, 2))) if rng.random() < 0.4 else None
+        yield {
+            "id": i,
+            "first_name": rng.choice(FIRST_NAMES),
+            "last_name": rng.choice(LAST_NAMES),
+            "email": f"patient{i}@example.kz",
+            "phone": _phone(rng),
+            "date_of_birth": born,
+            "address": f"{rng.choice(CITIES)}, {rng.choice(STREETS)} {rng.randint(1, 250)}",
+            "medical_history": history,
+            "allergies": rng.choice(ALLERGIES) if rng.random() < 0.2 else None,
+            "is_active": rng.random() < 0.98,
+            "updated_at": plan.now,
+        }
+
+
+def service_rows(plan: Plan) -> Iterator[dict]:
+    rng = random.Random(f"{plan.seed}-services")
+    for i in range(1, plan.services + 1):
+        name, description, price, minutes = SERVICE_CATALOGUE[(i - 1) % len(SERVICE_CATALOGUE)]
+        round_ = (i - 1) // len(SERVICE_CATALOGUE)
+        yield {
+            "id": i,
+            "name": name if round_ == 0 else f"{name} ({round_ + 1})",
+            "description": description,
+            "price": float(price + 500 * round_),
+            "duration_minutes": minutes,
+            "is_available": rng.random() < 0.9,
+            "updated_at": plan.now,
+        }
+
+
+def day_layout(rng: random.Random, count: int, day_minutes: int, step: int) -> List[Tuple[int, int]]:
+    """(start offset, duration) in minutes of `count` visits spread over a working day without overlaps"""
+    durations = [_weighted(rng, DURATIONS) for _ in range(count)]
+    while sum(durations) > day_minutes:
+        durations.pop()
+    free_steps = (day_minutes - sum(durations)) // step
+    # Split the free time into len + 1 random gaps (before, between and after the visits)
+    cuts = sorted(rng.randint(0, free_steps) for _ in range(len(durations)))
+    layout, offset, previous = [], 0, 0
+    for duration, cut in zip(durations, cuts):
+        offset += (cut - previous) * step
+        layout.append((offset, duration))
+        offset += duration
+        previous = cut
+    return layout
+
+
+def appointment_rows(plan: Plan) -> Iterator[dict]:
+    """Visits of every doctor on every working day of the window, in (day, doctor) order"""
+    rng = random.Random(f"{plan.seed}-appointments")
+    start, end = schedule_settings.work_start, schedule_settings.work_end
+    day_minutes = (end.hour * 60 + end.minute) - (start.hour * 60 + start.minute)
+    spread = plan.appointments_per_day // 4
+    now = plan.now
+    next_id = 1
+    for day_index in range(plan.days):
+        day = plan.first_day + timedelta(days=day_index)
+        if day.weekday() not in schedule_settings.work_days:
+            continue
+        opening = datetime.combine(day, start)
+        for doctor_id in range(1, plan.doctors + 1):
+            count = rng.randint(max(0, plan.appointments_per_day - spread), plan.appointments_per_day + spread)
+            for offset, duration in day_layout(rng, count, day_minutes, schedule_settings.slot_step_minutes):
+                moment = opening + timedelta(minutes=offset)
+                if moment < now:
+                    status = "completed" if rng.random() < 0.85 else "cancelled"
+                else:
+                    status = "scheduled" if rng.random() < 0.9 else "cancelled"
+                yield {
+                    "id": next_id,
+                    # Squared uniform: low ids are frequent visitors, most patients come rarely
+                    "patient_id": int(plan.patients * rng.random() ** 2) + 1,
+                    "doctor_id": doctor_id,
+                    "appointment_date": moment,
+                    "duration_minutes": duration,
+                    "status": status,
+                    "notes": rng.choice(NOTES) if rng.random() < 0.3 else None,
+                    "created_at": min(moment - timedelta(days=rng.randint(1, 30), minutes=rng.randint(0, 600)), now),
+                    "updated_at": min(moment + timedelta(minutes=duration), now),
+                }
+                next_id += 1
+
+
+def _chunks(rows: Iterator[dict], size: int) -> Iterator[List[dict]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def load(bind, table, rows: Iterator[dict], chunk_size: int = DATAGEN_CHUNK_SIZE,
+         progress: Optional[Callable[[str, int, float], None]] = None) -> int:
+    """executemany `rows` into `table` chunk by chunk, one transaction per chunk"""
+    started = time.perf_counter()
+    total = 0
+    insert = table.insert()
+    for chunk in _chunks(rows, chunk_size):
+        with bind.begin() as conn:
+            conn.execute(insert, chunk)
+        total += len(chunk)
+        if progress is not None:
+            progress(table.name, total, time.perf_counter() - started)
+    if bind.dialect.name == "postgresql" and total:
+        # Explicit ids leave the serial sequence behind
+        with bind.begin() as conn:
+            conn.execute(text(f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), max(id)) FROM {table.name}"))
+    return total
+
+
+def generate(bind, plan: Plan, chunk_size: int = DATAGEN_CHUNK_SIZE,
+             progress: Optional[Callable[[str, int, float], None]] = None) -> Dict[str, int]:
+    """Replace all doctors, patients, services and appointments (archived ones too) of `bind` with the plan's data"""
+    from app.archive import appointments_archive
+    from app.database import Base
+    from app.idempotency import idempotency_keys
+    from app.migrations import upgrade
+    from app.models.appointment import Appointment
+    from app.models.doctor import Doctor
+    from app.models.patient import Patient
+    from app.models.service import Service
+
+    fresh = not inspect(bind).has_table(Patient.__tablename__)
+    Base.metadata.create_all(bind)
+    if not fresh:
+        upgrade(bind)
+        with bind.begin() as conn:
+            for table in (appointments_archive, Appointment.__table__, Doctor.__table__, Patient.__table__,
+                          Service.__table__, idempotency_keys):
+                conn.execute(table.delete())
+
+    counts = {
+        "doctors": load(bind, Doctor.__table__, doctor_rows(plan), chunk_size, progress),
+        "patients": load(bind, Patient.__table__, patient_rows(plan), chunk_size, progress),
+        "services": load(bind, Service.__table__, service_rows(plan), chunk_size, progress),
+        "appointments": load(bind, Appointment.__table__, appointment_rows(plan), chunk_size, progress),
+    }
+    if fresh:
+        # Indexes, full-text tables and triggers are cheaper to build once over the loaded rows
+        upgrade(bind)
+    return counts
+
+
+def main(argv=None, defaults: Optional[dict] = None):
+    import argparse
+
+    from app.database import engine
+
+    defaults = {"doctors": 10, "patients": 200, "appointments_per_day": 6, "days": 60, "seed": 42, **(defaults or {})}
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--doctors", type=int, default=defaults["doctors"])
+    parser.add_argument("--patients", type=int, default=defaults["patients"])
+    parser.add_argument("--appointments-per-day", type=int, default=defaults["appointments_per_day"],
+                        help="Average visits per doctor per working day")
+    parser.add_argument("--days", type=int, default=defaults["days"],
+                        help="Calendar days of schedule; the last quarter lies in the future")
+    parser.add_argument("--seed", type=int, default=defaults["seed"])
+    parser.add_argument("--services", type=int, default=len(SERVICE_CATALOGUE))
+    parser.add_argument("--as-of", type=date.fromisoformat, default=None,
+                        help="Generation date (default today); fix it to reproduce a dataset exactly")
+    parser.add_argument("--chunk-size", type=int, default=DATAGEN_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    plan = Plan(args.doctors, args.patients, args.appointments_per_day, args.days, args.seed, args.services, args.as_of)
+
+    tables = []
+
+    def show(table: str, rows: int, seconds: float):
+        if tables and tables[-1] != table:
+            print(file=sys.stderr)
+        tables.append(table)
+        print(f"\r{table}: {rows} rows, {rows / max(seconds, 1e-9):.0f} rows/s   ", end="", file=sys.stderr, flush=True)
+
+    started = time.perf_counter()
+    counts = generate(engine, plan, args.chunk_size, show)
+    print(file=sys.stderr)
+    print(f"✅ {counts['doctors']} дәрігер, {counts['patients']} пациент, {counts['services']} қызмет, "
+          f"{counts['appointments']} тағайын қосылды ({time.perf_counter() - started:.1f}s)")
+    return counts
+
+
+if __name__ == "__main__":
+    main()
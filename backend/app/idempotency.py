@@ -0,0 +1,322 @@
+"""
+Idempotency keys for POST requests
+
+A client that may retry a create (a mobile app after a timeout) sends an
+`Idempotency-Key` header with a value of its choice, the same on every
+attempt. The first request with a key claims it in `idempotency_keys`
+(a primary-key insert, so workers agree on the winner), runs normally,
+and its response is stored for IDEMPOTENCY_TTL_HOURS. A retry with the
+same key and the same request gets the stored response, marked
+`Idempotent-Replayed: true`, without reaching the handler or the business
+tables.
+
+A duplicate that arrives while the first request is still running waits
+for it (an in-process event, or polling the key row when the first
+request runs in another worker) for up to IDEMPOTENCY_WAIT_SECONDS, then
+gets the same stored response, or 409 if it is still running.
+
+- Reusing a key for a different request (method, path, query or body)
+  is rejected with 422.
+- Responses with status >= 500 are not stored, so the key can be retried.
+- While the first request runs, its worker renews the claim every
+  IDEMPOTENCY_LOCK_SECONDS / 3, however long the request takes (a large
+  CSV import). Only a claim that stopped being renewed (a crashed
+  worker) can be taken over, IDEMPOTENCY_LOCK_SECONDS after the last
+  renewal.
+
+The request body is spooled (to disk past 1 MiB) and hashed before the
+handler runs, so CSV imports keep bounded memory. A client that
+disconnects mid-upload leaves the key untouched: a truncated body never
+runs or claims the key its complete retry will use.
+"""
+
+import asyncio
+import hashlib
+import logging
+import re
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+import orjson
+from sqlalchemy import Column, DateTime, Index, Integer, LargeBinary, MetaData, String, Table, delete, select, update
+from sqlalchemy.exc import IntegrityError
+from starlette.responses import JSONResponse
+from starlette.routing import Match
+
+from app.config import idempotency_settings
+from app.database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+HEADER = b"idempotency-key"
+
+_KEY = re.compile(r"^[\x21-\x7e]{1,255}$")
+
+# Request bodies larger than this are spooled to a temporary file
+_SPOOL_BYTES = 1 << 20
+_CHUNK_BYTES = 1 << 16
+
+# Not stored with a response: recomputed on replay
+_UNSTORED_HEADERS = {b"content-length"}
+
+metadata = MetaData()
+
+idempotency_keys = Table(
+    "idempotency_keys",
+    metadata,
+    Column("key", String, primary_key=True),
+    # sha256 of method, path, query and body
+    Column("fingerprint", String, nullable=False),
+    # NULL while the first request is running
+    Column("status_code", Integer),
+    Column("headers", LargeBinary),
+    Column("body", LargeBinary),
+    # Also identifies the current claim: a taken-over key gets a new one
+    Column("created_at", DateTime, nullable=False),
+    # Renewed claim deadline while running, end of the replay window once stored
+    Column("expires_at", DateTime, nullable=False),
+    Index("ix_idempotency_keys_expires_at", "expires_at"),
+)
+
+
+def create_idempotency_keys(conn):
+    metadata.create_all(conn)
+
+
+class IdempotencyStats:
+    def __init__(self):
+        self.executed = 0
+        self.replayed = 0
+        self.waited = 0
+        self.mismatched = 0
+        self.still_running = 0
+
+    def snapshot(self) -> dict:
+        return {
+            "enabled": idempotency_settings.enabled,
+            "executed": self.executed,
+            "replayed": self.replayed,
+            "waited": self.waited,
+            "mismatched": self.mismatched,
+            "still_running": self.still_running,
+        }
+
+
+idempotency_stats = IdempotencyStats()
+
+
+async def _read_body(scope, receive) -> Tuple[tempfile.SpooledTemporaryFile, Optional[str]]:
+    """The whole request body, spooled, and the request fingerprint (None if the client disconnected mid-upload)"""
+    digest = hashlib.sha256(f"{scope['method']} {scope['path']}?".encode() + scope.get("query_string", b"") + b"\n")
+    body = tempfile.SpooledTemporaryFile(max_size=_SPOOL_BYTES)
+    more = True
+    while more:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            body.seek(0)
+            return body, None
+        chunk = message.get("body", b"")
+        digest.update(chunk)
+        body.write(chunk)
+        more = message.get("more_body", False)
+    body.seek(0)
+    return body, digest.hexdigest()
+
+
+def _replay_receive(body: tempfile.SpooledTemporaryFile, size: int, receive):
+    """ASGI receive that hands the spooled body to the app, then defers to the real one (disconnects)"""
+    done = False
+
+    async def replay():
+        nonlocal done
+        if done:
+            return await receive()
+        chunk = body.read(_CHUNK_BYTES)
+        done = body.tell() >= size
+        return {"type": "http.request", "body": chunk, "more_body": not done}
+
+    return replay
+
+
+def _error(status: int, detail: str) -> JSONResponse:
+    return JSONResponse({"detail": detail}, status_code=status)
+
+
+class IdempotencyMiddleware:
+    """Pure ASGI middleware: claims, replays and waits on Idempotency-Key values of POST requests"""
+
+    def __init__(self, app):
+        self.app = app
+        self.inflight: Dict[str, asyncio.Event] = {}
+        self.last_purge = 0.0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+        key = next((value for name, value in scope["headers"] if name == HEADER), None)
+        if key is None:
+            await self.app(scope, receive, send)
+            return
+        key = key.decode("latin-1")
+        if not _KEY.match(key):
+            await _error(400, "Idempotency-Key мәні жарамсыз")(scope, receive, send)
+            return
+
+        body, fingerprint = await _read_body(scope, receive)
+        try:
+            if fingerprint is None:
+                # Nobody to answer, and a truncated body must not claim the key its full retry will use
+                return
+            deadline = time.monotonic() + idempotency_settings.wait_seconds
+            waited = False
+            while True:
+                claimed_at, record = await self.claim(key, fingerprint)
+                if claimed_at:
+                    break
+                if record is not None and record.fingerprint != fingerprint:
+                    idempotency_stats.mismatched += 1
+                    await _error(422, "Idempotency-Key басқа сұраныспен қолданылған")(scope, receive, send)
+                    return
+                if record is not None and record.status_code is not None:
+                    idempotency_stats.replayed += 1
+                    await self.replay(scope, send, record)
+                    return
+                if time.monotonic() >= deadline:
+                    idempotency_stats.still_running += 1
+                    await _error(409, "Осы Idempotency-Key бар сұраныс әлі өңделуде")(scope, receive, send)
+                    return
+                # Still running, or released or taken over between our read and write: wait, then look again
+                if record is not None and not waited:
+                    waited = True
+                    idempotency_stats.waited += 1
+                await self.wait(key, deadline)
+
+            size = body.seek(0, 2)
+            body.seek(0)
+            await self.execute(key, claimed_at, scope, _replay_receive(body, size, receive), send)
+        finally:
+            body.close()
+
+    async def claim(self, key: str, fingerprint: str):
+        """(claim time, None) when this request now owns the key, otherwise (None, the key's row or None)"""
+        now = datetime.utcnow()
+        claim_until = now + timedelta(seconds=idempotency_settings.lock_seconds)
+        async with AsyncSessionLocal() as db:
+            if time.monotonic() - self.last_purge >= idempotency_settings.purge_interval_seconds:
+                self.last_purge = time.monotonic()
+                await db.execute(delete(idempotency_keys).where(idempotency_keys.c.expires_at < now))
+                await db.commit()
+            # Read first: duplicates (often many, from a retry storm) then never queue for the write lock
+            record = (await db.execute(select(idempotency_keys).where(idempotency_keys.c.key == key))).first()
+            if record is None:
+                try:
+                    await db.execute(idempotency_keys.insert().values(
+                        key=key, fingerprint=fingerprint, created_at=now, expires_at=claim_until
+                    ))
+                    await db.commit()
+                    return now, None
+                except IntegrityError:
+                    await db.rollback()
+                    return None, (await db.execute(select(idempotency_keys).where(idempotency_keys.c.key == key))).first()
+            if record.expires_at > now:
+                return None, record
+            # An expired response or an abandoned claim: take the key over, unless someone else just did
+            taken = await db.execute(
+                update(idempotency_keys)
+                .where(idempotency_keys.c.key == key, idempotency_keys.c.expires_at == record.expires_at)
+                .values(fingerprint=fingerprint, status_code=None, headers=None, body=None,
+                        created_at=now, expires_at=claim_until)
+            )
+            await db.commit()
+            return (now if taken.rowcount == 1 else None), None
+
+    async def wait(self, key: str, deadline: float):
+        """Until the first request with `key` finishes here, or one poll interval if it runs elsewhere"""
+        event = self.inflight.get(key)
+        if event is None:
+            await asyncio.sleep(idempotency_settings.poll_interval_ms / 1000)
+            return
+        try:
+            await asyncio.wait_for(event.wait(), max(deadline - time.monotonic(), 0))
+        except asyncio.TimeoutError:
+            pass
+
+    async def heartbeat(self, key: str, claimed_at: datetime):
+        """Keep renewing the claim until cancelled, so a long request is never taken over"""
+        while True:
+            await asyncio.sleep(idempotency_settings.lock_seconds / 3)
+            try:
+                async with AsyncSessionLocal() as db:
+                    await db.execute(
+                        update(idempotency_keys)
+                        .where(idempotency_keys.c.key == key, idempotency_keys.c.created_at == claimed_at,
+                               idempotency_keys.c.status_code.is_(None))
+                        .values(expires_at=datetime.utcnow() + timedelta(seconds=idempotency_settings.lock_seconds))
+                    )
+                    await db.commit()
+            except Exception as e:
+                # The next beat retries; two more are due before the claim runs out
+                logger.warning("Could not renew an idempotency key claim: %s", e)
+
+    async def execute(self, key: str, claimed_at: datetime, scope, receive, send):
+        """Run the request as the key's owner, store its response and wake the duplicates waiting here"""
+        idempotency_stats.executed += 1
+        event = self.inflight[key] = asyncio.Event()
+        heartbeat = asyncio.create_task(self.heartbeat(key, claimed_at))
+        status = 500
+        headers = []
+        chunks = []
+
+        async def capture(message):
+            nonlocal status, headers
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = [[name.decode("latin-1"), value.decode("latin-1")]
+                           for name, value in message.get("headers", []) if name not in _UNSTORED_HEADERS]
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, capture)
+        finally:
+            heartbeat.cancel()
+            try:
+                await self.finish(key, claimed_at, status, headers, b"".join(chunks))
+            except Exception as e:
+                logger.warning("Could not record the response for an idempotency key: %s", e)
+            finally:
+                self.inflight.pop(key, None)
+                event.set()
+
+    async def finish(self, key: str, claimed_at: datetime, status: int, headers: list, body: bytes):
+        # Only this request's claim: never overwrite or release a key someone else took over
+        owned = (idempotency_keys.c.key == key, idempotency_keys.c.created_at == claimed_at)
+        async with AsyncSessionLocal() as db:
+            if status >= 500:
+                # Nothing was (reliably) done; the client may retry with the same key
+                await db.execute(delete(idempotency_keys).where(*owned))
+            else:
+                now = datetime.utcnow()
+                await db.execute(
+                    update(idempotency_keys).where(*owned).values(
+                        status_code=status, headers=orjson.dumps(headers), body=body,
+                        expires_at=now + timedelta(hours=idempotency_settings.ttl_hours),
+                    )
+                )
+            await db.commit()
+
+    async def replay(self, scope, send, record):
+        # Label metrics and logs with the route the stored response came from
+        for route in scope["app"].router.routes:
+            match, child = route.matches(scope)
+            if match == Match.FULL:
+                scope.update(child)
+                break
+        headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in orjson.loads(record.headers)]
+        headers += [(b"content-length", str(len(record.body)).encode()), (b"idempotent-replayed", b"true")]
+        await send({"type": "http.response.start", "status": record.status_code, "headers": headers})
+        await send({"type": "http.response.body", "body": record.body})
@@ -0,0 +1,239 @@
+"""
+Streaming CSV import for patients and doctors
+
+The file is parsed and validated in chunks of IMPORT_CHUNK_SIZE rows in a
+worker thread, so a large upload does not block the event loop. Unique
+columns are checked against sets preloaded from the database once (and
+extended as rows are accepted), and every chunk is written with one
+executemany and committed. Memory stays at one chunk plus the dedupe sets.
+
+    python -m app.importer patients patients.csv --rejects rejects.csv
+"""
+
+import csv
+import logging
+import sys
+import time
+from itertools import islice
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set, TextIO, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
+
+from app.bulk import existing_values, validation_message
+
+IMPORT_CHUNK_SIZE = 5000
+
+# Rejects returned in the API response; the CLI rejects file always gets all of them
+MAX_REPORTED_REJECTS = 1000
+
+logger = logging.getLogger(__name__)
+
+
+class ImportSpec(NamedTuple):
+    """Target model, the schema every row must pass and unique columns with their duplicate error"""
+    model: Any
+    schema: Type[BaseModel]
+    unique: Dict[str, str]
+
+
+class ImportReport:
+    """Running totals of an import; rejected rows are optionally copied to a CSV file"""
+
+    def __init__(self, rejects_file: Optional[TextIO] = None):
+        self.processed = 0
+        self.imported = 0
+        self.rejected = 0
+        self.rejects: List[Tuple[int, str]] = []
+        self.started = time.perf_counter()
+        self._rejects_writer = csv.writer(rejects_file) if rejects_file is not None else None
+        self._rejects_header = False
+
+    def reject(self, row_number: int, row: Dict[str, Any], error: str):
+        self.rejected += 1
+        if len(self.rejects) < MAX_REPORTED_REJECTS:
+            self.rejects.append((row_number, error))
+        if self._rejects_writer is not None:
+            if not self._rejects_header:
+                self._rejects_writer.writerow(["row", "error", *row])
+                self._rejects_header = True
+            self._rejects_writer.writerow([row_number, error, *row.values()])
+
+    @property
+    def seconds(self) -> float:
+        return time.perf_counter() - self.started
+
+    def progress_line(self) -> str:
+        return (
+            f"{self.processed} rows, {self.imported} imported, {self.rejected} rejected, "
+            f"{self.processed / max(self.seconds, 1e-9):.0f} rows/s"
+        )
+
+    def result(self) -> dict:
+        seconds = self.seconds
+        return {
+            "processed": self.processed,
+            "imported": self.imported,
+            "rejected": self.rejected,
+            "seconds": round(seconds, 3),
+            "rows_per_second": round(self.processed / max(seconds, 1e-9), 1),
+            "rejects": [{"row": row, "error": error} for row, error in self.rejects],
+        }
+
+
+def _clean(raw: Dict[Optional[str], Optional[str]]) -> Dict[str, str]:
+    """Strip header names and values; empty or missing cells and surplus cells are dropped"""
+    return {
+        key.strip(): value.strip()
+        for key, value in raw.items()
+        if key is not None and value is not None and value.strip()
+    }
+
+
+def _parse_chunk(reader: csv.DictReader, schema: Type[BaseModel], size: int):
+    """Read up to `size` rows and validate them: [(raw row, model or error message)]"""
+    parsed = []
+    for raw in islice(reader, size):
+        try:
+            parsed.append((raw, schema.model_validate(_clean(raw))))
+        except ValidationError as e:
+            parsed.append((raw, validation_message(e)))
+    return parsed
+
+
+async def load_taken(db, spec: ImportSpec) -> Dict[str, Set[Any]]:
+    """Every value already stored in the unique columns, streamed into sets"""
+    taken = {}
+    for column in spec.unique:
+        result = await db.stream_scalars(
+            select(getattr(spec.model, column)).execution_options(yield_per=IMPORT_CHUNK_SIZE)
+        )
+        taken[column] = {value async for value in result if value is not None}
+    return taken
+
+
+async def _write_chunk(db, spec: ImportSpec, accepted: List[Tuple[int, dict, dict]], report: ImportReport):
+    if not accepted:
+        return
+    try:
+        await db.execute(insert(spec.model), [values for _, _, values in accepted])
+        await db.commit()
+    except IntegrityError:
+        # Someone else inserted one of these values after the preload; recheck this chunk only
+        await db.rollback()
+        conflicts = {
+            column: await existing_values(db, getattr(spec.model, column), (v[column] for _, _, v in accepted))
+            for column in spec.unique
+        }
+        remaining = []
+        for row_number, raw, values in accepted:
+            column = next((c for c in spec.unique if values[c] in conflicts[c]), None)
+            if column is None:
+                remaining.append((row_number, raw, values))
+            else:
+                report.reject(row_number, raw, spec.unique[column])
+        accepted = remaining
+        if accepted:
+            await db.execute(insert(spec.model), [values for _, _, values in accepted])
+        await db.commit()
+    report.imported += len(accepted)
+
+
+async def _import_chunk(db, spec: ImportSpec, chunk, row_number: int, taken: Dict[str, Set[Any]], report: ImportReport):
+    """Reject invalid and duplicate rows of a parsed chunk, then write the rest"""
+    accepted = []
+    for raw, item in chunk:
+        row_number += 1
+        if isinstance(item, str):
+            report.reject(row_number, raw, item)
+            continue
+        values = item.model_dump()
+        duplicate = next((c for c in spec.unique if values[c] in taken[c]), None)
+        if duplicate is not None:
+            report.reject(row_number, raw, spec.unique[duplicate])
+            continue
+        for column in spec.unique:
+            taken[column].add(values[column])
+        accepted.append((row_number, raw, values))
+
+    await _write_chunk(db, spec, accepted, report)
+    report.processed += len(chunk)
+
+
+async def import_csv(
+    db,
+    text: TextIO,
+    spec: ImportSpec,
+    rejects_file: Optional[TextIO] = None,
+    progress: Optional[Callable[[ImportReport], None]] = None,
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+) -> ImportReport:
+    """
+    Import CSV rows (first line is the header, columns named like the create
+    schema) into `spec.model`. Invalid and duplicate rows are rejected with
+    their 1-based data row number; everything else is inserted and
+    committed one chunk at a time.
+    """
+    reader = csv.DictReader(text)
+    report = ImportReport(rejects_file)
+    taken = await load_taken(db, spec)
+    row_number = 0
+
+    while True:
+        chunk = await run_in_threadpool(_parse_chunk, reader, spec.schema, chunk_size)
+        if not chunk:
+            break
+        await _import_chunk(db, spec, chunk, row_number, taken, report)
+        row_number += len(chunk)
+        if progress is not None:
+            progress(report)
+
+    return report
+
+
+def main(argv=None):
+    import argparse
+    import asyncio
+
+    from app.database import AsyncSessionLocal, engine
+    from app.migrations import pending_migrations
+    from app.routers import doctors, patients
+
+    specs = {"patients": patients.IMPORT_SPEC, "doctors": doctors.IMPORT_SPEC}
+
+    parser = argparse.ArgumentParser(description="Import patients or doctors from a CSV file")
+    parser.add_argument("resource", choices=sorted(specs))
+    parser.add_argument("path", help="CSV file with a header row")
+    parser.add_argument("--rejects", help="Write rejected rows (with row number and error) to this CSV file")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    # The schema is only changed by `python -m app.migrations`, never as a side effect of an import
+    pending = pending_migrations(engine)
+    if pending:
+        sys.exit(f"Database schema is not up to date (pending migrations: {', '.join(map(str, pending))}). "
+                 "Run migrations first: python -m app.migrations")
+
+    def show(report: ImportReport):
+        print(f"\r{report.progress_line()}", end="", file=sys.stderr, flush=True)
+
+    async def run():
+        rejects = open(args.rejects, "w", newline="", encoding="utf-8") if args.rejects else None
+        try:
+            with open(args.path, newline="", encoding="utf-8-sig") as text:
+                async with AsyncSessionLocal() as db:
+                    return await import_csv(db, text, specs[args.resource], rejects, show, args.chunk_size)
+        finally:
+            if rejects is not None:
+                rejects.close()
+
+    report = asyncio.run(run())
+    print(file=sys.stderr)
+    print(f"Imported {report.imported} of {report.processed} rows in {report.seconds:.1f}s "
+          f"({report.result()['rows_per_second']:.0f} rows/s), rejected {report.rejected}")
+
+
+if __name__ == "__main__":
+    main()
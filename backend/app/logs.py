@@ -0,0 +1,260 @@
+"""
+Central, non-blocking logging
+
+`configure_logging()` puts a single QueueHandler on the root logger. A
+request thread only appends the record to an in-memory queue, without
+waking anyone; a background thread drains the queue every
+LOG_FLUSH_INTERVAL_MS, formats the batch (JSON by default) and writes it
+with one call. Message arguments are formatted there too, so log with
+%-style arguments (`logger.info("Retrieved %s patients", n)`) rather
+than f-strings and pass values that will not change afterwards.
+
+RequestLogMiddleware gives every request an id (the incoming X-Request-ID
+or a new one, echoed in the response), attaches it with the method and
+route template to each record logged while the request runs, and writes
+one access record with status and duration.
+
+INFO records of successful reads (LOG_SAMPLED_METHODS: GET and HEAD) are
+sampled at LOG_SUCCESS_SAMPLE_RATE; writes keep every record, so their
+audit lines are never lost. LOG_ROUTE_SAMPLE_RATES overrides the rate of
+any route, writes included. The decision is made once per request, so a
+kept request keeps all of its records. Warnings, errors and responses
+with status >= 400 are always written.
+"""
+
+import atexit
+import logging
+import queue
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler
+from typing import Optional
+
+import orjson
+
+from app.config import LogSettings, log_settings
+from app.metrics import route_template
+
+access_logger = logging.getLogger("app.access")
+
+# Attributes every LogRecord has; anything else was passed through `extra=`
+_STANDARD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+# What LOG_SKIP_RECORD_DETAILS turns off, as it was before configure_logging()
+_RECORD_DETAILS = (logging._srcfile, logging.logThreads, logging.logProcesses, logging.logMultiprocessing)
+
+
+class RequestLog:
+    """Logging state of one request"""
+
+    __slots__ = ("request_id", "scope", "sampled")
+
+    def __init__(self, request_id: str, scope: dict):
+        self.request_id = request_id
+        self.scope = scope
+        self.sampled: Optional[bool] = None
+
+    @property
+    def route(self) -> str:
+        return route_template(self.scope)
+
+    def keep(self) -> bool:
+        """Whether this request's INFO records are written; decided on first use, once the route is known"""
+        if self.sampled is None:
+            method = self.scope["method"]
+            default = _settings.success_sample_rate if method in _settings.sampled_methods else 1.0
+            rate = _settings.route_sample_rates.get(f"{method} {self.route}", default)
+            self.sampled = rate >= 1 or random.random() < rate
+        return self.sampled
+
+
+_current: ContextVar[Optional[RequestLog]] = ContextVar("request_log", default=None)
+_settings: LogSettings = log_settings
+
+
+class SamplingFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        request = _current.get()
+        return request is None or request.keep()
+
+
+class RequestQueueHandler(QueueHandler):
+    """Hands records to the writer thread unformatted, tagged with the current request"""
+
+    def __init__(self, log_queue: queue.SimpleQueue, max_size: int):
+        super().__init__(log_queue)
+        self.max_size = max_size
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        request = _current.get()
+        if request is not None:
+            record.request_id = request.request_id
+            record.method = request.scope["method"]
+            record.route = request.route
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        # Never block a request on logging: past max_size records are dropped (and counted)
+        if self.queue.qsize() >= self.max_size:
+            self.dropped += 1
+        else:
+            self.queue.put_nowait(record)
+
+
+class LogWriter(threading.Thread):
+    """Drains the queue in batches; a batch is formatted and written with a single write and flush"""
+
+    def __init__(self, log_queue: queue.SimpleQueue, output: logging.StreamHandler, interval: float):
+        super().__init__(name="log-writer", daemon=True)
+        self.queue = log_queue
+        self.output = output
+        self.interval = interval
+        self.stopping = threading.Event()
+
+    def run(self):
+        while not self.stopping.wait(self.interval):
+            self.drain()
+        self.drain()
+
+    def drain(self):
+        lines = []
+        while True:
+            try:
+                record = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                lines.append(self.output.format(record))
+            except Exception:
+                self.output.handleError(record)
+        if lines:
+            self.output.stream.write("\n".join(lines) + "\n")
+            self.output.flush()
+
+    def stop(self):
+        self.stopping.set()
+        self.join()
+        self.output.close()
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update((key, value) for key, value in vars(record).items() if key not in _STANDARD_ATTRIBUTES)
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return orjson.dumps(entry, default=str).decode()
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        if not hasattr(record, "request_id"):
+            record.request_id = "-"
+        return super().format(record)
+
+
+_handler: Optional[RequestQueueHandler] = None
+_writer: Optional[LogWriter] = None
+
+
+def configure_logging(settings: LogSettings = log_settings) -> RequestQueueHandler:
+    """Route all logging through the queue; calling it again replaces the previous setup"""
+    global _handler, _writer, _settings
+    flush_logging()
+
+    output = logging.FileHandler(settings.file, encoding="utf-8") if settings.file else logging.StreamHandler(sys.stderr)
+    output.setFormatter(JsonFormatter() if settings.format == "json" else TextFormatter())
+
+    # Our formatters never print caller, thread or process details; collecting them can be
+    # switched off for the whole process (Logging HOWTO, "Optimization")
+    if settings.skip_record_details:
+        logging._srcfile = None
+        logging.logThreads = logging.logProcesses = logging.logMultiprocessing = False
+    else:
+        logging._srcfile, logging.logThreads, logging.logProcesses, logging.logMultiprocessing = _RECORD_DETAILS
+
+    _settings = settings
+    _handler = RequestQueueHandler(queue.SimpleQueue(), settings.queue_size)
+    _handler.addFilter(SamplingFilter())
+    root = logging.getLogger()
+    root.handlers = [_handler]
+    root.setLevel(settings.level.upper())
+
+    _writer = LogWriter(_handler.queue, output, settings.flush_interval_ms / 1000)
+    _writer.start()
+    return _handler
+
+
+def flush_logging():
+    """Write out everything queued so far and stop the writer thread"""
+    global _writer
+    if _writer is not None:
+        _writer.stop()
+        _writer = None
+
+
+atexit.register(flush_logging)
+
+
+def logging_stats() -> dict:
+    return {
+        "queued": _handler.queue.qsize() if _handler else 0,
+        "dropped": _handler.dropped if _handler else 0,
+        "success_sample_rate": _settings.success_sample_rate,
+    }
+
+
+class RequestLogMiddleware:
+    """Pure ASGI middleware: request id, request context for records, access record"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = next((value for name, value in scope["headers"] if name == b"x-request-id"), b"").decode("latin-1")
+        request = RequestLog(incoming if _REQUEST_ID.match(incoming) else uuid.uuid4().hex, scope)
+        token = _current.set(request)
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_request_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = [*message.get("headers", []), (b"x-request-id", request.request_id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            if _settings.access_log and (status >= 400 or request.keep()):
+                access_logger.log(
+                    logging.ERROR if status >= 500 else logging.INFO if status < 400 else logging.WARNING,
+                    "%s %s %s",
+                    scope["method"], scope["path"], status,
+                    extra={"status": status, "duration_ms": round((time.perf_counter() - started) * 1000, 3)},
+                )
+            _current.reset(token)
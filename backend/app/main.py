@@ -1,25 +1,42 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-import os
-from dotenv import load_dotenv
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, PlainTextResponse, Response
 
-# Import routers and database
-from app.routers import appointments, doctors, patients, services
-from app.database import engine, Base
-
-load_dotenv()
-
-# Create tables on startup
-Base.metadata.create_all(bind=engine)
+# Database and app-wide services; API routers are included below
+from app.database import async_engine, engine, pool_stats, read_async_engine
+from app.cache import cache
+from app.config import idempotency_settings, metrics_settings, profiler_settings, response_settings, startup_settings
+from app.idempotency import IdempotencyMiddleware, idempotency_stats
+from app.logs import RequestLogMiddleware, logging_stats
+from app.metrics import MetricsMiddleware, instrument_engine as instrument_metrics, metrics
+from app.profiler import ProfilerMiddleware, instrument_engine as instrument_profiler, slow_queries
+from app.replica import ReadYourWritesMiddleware, routing_stats
+from app.startup import LazyRouterMiddleware, include_routers, lifespan
 
 # Create FastAPI app
 app = FastAPI(
     title="Medical Center API",
     description="API for Medical Center Management System",
-    version="1.0.0"
+    version="1.0.0",
+    # orjson encodes the already-serialized response several times faster than json.dumps
+    default_response_class=ORJSONResponse,
+    # Logging, optional migrations (STARTUP_MIGRATE) and shutdown; importing this module touches no database
+    lifespan=lifespan,
 )
 
+if startup_settings.lazy_routers:
+    # Innermost: a router is included right before the request is routed
+    app.add_middleware(LazyRouterMiddleware)
+
+if read_async_engine is not None:
+    # GETs go to the replica (READ_DATABASE_URL); writes hand the client a token so it reads its own writes
+    app.add_middleware(ReadYourWritesMiddleware)
+
+if idempotency_settings.enabled:
+    # Inside compression and CORS: stores the plain response, and replays get the same outer headers
+    app.add_middleware(IdempotencyMiddleware)
+
 # Configure CORS
 cors_origins = [
     "http://localhost:3000",
@@ -35,11 +52,34 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if response_settings.gzip_enabled:
+    app.add_middleware(
+        GZipMiddleware,
+        minimum_size=response_settings.gzip_minimum_size,
+        compresslevel=response_settings.gzip_level,
+    )
+
+if profiler_settings.enabled:
+    app.add_middleware(ProfilerMiddleware)
+    instrument_profiler(engine)
+    instrument_profiler(async_engine.sync_engine)
+    if read_async_engine is not None:
+        instrument_profiler(read_async_engine.sync_engine)
+
+if metrics_settings.enabled:
+    # Outermost, so latency covers compression and streamed bodies
+    app.add_middleware(MetricsMiddleware)
+    instrument_metrics(engine)
+    instrument_metrics(async_engine.sync_engine)
+    if read_async_engine is not None:
+        instrument_metrics(read_async_engine.sync_engine)
+
+# Outermost: every record of a request carries its id, and the access record covers the whole response
+app.add_middleware(RequestLogMiddleware)
+
 # Include routers
-app.include_router(doctors.router, prefix="/api/doctors", tags=["doctors"])
-app.include_router(patients.router, prefix="/api/patients", tags=["patients"])
-app.include_router(appointments.router, prefix="/api/appointments", tags=["appointments"])
-app.include_router(services.router, prefix="/api/services", tags=["services"])
+if not startup_settings.lazy_routers:
+    include_routers(app)
 
 # Root endpoint
 @app.get("/")
@@ -54,6 +94,51 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/api/health/pool")
+async def pool_health():
+    """Live connection pool statistics"""
+    return pool_stats.snapshot()
+
+@app.get("/api/health/replica")
+async def replica_health():
+    """Reads served by the replica, and by the primary because the replica lagged or was unavailable"""
+    return routing_stats.snapshot()
+
+@app.get("/api/health/idempotency")
+async def idempotency_health():
+    """POST requests run once for their Idempotency-Key, replayed, or made to wait for the first one"""
+    return idempotency_stats.snapshot()
+
+@app.get("/api/health/cache")
+async def cache_health():
+    """Reference data cache hit/miss counters"""
+    return cache.snapshot()
+
+@app.get("/api/health/logging")
+async def logging_health():
+    """Log records waiting for the writer thread and records dropped because the queue was full"""
+    return logging_stats()
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def prometheus_metrics():
+    """Request latency, status codes and per-route query counts in Prometheus text format"""
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4")
+
+if profiler_settings.enabled:
+    @app.get("/api/debug/slow-queries", tags=["debug"])
+    async def get_slow_queries(limit: int = Query(50, ge=1, le=1000)):
+        """Most recent statements slower than PROFILER_THRESHOLD_MS, newest first, with their query plans"""
+        return {
+            "threshold_ms": profiler_settings.threshold_ms,
+            "captured": slow_queries.captured,
+            "items": slow_queries.recent(limit),
+        }
+
+    @app.delete("/api/debug/slow-queries", status_code=204, tags=["debug"])
+    async def clear_slow_queries():
+        slow_queries.clear()
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
+    # The app writes its own access records (app.access)
+    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True, access_log=False)
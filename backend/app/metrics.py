@@ -0,0 +1,199 @@
+"""
+Prometheus metrics for HTTP requests and the database queries they issue
+
+MetricsMiddleware times every request by route template (not raw path, so
+/api/patients/{patient_id} is one series) and counts in-flight requests
+and status codes. SQLAlchemy cursor events on both engines add each
+query's count and duration to the request that is running it, found
+through a context variable, which is what makes redundant lookups in a
+handler show up. `render()` produces the Prometheus text format served at
+/metrics; no client library is needed.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+
+# Route label of requests that matched no route (404s, probes); keeps cardinality bounded
+UNMATCHED = "<unmatched>"
+
+
+class RequestTally:
+    """Queries run on behalf of one request"""
+
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+_current: ContextVar[Optional[RequestTally]] = ContextVar("metrics_request", default=None)
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, labels: Tuple[str, ...], value: float):
+        series = self.series.get(labels)
+        if series is None:
+            # [count per bucket..., +Inf count, sum]
+            series = self.series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+
+class Metrics:
+    """In-process registry; every update happens under one lock"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.requests: Dict[Tuple[str, str, str], int] = {}
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queries_per_request = Histogram(QUERY_COUNT_BUCKETS)
+        self.db_seconds: Dict[Tuple[str, str], float] = {}
+        self.queries: Dict[Tuple[str, str], int] = {}
+        # Queries run outside any request (startup, scripts, background work)
+        self.background_queries = 0
+
+    def request_started(self):
+        with self.lock:
+            self.in_flight += 1
+
+    def request_finished(self, method: str, route: str, status: int, seconds: float, tally: RequestTally):
+        labels = (method, route)
+        with self.lock:
+            self.in_flight -= 1
+            key = (method, route, str(status))
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.latency.observe(labels, seconds)
+            self.queries_per_request.observe(labels, tally.queries)
+            self.queries[labels] = self.queries.get(labels, 0) + tally.queries
+            self.db_seconds[labels] = self.db_seconds.get(labels, 0.0) + tally.db_seconds
+
+    def render(self) -> str:
+        with self.lock:
+            lines = []
+            _family(lines, "http_requests_in_flight", "gauge", "Requests being served")
+            lines.append(f"http_requests_in_flight {self.in_flight}")
+            _family(lines, "http_requests_total", "counter", "Requests by route and status code")
+            for (method, route, status), count in sorted(self.requests.items()):
+                lines.append(f"http_requests_total{_labels(method=method, route=route, status=status)} {count}")
+            _histogram(lines, "http_request_duration_seconds", "Request latency by route", self.latency)
+            _histogram(lines, "db_queries_per_request", "SQL statements issued per request", self.queries_per_request)
+            _family(lines, "db_queries_total", "counter", "SQL statements issued, by route")
+            for (method, route), count in sorted(self.queries.items()):
+                lines.append(f"db_queries_total{_labels(method=method, route=route)} {count}")
+            lines.append(f"db_queries_total{_labels(method='', route='<background>')} {self.background_queries}")
+            _family(lines, "db_query_seconds_total", "counter", "Time spent executing SQL, by route")
+            for (method, route), seconds in sorted(self.db_seconds.items()):
+                lines.append(f"db_query_seconds_total{_labels(method=method, route=route)} {seconds:.6f}")
+            return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels: str) -> str:
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _family(lines: list, name: str, kind: str, help_text: str):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+
+
+def _histogram(lines: list, name: str, help_text: str, histogram: Histogram):
+    _family(lines, name, "histogram", help_text)
+    for (method, route), series in sorted(histogram.series.items()):
+        cumulative = 0
+        for bound, count in zip((*histogram.buckets, "+Inf"), series):
+            cumulative += count
+            lines.append(f"{name}_bucket{_labels(method=method, route=route, le=str(bound))} {cumulative}")
+        lines.append(f"{name}_sum{_labels(method=method, route=route)} {series[-1]:.6f}")
+        lines.append(f"{name}_count{_labels(method=method, route=route)} {cumulative}")
+
+
+metrics = Metrics()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    tally = _current.get()
+    if tally is None:
+        with metrics.lock:
+            metrics.background_queries += 1
+        return
+    tally.queries += 1
+    tally.db_seconds += time.perf_counter() - context._metrics_started
+
+
+def instrument_engine(sync_engine):
+    """Attribute the engine's queries to the current request (pass `async_engine.sync_engine` for async engines)"""
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+_route_paths: Dict[int, Dict[object, str]] = {}
+
+
+def route_template(scope) -> str:
+    """Path template of the route that handled (or is handling) the request in `scope`"""
+    app = scope["app"]
+    endpoint = scope.get("endpoint")
+    paths = _route_paths.get(id(app))
+    if paths is None or (endpoint is not None and endpoint not in paths):
+        # The router records the matched endpoint in the scope; map it back to its path template.
+        # Rebuilt when a route was included after the first request (STARTUP_LAZY_ROUTERS)
+        paths = _route_paths[id(app)] = {
+            route.endpoint: route.path for route in app.routes if hasattr(route, "endpoint")
+        }
+    return paths.get(endpoint, UNMATCHED)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware: times the whole response, streamed bodies included"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        tally = RequestTally()
+        token = _current.set(tally)
+        status = 500
+        started = time.perf_counter()
+        metrics.request_started()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _current.reset(token)
+            metrics.request_finished(
+                scope["method"], route_template(scope), status, time.perf_counter() - started, tally
+            )
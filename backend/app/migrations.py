@@ -0,0 +1,91 @@
+"""
+Schema migrations for existing databases
+
+`Base.metadata.create_all` only creates missing tables, it never adds
+indexes or columns to tables that already exist. Each migration below is
+applied once and recorded in the `schema_migrations` table.
+
+Usage (creates missing tables first, so it also initializes a new database):
+    python -m app.migrations
+"""
+
+from datetime import datetime
+import logging
+
+from typing import List
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, select
+
+from app.database import Base, engine
+from app.models.appointment import Appointment
+from app.search import create_search_indexes
+from app.booking import create_overlap_guard
+from app.conditional import create_version_tracking
+from app.stats import create_stats_tracking
+from app.archive import create_archive, keep_appointment_ids_unique
+from app.idempotency import create_idempotency_keys
+
+logger = logging.getLogger(__name__)
+
+migrations_table = Table(
+    "schema_migrations",
+    MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("description", String),
+    Column("applied_at", DateTime),
+)
+
+
+def create_appointment_indexes(conn):
+    for index in Appointment.__table__.indexes:
+        index.create(conn, checkfirst=True)
+
+
+# (version, description, callable(connection)); append only
+MIGRATIONS = [
+    (1, "appointments: date, doctor/date, patient/date and status/date indexes", create_appointment_indexes),
+    (2, "full-text search indexes for patients, doctors and services", create_search_indexes),
+    (3, "appointments: reject overlapping bookings of a doctor", create_overlap_guard),
+    (4, "updated_at columns and per-table version counters for conditional GETs", create_version_tracking),
+    (5, "summary tables for dashboard statistics, maintained by triggers", create_stats_tracking),
+    (6, "appointments_archive for completed and cancelled appointments past the archive horizon", create_archive),
+    (7, "idempotency_keys: stored responses of POST requests sent with an Idempotency-Key", create_idempotency_keys),
+    (8, "appointments: AUTOINCREMENT ids on SQLite, so ids of archived appointments are never reused", keep_appointment_ids_unique),
+]
+
+
+def pending_migrations(bind=engine) -> List[int]:
+    """Versions not applied to `bind` yet (all of them for a database never migrated)"""
+    if not inspect(bind).has_table(migrations_table.name):
+        return [version for version, _, _ in MIGRATIONS]
+    with bind.connect() as conn:
+        applied = set(conn.execute(select(migrations_table.c.version)).scalars())
+    return [version for version, _, _ in MIGRATIONS if version not in applied]
+
+
+def upgrade(bind=engine):
+    """Apply every migration that has not been recorded yet"""
+    migrations_table.create(bind, checkfirst=True)
+    with bind.connect() as conn:
+        applied = set(conn.execute(select(migrations_table.c.version)).scalars())
+
+    for version, description, migrate in MIGRATIONS:
+        if version in applied:
+            continue
+        with bind.begin() as conn:
+            migrate(conn)
+            conn.execute(migrations_table.insert().values(
+                version=version, description=description, applied_at=datetime.utcnow()
+            ))
+        logger.info("Applied migration %s: %s", version, description)
+
+
+def init_db(bind=engine):
+    """Create missing tables, then apply pending migrations (also run at startup with STARTUP_MIGRATE=true)"""
+    Base.metadata.create_all(bind=bind)
+    upgrade(bind)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    init_db()
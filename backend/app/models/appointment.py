@@ -1,10 +1,18 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
 
 class Appointment(Base):
     __tablename__ = "appointments"
+    __table_args__ = (
+        Index("ix_appointments_appointment_date", "appointment_date"),
+        Index("ix_appointments_doctor_id_date", "doctor_id", "appointment_date"),
+        Index("ix_appointments_patient_id_date", "patient_id", "appointment_date"),
+        Index("ix_appointments_status_date", "status", "appointment_date"),
+        # Ids are never reused on SQLite either: archived appointments keep theirs (app/archive.py)
+        {"sqlite_autoincrement": True},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     patient_id = Column(Integer, ForeignKey("patients.id"))
@@ -14,6 +22,7 @@ class Appointment(Base):
     status = Column(String, default="scheduled")  # scheduled, completed, cancelled
     notes = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     patient = relationship("Patient", back_populates="appointments")
     doctor = relationship("Doctor", back_populates="appointments")
@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean
 from sqlalchemy.orm import relationship
+from datetime import datetime
 from app.database import Base
 
 class Doctor(Base):
@@ -13,5 +14,6 @@ class Doctor(Base):
     license_number = Column(String, unique=True)
     bio = Column(Text, nullable=True)
     is_active = Column(Boolean, default=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     appointments = relationship("Appointment", back_populates="doctor")
@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, Date, Text, Boolean
+from sqlalchemy import Column, Integer, String, Date, DateTime, Text, Boolean
 from sqlalchemy.orm import relationship
+from datetime import datetime
 from app.database import Base
 
 class Patient(Base):
@@ -15,5 +16,6 @@ class Patient(Base):
     medical_history = Column(Text, nullable=True)
     allergies = Column(Text, nullable=True)
     is_active = Column(Boolean, default=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     appointments = relationship("Appointment", back_populates="patient")
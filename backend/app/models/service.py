@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Text, Float, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Text, Float, Boolean
+from datetime import datetime
 from app.database import Base
 
 class Service(Base):
@@ -10,3 +11,4 @@ class Service(Base):
     price = Column(Float)
     duration_minutes = Column(Integer, default=30)
     is_available = Column(Boolean, default=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,38 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, List, Sequence
+
+from fastapi import HTTPException
+
+
+def encode_cursor(*values: Any) -> str:
+    """Pack the sort key of the last returned row into an opaque URL-safe token"""
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str, *types: type) -> List[Any]:
+    """Unpack a cursor token, converting each value to the expected type"""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError("cursor shape mismatch")
+        return [
+            datetime.fromisoformat(v) if t is datetime else t(v)
+            for v, t in zip(values, types)
+        ]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Курсор жарамсыз")
+
+
+def keyset_page(rows: Sequence[Any], limit: int, key: Callable[[Any], tuple]) -> dict:
+    """
+    Build a page from `limit + 1` fetched rows: the extra row only tells
+    whether another page exists, the cursor points at the last returned row.
+    """
+    items = list(rows[:limit])
+    next_cursor = encode_cursor(*key(items[-1])) if len(rows) > limit else None
+    return {"items": items, "next_cursor": next_cursor}
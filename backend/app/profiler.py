@@ -0,0 +1,153 @@
+"""
+Opt-in slow-query profiler (PROFILER_ENABLED=true)
+
+Every statement run through an instrumented engine is timed; one slower
+than PROFILER_THRESHOLD_MS is kept in a fixed-size ring buffer together
+with its parameters, the route that issued it and its query plan
+(EXPLAIN QUERY PLAN on SQLite, EXPLAIN on PostgreSQL, with ANALYZE for
+SELECTs when PROFILER_EXPLAIN_ANALYZE is set). The plan is taken right
+away on the same connection, so it reflects the data and indexes the
+slow run saw. Captures are served at GET /api/debug/slow-queries.
+
+Parameters are stored as sent and may contain personal data; the
+profiler is meant for short diagnostic sessions, not to stay on.
+"""
+
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import event
+
+from app.config import profiler_settings
+from app.metrics import route_template
+
+# Longest SQL text / parameter repr kept per capture
+MAX_SQL_LENGTH = 4000
+MAX_PARAMETER_LENGTH = 200
+
+EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")
+
+_scope: ContextVar[Optional[dict]] = ContextVar("profiler_scope", default=None)
+
+
+class SlowQueryLog:
+    """Ring buffer of the most recent slow statements"""
+
+    def __init__(self, size: int):
+        self.entries = deque(maxlen=size)
+        self.captured = 0
+        self.lock = threading.Lock()
+
+    def add(self, entry: dict):
+        with self.lock:
+            self.entries.append(entry)
+            self.captured += 1
+
+    def recent(self, limit: Optional[int] = None) -> List[dict]:
+        """Newest first"""
+        with self.lock:
+            entries = list(reversed(self.entries))
+        return entries[:limit] if limit else entries
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+slow_queries = SlowQueryLog(profiler_settings.buffer_size)
+
+
+def _short(value) -> str:
+    text = repr(value)
+    return text if len(text) <= MAX_PARAMETER_LENGTH else text[:MAX_PARAMETER_LENGTH] + "..."
+
+
+def _parameters(parameters, executemany: bool):
+    if executemany:
+        # Only the first row of a batch, plus how many there were
+        rows = list(parameters)
+        return {"rows": len(rows), "first": _parameters(rows[0], False) if rows else None}
+    if isinstance(parameters, dict):
+        return {key: _short(value) for key, value in parameters.items()}
+    return [_short(value) for value in parameters or ()]
+
+
+def explain(conn, statement: str, parameters, executemany: bool) -> Optional[List[str]]:
+    """Query plan of `statement` as lines of text, or None for statements that have none"""
+    verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    if verb not in EXPLAINABLE:
+        return None
+    if executemany:
+        parameters = next(iter(parameters), ())
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        prefix = "EXPLAIN QUERY PLAN "
+    elif dialect == "postgresql":
+        # ANALYZE runs the statement again; never do that for writes
+        analyze = profiler_settings.explain_analyze and verb in ("SELECT", "WITH")
+        prefix = "EXPLAIN (ANALYZE, BUFFERS) " if analyze else "EXPLAIN "
+    else:
+        prefix = "EXPLAIN "
+    try:
+        rows = conn.exec_driver_sql(prefix + statement, parameters, execution_options={"profiler_explain": True})
+        if dialect == "sqlite":
+            # (id, parent, notused, detail)
+            return [row[-1] for row in rows]
+        return [row[0] for row in rows]
+    except Exception as e:
+        return [f"EXPLAIN failed: {e}"]
+
+
+def is_full_scan(plan_line: str) -> bool:
+    """SQLite `SCAN table` (virtual tables such as FTS use their own index) or PostgreSQL `Seq Scan`"""
+    line = plan_line.strip()
+    return (line.startswith("SCAN ") and "VIRTUAL TABLE" not in line) or "Seq Scan" in line
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._profiler_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._profiler_started
+    if elapsed * 1000 < profiler_settings.threshold_ms or context.execution_options.get("profiler_explain"):
+        return
+    scope = _scope.get()
+    plan = explain(conn, statement, parameters, executemany)
+    slow_queries.add({
+        "at": datetime.utcnow().isoformat(timespec="milliseconds"),
+        "duration_ms": round(elapsed * 1000, 3),
+        "method": scope["method"] if scope else None,
+        "route": route_template(scope) if scope else None,
+        "sql": statement[:MAX_SQL_LENGTH],
+        "parameters": _parameters(parameters, executemany),
+        "plan": plan,
+        "full_scan": any(is_full_scan(line) for line in plan or ()),
+    })
+
+
+def instrument_engine(sync_engine):
+    """Time every statement of the engine (pass `async_engine.sync_engine` for async engines)"""
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class ProfilerMiddleware:
+    """Makes the request visible to the cursor hooks, which label captures with its route"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = _scope.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _scope.reset(token)
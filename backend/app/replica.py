@@ -0,0 +1,185 @@
+"""
+Read-replica routing for GET endpoints
+
+With READ_DATABASE_URL set, GET handlers take their session from
+`get_read_db`, which uses a read-only engine on the replica; writes keep
+`get_db` and the primary. Without it both are the primary.
+
+Read-your-writes: after a successful POST/PUT/PATCH/DELETE,
+ReadYourWritesMiddleware reads the primary's table versions (the
+`table_versions` counters of app/conditional.py, which replicate with the
+data) and hands them to the client as a cookie and an X-Read-After header.
+While that token is present (REPLICA_READ_YOUR_WRITES_SECONDS), a read
+first compares it with the replica's versions on the replica connection
+it is about to use, one primary-key lookup; if the replica has not caught
+up yet the request is served by the primary. Clients that have not
+written anything recently pay nothing extra. A replica that cannot be
+reached is skipped the same way.
+
+Reference data cached by app/cache.py is still loaded from the primary:
+the cache is invalidated on writes, and a reload from a lagging replica
+would keep the old value for the whole TTL.
+
+For local testing the replica can be a second SQLite file, refreshed from
+the primary on demand:
+
+    READ_DATABASE_URL=sqlite:///./replica.db python -m app.replica sync
+"""
+
+import logging
+import re
+import sqlite3
+import sys
+from typing import Dict, Optional
+
+from fastapi import Request
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.conditional import VERSIONED_TABLES, load_versions
+from app.config import replica_settings
+from app.database import AsyncSessionLocal, DATABASE_URL, READ_DATABASE_URL, ReadSessionLocal, get_db
+
+logger = logging.getLogger(__name__)
+
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+_TOKEN = re.compile(r"^[a-z_]+\.\d+(-[a-z_]+\.\d+)*$")
+
+
+def encode_token(versions: Dict[str, int]) -> str:
+    return "-".join(f"{table}.{version}" for table, version in versions.items())
+
+
+def decode_token(value: Optional[str]) -> Dict[str, int]:
+    """Table versions from a read-after token; an empty dict for a missing or malformed one"""
+    if not value or not _TOKEN.match(value):
+        return {}
+    versions = {}
+    for part in value.split("-"):
+        table, version = part.split(".")
+        if table in VERSIONED_TABLES:
+            versions[table] = int(version)
+    return versions
+
+
+class RoutingStats:
+    """Where reads went: the replica, or the primary because the replica lagged or failed"""
+
+    def __init__(self):
+        self.replica = 0
+        self.primary_lagging = 0
+        self.primary_unavailable = 0
+
+    def snapshot(self) -> dict:
+        return {
+            "configured": ReadSessionLocal is not None,
+            "replica": self.replica,
+            "primary_lagging": self.primary_lagging,
+            "primary_unavailable": self.primary_unavailable,
+        }
+
+
+routing_stats = RoutingStats()
+
+
+async def open_replica_session(request: Request) -> Optional[AsyncSession]:
+    """A replica session that has the client's own writes, or None when the primary has to serve the read"""
+    if ReadSessionLocal is None:
+        return None
+    written = decode_token(
+        request.headers.get("x-read-after") or request.cookies.get(replica_settings.cookie_name)
+    )
+    db = ReadSessionLocal()
+    try:
+        await db.connection()
+        if written:
+            current = await load_versions(db, written)
+            if any(current[table] < version for table, version in written.items()):
+                routing_stats.primary_lagging += 1
+                await db.close()
+                return None
+    except Exception as e:
+        logger.warning("Replica unavailable, reading from the primary: %s", e)
+        routing_stats.primary_unavailable += 1
+        await db.close()
+        return None
+    routing_stats.replica += 1
+    return db
+
+
+# Dependency
+async def get_read_db(request: Request):
+    db = await open_replica_session(request)
+    if db is None:
+        async for db in get_db():
+            yield db
+        return
+    async with db:
+        yield db
+
+
+async def read_sessionmaker(request: Request) -> async_sessionmaker:
+    """Session factory for streamed reads that open their own session (exports)"""
+    db = await open_replica_session(request)
+    if db is None:
+        return AsyncSessionLocal
+    await db.close()
+    return ReadSessionLocal
+
+
+class ReadYourWritesMiddleware:
+    """Pure ASGI middleware: gives clients the primary's table versions after each successful write"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in WRITE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_versions(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                try:
+                    # The handler has committed by now, so these versions include its write
+                    async with AsyncSessionLocal() as db:
+                        token = encode_token(await load_versions(db, VERSIONED_TABLES))
+                except Exception as e:
+                    logger.warning("Could not read table versions after a write: %s", e)
+                else:
+                    cookie = (
+                        f"{replica_settings.cookie_name}={token}; Max-Age={replica_settings.read_your_writes_seconds}; "
+                        "Path=/; HttpOnly; SameSite=Lax"
+                    )
+                    message["headers"] = [
+                        *message.get("headers", []),
+                        (b"set-cookie", cookie.encode()),
+                        (b"x-read-after", token.encode()),
+                    ]
+            await send(message)
+
+        await self.app(scope, receive, send_with_versions)
+
+
+def sync_sqlite_replica(primary_url: str = DATABASE_URL, replica_url: Optional[str] = READ_DATABASE_URL) -> int:
+    """Copy the primary SQLite file onto the replica file (online backup); returns the pages copied"""
+    if not replica_url:
+        raise ValueError("READ_DATABASE_URL is not set")
+    primary, replica = make_url(primary_url), make_url(replica_url)
+    if primary.get_backend_name() != "sqlite" or replica.get_backend_name() != "sqlite":
+        raise ValueError("sync only copies SQLite files; use the database's own replication otherwise")
+    source = sqlite3.connect(primary.database)
+    target = sqlite3.connect(replica.database)
+    try:
+        source.backup(target)
+        return target.execute("PRAGMA page_count").fetchone()[0]
+    finally:
+        source.close()
+        target.close()
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["sync"]:
+        sys.exit("usage: python -m app.replica sync")
+    print(f"Реплика жаңартылды: {sync_sqlite_replica()} бет")
@@ -1,27 +1,151 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from typing import List
-from datetime import datetime
+from fastapi import APIRouter, Body, Depends, HTTPException, Request, Response, status, Query
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import selectinload
+from sqlalchemy.exc import IntegrityError
+from typing import Any, List, NamedTuple, Optional, Union
+from datetime import datetime, timedelta
 import logging
 
 from app.database import get_db
+from app.replica import get_read_db, read_sessionmaker
 from app.models.appointment import Appointment as AppointmentModel
 from app.models.patient import Patient as PatientModel
 from app.models.doctor import Doctor as DoctorModel
-from app.schemas.appointment import Appointment, AppointmentCreate, AppointmentUpdate
+from app.schemas.appointment import (
+    Appointment, AppointmentCreate, AppointmentUpdate, AppointmentBulkUpdate, AppointmentExpanded
+)
+from app.schemas.bulk import BulkResult
+from app.schemas.page import Page
+from app.pagination import decode_cursor, keyset_page
+from app.export import conditional_export
+from app.archive import ARCHIVE_TABLE, appointment_source
+from app.columnar import ETAG_VARIANTS, columnar_encoding, columnar_response
+from app.conditional import check_row, check_stored_row, check_tables
+from app.availability import is_slot_taken, load_busy
+from app.booking import is_overlap_error
+from app.bulk import (
+    BATCH_CONFLICT, IN_CHUNK_SIZE, BulkReport, check_update_targets, existing_values,
+    insert_many, update_fields, update_many, validate_batch
+)
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-@router.get("/", response_model=List[Appointment])
+SLOT_TAKEN_DETAIL = "Дәрігердің бұл уақыты бос емес"
+
+# Changing any of these can make an appointment overlap another booking
+RESCHEDULING_FIELDS = {"appointment_date", "duration_minutes", "status"}
+
+def filter_appointments(
+    query,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    doctor_id: Optional[int] = None,
+    patient_id: Optional[int] = None,
+    statuses: Optional[List[str]] = None,
+    source=AppointmentModel,
+):
+    """
+    Apply the list filters to an appointments query. Each combination is
+    covered by one of the composite indexes on Appointment:
+    (doctor_id, appointment_date), (patient_id, appointment_date),
+    (status, appointment_date) or (appointment_date). `source` is the
+    entity the query selects from (see app/archive.py)
+    """
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(status_code=400, detail="date_from мәні date_to мәнінен кейін болмауы керек")
+    if doctor_id is not None:
+        query = query.where(source.doctor_id == doctor_id)
+    if patient_id is not None:
+        query = query.where(source.patient_id == patient_id)
+    if statuses:
+        query = query.where(source.status.in_(statuses))
+    if date_from:
+        query = query.where(source.appointment_date >= date_from)
+    if date_to:
+        query = query.where(source.appointment_date < date_to)
+    return query
+
+def parse_statuses(statuses: Optional[List[str]], status_filter: Optional[str] = None) -> List[str]:
+    """Accept both repeated (?status=a&status=b) and comma separated (?status=a,b) values"""
+    values = list(statuses or [])
+    if status_filter:
+        values.append(status_filter)
+    return [s.strip() for value in values for s in value.split(",") if s.strip()]
+
+# ?expand= name -> related model and the columns its summary needs
+EXPANDABLE = {
+    "patient": (PatientModel, (PatientModel.id, PatientModel.first_name, PatientModel.last_name)),
+    "doctor": (DoctorModel, (DoctorModel.id, DoctorModel.name, DoctorModel.specialization)),
+}
+
+def tables_for(*tables: str, expand: List[str] = (), include_archived: bool = False) -> List[str]:
+    """Tables whose version the response depends on (for its ETag)"""
+    archived = [ARCHIVE_TABLE] if include_archived else []
+    return list(dict.fromkeys([*tables, *archived, *(f"{name}s" for name in expand)]))
+
+def parse_expand(values: Optional[List[str]]) -> List[str]:
+    """Accept ?expand=patient,doctor as well as repeated ?expand= parameters"""
+    names = list(dict.fromkeys(n.strip() for value in values or [] for n in value.split(",") if n.strip()))
+    unknown = [n for n in names if n not in EXPANDABLE]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"expand мәні жарамсыз: {', '.join(unknown)}")
+    return names
+
+def expand_options(expand: List[str], source=AppointmentModel):
+    """One extra SELECT ... WHERE id IN (...) per expanded relation, whatever the page size"""
+    return [selectinload(getattr(source, name)).load_only(*EXPANDABLE[name][1]) for name in expand]
+
+def columnar_select(query, expand: List[str], source=AppointmentModel):
+    """
+    The list query reduced to plain columns for a columnar page: every
+    appointment column, then "<relation>.<field>" for each expanded
+    relation, joined in the same query. Returns (query, column names)
+    """
+    columns = [getattr(source, column.key).label(column.name) for column in AppointmentModel.__table__.columns]
+    joins = []
+    for name in expand:
+        model, fields = EXPANDABLE[name]
+        joins.append((model, getattr(source, name)))
+        columns.extend(field.label(f"{name}.{field.key}") for field in fields)
+    query = query.with_only_columns(*columns)
+    for model, relationship in joins:
+        query = query.outerjoin(model, relationship)
+    return query, [column.name for column in columns]
+
+def present(appointments, expand: List[str]) -> List[AppointmentExpanded]:
+    """Response items; relations that were not requested are never touched (and not lazy-loaded)"""
+    return [
+        AppointmentExpanded(
+            **Appointment.model_validate(a).model_dump(),
+            **{name: getattr(a, name) for name in expand},
+        )
+        for a in appointments
+    ]
+
+@router.get(
+    "/",
+    response_model=Union[List[AppointmentExpanded], Page[AppointmentExpanded]],
+    response_model_exclude_unset=True,
+)
 async def get_appointments(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     status_filter: str = Query(None),
-    db: Session = Depends(get_db)
+    statuses: Optional[List[str]] = Query(None, alias="status"),
+    date_from: Optional[datetime] = Query(None),
+    date_to: Optional[datetime] = Query(None),
+    doctor_id: Optional[int] = Query(None),
+    patient_id: Optional[int] = Query(None),
+    cursor: Optional[str] = Query(None),
+    expand: Optional[List[str]] = Query(None),
+    format: Optional[str] = Query(None, pattern="^columnar$"),
+    include_archived: bool = Query(False),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get all appointments with optional filtering
@@ -30,46 +154,160 @@ async def get_appointments(
     - skip: Number of records to skip
     - limit: Maximum number of records to return
     - status_filter: Filter by status (scheduled, completed, cancelled)
+    - status: Filter by one or more statuses (repeat the parameter or separate with commas)
+    - date_from: Appointments on or after this moment
+    - date_to: Appointments before this moment
+    - doctor_id: Filter by doctor
+    - patient_id: Filter by patient
+    - cursor: Keyset pagination token over (appointment_date, id); pass an empty
+      value for the first page. The response becomes {"items": [...], "next_cursor": ...}
+      and `skip` is ignored
+    - expand: Embed summaries of related records: patient, doctor or both
+      (comma separated), loaded with one extra query each
+    - format: columnar for {"count", "columns": {name: [values]}, "next_cursor"}
+      instead of one object per row (also sent for Accept: application/msgpack)
+    - include_archived: Also return archived (old completed and cancelled) appointments
     """
     try:
-        query = db.query(AppointmentModel)
+        expand = parse_expand(expand)
+        encoding = columnar_encoding(request, response, format)
+        unchanged = await check_tables(
+            request, response, db, *tables_for("appointments", expand=expand, include_archived=include_archived),
+            variant=ETAG_VARIANTS[encoding],
+        )
+        if unchanged:
+            return unchanged
         
-        if status_filter:
-            query = query.filter(AppointmentModel.status == status_filter)
+        source = appointment_source(include_archived)
+        query = filter_appointments(
+            select(source),
+            date_from=date_from,
+            date_to=date_to,
+            doctor_id=doctor_id,
+            patient_id=patient_id,
+            statuses=parse_statuses(statuses, status_filter),
+            source=source,
+        )
         
-        appointments = query.order_by(AppointmentModel.appointment_date).offset(skip).limit(limit).all()
-        logger.info(f"Retrieved {len(appointments)} appointments")
-        return appointments
+        query = query.order_by(source.appointment_date, source.id)
+        if encoding:
+            query, columns = columnar_select(query, expand, source)
+        else:
+            query = query.options(*expand_options(expand, source))
+        
+        if cursor is None:
+            result = await db.execute(query.offset(skip).limit(limit))
+            if encoding:
+                rows = result.all()
+                logger.info("Retrieved %s appointments", len(rows))
+                return columnar_response(columns, rows, encoding, response)
+            appointments = result.scalars().all()
+            logger.info("Retrieved %s appointments", len(appointments))
+            return present(appointments, expand)
+        
+        if cursor:
+            last_date, last_id = decode_cursor(cursor, datetime, int)
+            query = query.where(tuple_(source.appointment_date, source.id) > (last_date, last_id))
+        
+        result = await db.execute(query.limit(limit + 1))
+        rows = result.all() if encoding else result.scalars().all()
+        page = keyset_page(rows, limit, lambda a: (a.appointment_date, a.id))
+        logger.info("Retrieved %s appointments", len(page['items']))
+        if encoding:
+            return columnar_response(columns, page["items"], encoding, response, next_cursor=page["next_cursor"])
+        return {**page, "items": present(page["items"], expand)}
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error retrieving appointments: {str(e)}")
+        logger.error("Error retrieving appointments: %s", e)
         raise HTTPException(status_code=500, detail="Тағайындарды алуда қате орын алды")
 
+@router.get("/export")
+async def export_appointments(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    status_filter: str = Query(None),
+    statuses: Optional[List[str]] = Query(None, alias="status"),
+    date_from: Optional[datetime] = Query(None),
+    date_to: Optional[datetime] = Query(None),
+    doctor_id: Optional[int] = Query(None),
+    patient_id: Optional[int] = Query(None),
+    include_archived: bool = Query(False),
+    sessions: async_sessionmaker = Depends(read_sessionmaker),
+):
+    """
+    Stream appointments as NDJSON or CSV, ordered by (appointment_date, id)
+    
+    Parameters:
+    - format: ndjson (default) or csv
+    - status, status_filter, date_from, date_to, doctor_id, patient_id, include_archived:
+      same filters as the list endpoint
+    """
+    source = appointment_source(include_archived)
+    query = filter_appointments(
+        select(*(getattr(source, column.key).label(column.name) for column in AppointmentModel.__table__.columns)),
+        date_from=date_from,
+        date_to=date_to,
+        doctor_id=doctor_id,
+        patient_id=patient_id,
+        statuses=parse_statuses(statuses, status_filter),
+        source=source,
+    )
+    logger.info("Exporting appointments")
+    return await conditional_export(
+        request, query.order_by(source.appointment_date, source.id), format,
+        "appointments", tables_for("appointments", include_archived=include_archived), sessions
+    )
+
 @router.get("/{appointment_id}", response_model=Appointment)
-async def get_appointment(appointment_id: int, db: Session = Depends(get_db)):
-    """Get a specific appointment by ID"""
+async def get_appointment(
+    appointment_id: int,
+    request: Request,
+    response: Response,
+    include_archived: bool = Query(False),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Get a specific appointment by ID
+    
+    Parameters:
+    - include_archived: Also look in the archive
+    """
     try:
-        appointment = db.query(AppointmentModel).filter(AppointmentModel.id == appointment_id).first()
+        sources = [AppointmentModel, appointment_source(True)] if include_archived else [AppointmentModel]
+        unchanged = await check_stored_row(request, response, db, "appointments", appointment_id, *sources)
+        if unchanged:
+            return unchanged
+        appointment = await db.get(AppointmentModel, appointment_id)
+        if not appointment and include_archived:
+            archived = appointment_source(True)
+            appointment = await db.scalar(select(archived).where(archived.id == appointment_id))
         if not appointment:
             raise HTTPException(status_code=404, detail="Тағайын табылмады")
-        logger.info(f"Retrieved appointment with ID {appointment_id}")
+        unchanged = check_row(request, response, "appointments", appointment_id, appointment.updated_at)
+        if unchanged:
+            return unchanged
+        logger.info("Retrieved appointment with ID %s", appointment_id)
         return appointment
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error retrieving appointment {appointment_id}: {str(e)}")
+        logger.error("Error retrieving appointment %s: %s", appointment_id, e)
         raise HTTPException(status_code=500, detail="Тағайынды алуда қате орын алды")
 
 @router.post("/", response_model=Appointment, status_code=status.HTTP_201_CREATED)
-async def create_appointment(appointment: AppointmentCreate, db: Session = Depends(get_db)):
+async def create_appointment(appointment: AppointmentCreate, db: AsyncSession = Depends(get_db)):
     """Create a new appointment"""
     try:
         # Validate patient exists
-        patient = db.query(PatientModel).filter(PatientModel.id == appointment.patient_id).first()
+        patient = await db.get(PatientModel, appointment.patient_id)
         if not patient:
             raise HTTPException(status_code=404, detail="Пациент табылмады")
         
-        # Validate doctor exists
-        doctor = db.query(DoctorModel).filter(DoctorModel.id == appointment.doctor_id).first()
+        # Validate doctor exists; on PostgreSQL the row lock serializes bookings per doctor
+        doctor = await db.scalar(
+            select(DoctorModel).where(DoctorModel.id == appointment.doctor_id).with_for_update()
+        )
         if not doctor:
             raise HTTPException(status_code=404, detail="Дәрігер табылмады")
         
@@ -77,108 +315,354 @@ async def create_appointment(appointment: AppointmentCreate, db: Session = Depen
         if appointment.appointment_date < datetime.now():
             raise HTTPException(status_code=400, detail="Тағайын күні болашақта болуы керек")
         
+        # Reject overlapping bookings (the database guard covers concurrent requests)
+        if await is_slot_taken(db, appointment.doctor_id, appointment.appointment_date, appointment.duration_minutes):
+            raise HTTPException(status_code=409, detail=SLOT_TAKEN_DETAIL)
+        
         db_appointment = AppointmentModel(**appointment.dict())
         db.add(db_appointment)
-        db.commit()
-        db.refresh(db_appointment)
-        logger.info(f"Created new appointment with ID {db_appointment.id}")
+        await db.commit()
+        await db.refresh(db_appointment)
+        logger.info("Created new appointment with ID %s", db_appointment.id)
         return db_appointment
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
-        logger.error(f"Error creating appointment: {str(e)}")
+        if is_overlap_error(e):
+            await db.rollback()
+            raise HTTPException(status_code=409, detail=SLOT_TAKEN_DETAIL)
+        await db.rollback()
+        logger.error("Error creating appointment: %s", e)
         raise HTTPException(status_code=500, detail="Тағайын құруда қате орын алды")
 
 @router.put("/{appointment_id}", response_model=Appointment)
-async def update_appointment(appointment_id: int, appointment: AppointmentUpdate, db: Session = Depends(get_db)):
+async def update_appointment(appointment_id: int, appointment: AppointmentUpdate, db: AsyncSession = Depends(get_db)):
     """Update an appointment"""
     try:
-        db_appointment = db.query(AppointmentModel).filter(AppointmentModel.id == appointment_id).first()
+        db_appointment = await db.get(AppointmentModel, appointment_id)
         if not db_appointment:
             raise HTTPException(status_code=404, detail="Тағайын табылмады")
         
-        # Validate patient if being updated
-        if appointment.patient_id:
-            patient = db.query(PatientModel).filter(PatientModel.id == appointment.patient_id).first()
-            if not patient:
-                raise HTTPException(status_code=404, detail="Пациент табылмады")
-        
-        # Validate doctor if being updated
-        if appointment.doctor_id:
-            doctor = db.query(DoctorModel).filter(DoctorModel.id == appointment.doctor_id).first()
-            if not doctor:
-                raise HTTPException(status_code=404, detail="Дәрігер табылмады")
-        
         update_data = appointment.dict(exclude_unset=True)
         for field, value in update_data.items():
             setattr(db_appointment, field, value)
         
+        # Rescheduling or re-activating must not overlap another booking
+        if RESCHEDULING_FIELDS & update_data.keys() and db_appointment.status != "cancelled":
+            if await is_slot_taken(
+                db, db_appointment.doctor_id, db_appointment.appointment_date,
+                db_appointment.duration_minutes, exclude_id=appointment_id
+            ):
+                raise HTTPException(status_code=409, detail=SLOT_TAKEN_DETAIL)
+        
         db.add(db_appointment)
-        db.commit()
-        db.refresh(db_appointment)
-        logger.info(f"Updated appointment with ID {appointment_id}")
+        await db.commit()
+        await db.refresh(db_appointment)
+        logger.info("Updated appointment with ID %s", appointment_id)
         return db_appointment
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
-        logger.error(f"Error updating appointment {appointment_id}: {str(e)}")
+        if is_overlap_error(e):
+            await db.rollback()
+            raise HTTPException(status_code=409, detail=SLOT_TAKEN_DETAIL)
+        await db.rollback()
+        logger.error("Error updating appointment %s: %s", appointment_id, e)
         raise HTTPException(status_code=500, detail="Тағайынды өндіктеуде қате орын алды")
 
 @router.delete("/{appointment_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_appointment(appointment_id: int, db: Session = Depends(get_db)):
+async def delete_appointment(appointment_id: int, db: AsyncSession = Depends(get_db)):
     """Delete an appointment"""
     try:
-        db_appointment = db.query(AppointmentModel).filter(AppointmentModel.id == appointment_id).first()
+        db_appointment = await db.get(AppointmentModel, appointment_id)
         if not db_appointment:
             raise HTTPException(status_code=404, detail="Тағайын табылмады")
         
-        db.delete(db_appointment)
-        db.commit()
-        logger.info(f"Deleted appointment with ID {appointment_id}")
+        await db.delete(db_appointment)
+        await db.commit()
+        logger.info("Deleted appointment with ID %s", appointment_id)
         return None
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
-        logger.error(f"Error deleting appointment {appointment_id}: {str(e)}")
+        await db.rollback()
+        logger.error("Error deleting appointment %s: %s", appointment_id, e)
         raise HTTPException(status_code=500, detail="Тағайынды өшіруде қате орын алды")
 
-@router.get("/doctor/{doctor_id}", response_model=List[Appointment])
-async def get_doctor_appointments(doctor_id: int, db: Session = Depends(get_db)):
-    """Get all appointments for a specific doctor"""
+def appointment_end(start: datetime, duration_minutes: Optional[int]) -> datetime:
+    return start + timedelta(minutes=duration_minutes or 30)
+
+class PlannedUpdate(NamedTuple):
+    """Final state of one bulk update item"""
+    index: int
+    id: int
+    fields: dict
+    doctor_id: int
+    start: datetime
+    end: datetime
+    status: str
+    active: bool
+    moved: bool
+
+@router.post("/bulk", response_model=BulkResult)
+async def bulk_create_appointments(items: List[Any] = Body(...), db: AsyncSession = Depends(get_db)):
+    """
+    Create many appointments in one transaction
+    
+    Patients and doctors are checked with one IN query each, and overlaps are
+    checked against the doctors' existing bookings (one query) and against
+    earlier items of the same batch.
+    """
+    try:
+        report = BulkReport(len(items))
+        valid = validate_batch(items, AppointmentCreate, report)
+        patients = await existing_values(db, PatientModel.id, (a.patient_id for _, a in valid))
+        doctors = await existing_values(db, DoctorModel.id, (a.doctor_id for _, a in valid))
+        now = datetime.now()
+        
+        candidates = []
+        for index, appointment in valid:
+            if appointment.patient_id not in patients:
+                report.fail(index, "Пациент табылмады")
+            elif appointment.doctor_id not in doctors:
+                report.fail(index, "Дәрігер табылмады")
+            elif appointment.appointment_date < now:
+                report.fail(index, "Тағайын күні болашақта болуы керек")
+            else:
+                candidates.append((index, appointment))
+        
+        busy = {}
+        if candidates:
+            busy = await load_busy(
+                db,
+                {a.doctor_id for _, a in candidates},
+                min(a.appointment_date for _, a in candidates),
+                max(appointment_end(a.appointment_date, a.duration_minutes) for _, a in candidates),
+            )
+        accepted = []
+        for index, appointment in candidates:
+            start = appointment.appointment_date
+            end = appointment_end(start, appointment.duration_minutes)
+            if busy[appointment.doctor_id].overlaps(start, end):
+                report.fail(index, SLOT_TAKEN_DETAIL)
+                continue
+            busy[appointment.doctor_id].add(start, end)
+            accepted.append((index, appointment))
+        
+        ids = await insert_many(db, AppointmentModel, [appointment.dict() for _, appointment in accepted])
+        await db.commit()
+        for (index, _), appointment_id in zip(accepted, ids):
+            report.ok(index, appointment_id)
+        result = report.build()
+        logger.info("Bulk created %s appointments, rejected %s", result.succeeded, result.failed)
+        return result
+    except HTTPException:
+        raise
+    except IntegrityError as e:
+        await db.rollback()
+        logger.error("Bulk appointment insert conflicted: %s", e)
+        raise HTTPException(status_code=409, detail=BATCH_CONFLICT)
+    except Exception as e:
+        await db.rollback()
+        logger.error("Error bulk creating appointments: %s", e)
+        raise HTTPException(status_code=500, detail="Тағайындарды топтап құруда қате орын алды")
+
+@router.patch("/bulk", response_model=BulkResult)
+async def bulk_update_appointments(items: List[Any] = Body(...), db: AsyncSession = Depends(get_db)):
+    """
+    Update many appointments (each item carries its `id`) in one transaction
+    
+    Rescheduled or re-activated items must not overlap other bookings of the
+    doctor, including the final state of the other items in the batch.
+    """
+    try:
+        report = BulkReport(len(items))
+        valid = validate_batch(items, AppointmentBulkUpdate, report)
+        await check_update_targets(db, AppointmentModel, valid, report, "Тағайын табылмады")
+        valid = [(index, item) for index, item in valid if not report.failed(index)]
+        
+        current = {}
+        ids = [item.id for _, item in valid]
+        for offset in range(0, len(ids), IN_CHUNK_SIZE):
+            result = await db.execute(
+                select(AppointmentModel).where(AppointmentModel.id.in_(ids[offset:offset + IN_CHUNK_SIZE]))
+            )
+            current.update((a.id, a) for a in result.scalars())
+        
+        planned = []
+        for index, item in valid:
+            fields = update_fields(item)
+            existing = current[item.id]
+            start = fields.get("appointment_date", existing.appointment_date)
+            duration = fields.get("duration_minutes", existing.duration_minutes)
+            final_status = fields.get("status", existing.status)
+            active = final_status != "cancelled"
+            planned.append(PlannedUpdate(
+                index=index,
+                id=item.id,
+                fields=fields,
+                doctor_id=existing.doctor_id,
+                start=start,
+                end=appointment_end(start, duration),
+                status=final_status,
+                active=active,
+                moved=active and bool(RESCHEDULING_FIELDS & fields.keys()),
+            ))
+        
+        busy = {}
+        active_plans = [plan for plan in planned if plan.active]
+        if active_plans:
+            busy = await load_busy(
+                db,
+                {plan.doctor_id for plan in active_plans},
+                min(plan.start for plan in active_plans),
+                max(plan.end for plan in active_plans),
+                exclude_ids=ids,
+            )
+        # Unmoved rows keep their time; moved rows are placed around them in batch order
+        for plan in active_plans:
+            if not plan.moved:
+                busy[plan.doctor_id].add(plan.start, plan.end)
+        accepted = []
+        for plan in planned:
+            if plan.moved:
+                if busy[plan.doctor_id].overlaps(plan.start, plan.end):
+                    report.fail(plan.index, SLOT_TAKEN_DETAIL)
+                    continue
+                busy[plan.doctor_id].add(plan.start, plan.end)
+            accepted.append(plan)
+        
+        # The overlap guard checks every row as it is written, so free time first:
+        # unmoved rows (including cancellations), then park the moved rows as
+        # cancelled and finally write their new times. Every intermediate state
+        # is then a subset of the validated final one.
+        moved = [plan for plan in accepted if plan.moved]
+        await update_many(db, AppointmentModel, [
+            {"id": plan.id, **plan.fields} for plan in accepted if plan.fields and not plan.moved
+        ])
+        await update_many(db, AppointmentModel, [{"id": plan.id, "status": "cancelled"} for plan in moved])
+        await update_many(db, AppointmentModel, [
+            {"id": plan.id, **plan.fields, "status": plan.status} for plan in moved
+        ])
+        await db.commit()
+        for plan in accepted:
+            report.ok(plan.index, plan.id)
+        result = report.build()
+        logger.info("Bulk updated %s appointments, rejected %s", result.succeeded, result.failed)
+        return result
+    except HTTPException:
+        raise
+    except IntegrityError as e:
+        await db.rollback()
+        logger.error("Bulk appointment update conflicted: %s", e)
+        raise HTTPException(status_code=409, detail=BATCH_CONFLICT)
+    except Exception as e:
+        await db.rollback()
+        logger.error("Error bulk updating appointments: %s", e)
+        raise HTTPException(status_code=500, detail="Тағайындарды топтап өндіктеуде қате орын алды")
+
+@router.get("/doctor/{doctor_id}", response_model=List[AppointmentExpanded], response_model_exclude_unset=True)
+async def get_doctor_appointments(
+    doctor_id: int,
+    request: Request,
+    response: Response,
+    expand: Optional[List[str]] = Query(None),
+    format: Optional[str] = Query(None, pattern="^columnar$"),
+    include_archived: bool = Query(False),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Get all appointments for a specific doctor
+    
+    Parameters:
+    - expand: Embed patient and/or doctor summaries (comma separated)
+    - format: columnar for {"count", "columns": {name: [values]}} (also sent for Accept: application/msgpack)
+    - include_archived: Also return archived (old completed and cancelled) appointments
+    """
     try:
-        doctor = db.query(DoctorModel).filter(DoctorModel.id == doctor_id).first()
+        expand = parse_expand(expand)
+        encoding = columnar_encoding(request, response, format)
+        unchanged = await check_tables(
+            request, response, db, *tables_for("appointments", "doctors", expand=expand, include_archived=include_archived),
+            variant=ETAG_VARIANTS[encoding],
+        )
+        if unchanged:
+            return unchanged
+        
+        doctor = await db.get(DoctorModel, doctor_id)
         if not doctor:
             raise HTTPException(status_code=404, detail="Дәрігер табылмады")
         
-        appointments = db.query(AppointmentModel).filter(
-            AppointmentModel.doctor_id == doctor_id
-        ).order_by(AppointmentModel.appointment_date).all()
-        logger.info(f"Retrieved {len(appointments)} appointments for doctor {doctor_id}")
-        return appointments
+        source = appointment_source(include_archived)
+        query = select(source).where(
+            source.doctor_id == doctor_id
+        ).order_by(source.appointment_date, source.id)
+        
+        if encoding:
+            query, columns = columnar_select(query, expand, source)
+            rows = (await db.execute(query)).all()
+            logger.info("Retrieved %s appointments for doctor %s", len(rows), doctor_id)
+            return columnar_response(columns, rows, encoding, response)
+        
+        result = await db.execute(query.options(*expand_options(expand, source)))
+        appointments = result.scalars().all()
+        logger.info("Retrieved %s appointments for doctor %s", len(appointments), doctor_id)
+        return present(appointments, expand)
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error retrieving appointments for doctor {doctor_id}: {str(e)}")
+        logger.error("Error retrieving appointments for doctor %s: %s", doctor_id, e)
         raise HTTPException(status_code=500, detail="Дәрігер тағайындарын алуда қате орын алды")
 
-@router.get("/patient/{patient_id}", response_model=List[Appointment])
-async def get_patient_appointments(patient_id: int, db: Session = Depends(get_db)):
-    """Get all appointments for a specific patient"""
+@router.get("/patient/{patient_id}", response_model=List[AppointmentExpanded], response_model_exclude_unset=True)
+async def get_patient_appointments(
+    patient_id: int,
+    request: Request,
+    response: Response,
+    expand: Optional[List[str]] = Query(None),
+    format: Optional[str] = Query(None, pattern="^columnar$"),
+    include_archived: bool = Query(False),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Get all appointments for a specific patient
+    
+    Parameters:
+    - expand: Embed patient and/or doctor summaries (comma separated)
+    - format: columnar for {"count", "columns": {name: [values]}} (also sent for Accept: application/msgpack)
+    - include_archived: Also return archived (old completed and cancelled) appointments
+    """
     try:
-        patient = db.query(PatientModel).filter(PatientModel.id == patient_id).first()
+        expand = parse_expand(expand)
+        encoding = columnar_encoding(request, response, format)
+        unchanged = await check_tables(
+            request, response, db, *tables_for("appointments", "patients", expand=expand, include_archived=include_archived),
+            variant=ETAG_VARIANTS[encoding],
+        )
+        if unchanged:
+            return unchanged
+        
+        patient = await db.get(PatientModel, patient_id)
         if not patient:
             raise HTTPException(status_code=404, detail="Пациент табылмады")
         
-        appointments = db.query(AppointmentModel).filter(
-            AppointmentModel.patient_id == patient_id
-        ).order_by(AppointmentModel.appointment_date).all()
-        logger.info(f"Retrieved {len(appointments)} appointments for patient {patient_id}")
-        return appointments
+        source = appointment_source(include_archived)
+        query = select(source).where(
+            source.patient_id == patient_id
+        ).order_by(source.appointment_date, source.id)
+        
+        if encoding:
+            query, columns = columnar_select(query, expand, source)
+            rows = (await db.execute(query)).all()
+            logger.info("Retrieved %s appointments for patient %s", len(rows), patient_id)
+            return columnar_response(columns, rows, encoding, response)
+        
+        result = await db.execute(query.options(*expand_options(expand, source)))
+        appointments = result.scalars().all()
+        logger.info("Retrieved %s appointments for patient %s", len(appointments), patient_id)
+        return present(appointments, expand)
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error retrieving appointments for patient {patient_id}: {str(e)}")
+        logger.error("Error retrieving appointments for patient %s: %s", patient_id, e)
         raise HTTPException(status_code=500, detail="Пациент тағайындарын алуда қате орын алды")
@@ -1,26 +1,72 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
-from typing import List
+from fastapi import APIRouter, Body, Depends, File, HTTPException, Request, Response, UploadFile, status, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from typing import Any, List, Optional, Union
+from datetime import datetime, timedelta
+import io
 import logging
 
-from app.database import get_db
+from app.database import AsyncSessionLocal, get_db
+from app.replica import get_read_db
 from app.models.doctor import Doctor as DoctorModel
-from app.schemas.doctor import Doctor, DoctorCreate, DoctorUpdate
+from app.schemas.doctor import Doctor, DoctorCreate, DoctorUpdate, DoctorBulkUpdate
+from app.schemas.bulk import BulkResult
+from app.schemas.imports import ImportResult
+from app.schemas.page import Page
+from app.pagination import decode_cursor, keyset_page
+from app.search import apply_search, dialect_of
+from app.cache import cache
+from app.conditional import check_row, check_stored_row, check_tables, load_versions, not_modified, versions_etag
+from app.schemas.availability import DoctorAvailability, FirstAvailableSlot
+from app.availability import free_slots, first_free_slot, load_busy, validate_range
+from app.booking import MAX_APPOINTMENT_MINUTES
+from app.config import schedule_settings
+from app.importer import ImportSpec, import_csv
+from app.bulk import (
+    BATCH_CONFLICT, BulkReport, check_update_targets, existing_values, first_occurrence,
+    insert_many, update_fields, update_many, validate_batch
+)
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-@router.get("/", response_model=List[Doctor])
+DUPLICATE_EMAIL = "Бұл электронды пошта әлдеқайда есептелінгі"
+DUPLICATE_LICENSE = "Бұл лицензия номері әлдеқайда есептелінгі"
+
+IMPORT_SPEC = ImportSpec(DoctorModel, DoctorCreate, {"email": DUPLICATE_EMAIL, "license_number": DUPLICATE_LICENSE})
+
+# Cache keys; see app/cache.py
+SPECIALIZATIONS_KEY = "doctors:specializations"
+
+def doctor_key(doctor_id: int) -> str:
+    return f"doctors:{doctor_id}"
+
+async def load_doctor(doctor_id: int) -> Optional[dict]:
+    async with AsyncSessionLocal() as db:
+        doctor = await db.get(DoctorModel, doctor_id)
+        return Doctor.model_validate(doctor).model_dump(mode="json") if doctor else None
+
+async def load_specializations() -> dict:
+    """Distinct specializations with the ETag of the table version they were read at"""
+    async with AsyncSessionLocal() as db:
+        etag = versions_etag(await load_versions(db, ["doctors"]))
+        specializations = await db.scalars(
+            select(DoctorModel.specialization).distinct().order_by(DoctorModel.specialization)
+        )
+        return {"etag": etag, "items": [s for s in specializations if s]}
+
+@router.get("/", response_model=Union[List[Doctor], Page[Doctor]])
 async def get_doctors(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     search: str = Query(None),
     specialization: str = Query(None),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get all doctors with optional filtering
@@ -28,130 +74,373 @@ async def get_doctors(
     Parameters:
     - skip: Number of records to skip (default 0)
     - limit: Maximum number of records to return (default 100)
-    - search: Search by name or email
+    - search: Full-text search by name, email or specialization (prefix match, ranked)
     - specialization: Filter by specialization
+    - cursor: Keyset pagination token; pass an empty value for the first page.
+      The response becomes {"items": [...], "next_cursor": ...} and `skip` is ignored
     """
     try:
-        query = db.query(DoctorModel)
+        unchanged = await check_tables(request, response, db, "doctors")
+        if unchanged:
+            return unchanged
+        
+        query = select(DoctorModel)
         
         # Apply filters
         if search:
-            query = query.filter(
-                or_(
-                    DoctorModel.name.ilike(f"%{search}%"),
-                    DoctorModel.email.ilike(f"%{search}%")
-                )
-            )
+            # Full-text index; ranked by relevance unless paging by cursor
+            query = apply_search(query, DoctorModel, search, dialect_of(db), ranked=cursor is None)
         
         if specialization:
-            query = query.filter(DoctorModel.specialization.ilike(f"%{specialization}%"))
+            query = query.where(DoctorModel.specialization.ilike(f"%{specialization}%"))
+        
+        query = query.order_by(DoctorModel.id)
         
-        doctors = query.offset(skip).limit(limit).all()
-        logger.info(f"Retrieved {len(doctors)} doctors")
-        return doctors
+        if cursor is None:
+            result = await db.execute(query.offset(skip).limit(limit))
+            doctors = result.scalars().all()
+            logger.info("Retrieved %s doctors", len(doctors))
+            return doctors
+        
+        if cursor:
+            (last_id,) = decode_cursor(cursor, int)
+            query = query.where(DoctorModel.id > last_id)
+        
+        result = await db.execute(query.limit(limit + 1))
+        page = keyset_page(result.scalars().all(), limit, lambda d: (d.id,))
+        logger.info("Retrieved %s doctors", len(page['items']))
+        return page
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error retrieving doctors: {str(e)}")
+        logger.error("Error retrieving doctors: %s", e)
         raise HTTPException(status_code=500, detail="Дәрігерлерді алуда қате орын алды")
 
+@router.get("/availability/first", response_model=FirstAvailableSlot)
+async def get_first_available(
+    specialization: str = Query(...),
+    date_from: Optional[datetime] = Query(None, alias="from"),
+    date_to: Optional[datetime] = Query(None, alias="to"),
+    duration: int = Query(30, ge=5, le=MAX_APPOINTMENT_MINUTES),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Earliest free slot across all active doctors of a specialization
+    
+    Parameters:
+    - specialization: Doctor specialization (e.g. Кардиолог)
+    - from / to: Search range (defaults: now / now + maximum range)
+    - duration: Slot length in minutes
+    """
+    try:
+        start = max(date_from or datetime.now(), datetime.now())
+        end = date_to or start + timedelta(days=schedule_settings.max_range_days)
+        error = validate_range(start, end)
+        if error:
+            raise HTTPException(status_code=400, detail=error)
+        
+        # SQLite's ilike only folds ASCII, so match the (short) specialization list in Python
+        known = (await cache.get_or_load(SPECIALIZATIONS_KEY, load_specializations))["items"]
+        wanted = specialization.casefold()
+        matching = [s for s in known if s and wanted in s.casefold()]
+        
+        result = await db.execute(
+            select(DoctorModel).where(
+                DoctorModel.specialization.in_(matching),
+                DoctorModel.is_active == True
+            )
+        )
+        doctors = {d.id: d for d in result.scalars().all()}
+        if not doctors:
+            raise HTTPException(status_code=404, detail="Дәрігер табылмады")
+        
+        busy = await load_busy(db, list(doctors), start, end)
+        candidates = []
+        for doctor_id, intervals in busy.items():
+            slot = first_free_slot(intervals, start, end, timedelta(minutes=duration))
+            if slot:
+                candidates.append((slot, doctor_id))
+        if not candidates:
+            raise HTTPException(status_code=404, detail="Бос уақыт табылмады")
+        
+        (slot_start, slot_end), doctor_id = min(candidates)
+        doctor = doctors[doctor_id]
+        logger.info("First available %s slot: doctor %s at %s", specialization, doctor_id, slot_start)
+        return FirstAvailableSlot(
+            doctor_id=doctor.id,
+            doctor_name=doctor.name,
+            specialization=doctor.specialization,
+            start=slot_start,
+            end=slot_end
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Error finding first available slot for %s: %s", specialization, e)
+        raise HTTPException(status_code=500, detail="Бос уақытты іздеуде қате орын алды")
+
 @router.get("/{doctor_id}", response_model=Doctor)
-async def get_doctor(doctor_id: int, db: Session = Depends(get_db)):
-    """Get a specific doctor by ID"""
+async def get_doctor(doctor_id: int, request: Request, response: Response):
+    """Get a specific doctor by ID (cached)"""
     try:
-        doctor = db.query(DoctorModel).filter(DoctorModel.id == doctor_id).first()
+        if not cache.has(doctor_key(doctor_id)):
+            async with AsyncSessionLocal() as db:
+                unchanged = await check_stored_row(request, response, db, "doctors", doctor_id, DoctorModel)
+            if unchanged:
+                return unchanged
+        doctor = await cache.get_or_load(doctor_key(doctor_id), lambda: load_doctor(doctor_id))
         if not doctor:
             raise HTTPException(status_code=404, detail="Дәрігер табылмады")
-        logger.info(f"Retrieved doctor with ID {doctor_id}")
+        unchanged = check_row(request, response, "doctors", doctor_id, doctor["updated_at"])
+        if unchanged:
+            return unchanged
+        logger.info("Retrieved doctor with ID %s", doctor_id)
         return doctor
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error retrieving doctor {doctor_id}: {str(e)}")
+        logger.error("Error retrieving doctor %s: %s", doctor_id, e)
         raise HTTPException(status_code=500, detail="Дәрігерді алуда қате орын алды")
 
+@router.get("/{doctor_id}/availability", response_model=DoctorAvailability)
+async def get_doctor_availability(
+    doctor_id: int,
+    date_from: Optional[datetime] = Query(None, alias="from"),
+    date_to: Optional[datetime] = Query(None, alias="to"),
+    duration: int = Query(30, ge=5, le=MAX_APPOINTMENT_MINUTES),
+    limit: int = Query(200, ge=1, le=2000),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Free slots of a doctor within working hours
+    
+    Parameters:
+    - from / to: Range to search (defaults: now / now + 7 days)
+    - duration: Slot length in minutes
+    - limit: Maximum number of slots to return
+    """
+    try:
+        doctor = await db.get(DoctorModel, doctor_id)
+        if not doctor:
+            raise HTTPException(status_code=404, detail="Дәрігер табылмады")
+        
+        start = max(date_from or datetime.now(), datetime.now())
+        end = date_to or start + timedelta(days=7)
+        error = validate_range(start, end)
+        if error:
+            raise HTTPException(status_code=400, detail=error)
+        
+        busy = (await load_busy(db, [doctor_id], start, end))[doctor_id]
+        slots = [
+            {"start": slot_start, "end": slot_end}
+            for slot_start, slot_end in free_slots(busy, start, end, timedelta(minutes=duration), limit)
+        ]
+        logger.info("Computed %s free slots for doctor %s", len(slots), doctor_id)
+        return DoctorAvailability(
+            doctor_id=doctor_id,
+            date_from=start,
+            date_to=end,
+            duration_minutes=duration,
+            slots=slots
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Error computing availability for doctor %s: %s", doctor_id, e)
+        raise HTTPException(status_code=500, detail="Бос уақытты іздеуде қате орын алды")
+
 @router.post("/", response_model=Doctor, status_code=status.HTTP_201_CREATED)
-async def create_doctor(doctor: DoctorCreate, db: Session = Depends(get_db)):
+async def create_doctor(doctor: DoctorCreate, db: AsyncSession = Depends(get_db)):
     """Create a new doctor"""
     try:
         # Check for duplicate email
-        existing_doctor = db.query(DoctorModel).filter(DoctorModel.email == doctor.email).first()
+        existing_doctor = await db.scalar(select(DoctorModel).where(DoctorModel.email == doctor.email))
         if existing_doctor:
-            raise HTTPException(status_code=400, detail="Бұл электронды пошта әлдеқайда есептелінгі")
+            raise HTTPException(status_code=400, detail=DUPLICATE_EMAIL)
         
         # Check for duplicate license number
-        existing_license = db.query(DoctorModel).filter(DoctorModel.license_number == doctor.license_number).first()
+        existing_license = await db.scalar(
+            select(DoctorModel).where(DoctorModel.license_number == doctor.license_number)
+        )
         if existing_license:
-            raise HTTPException(status_code=400, detail="Бұл лицензия номері әлдеқайда есептелінгі")
+            raise HTTPException(status_code=400, detail=DUPLICATE_LICENSE)
         
         db_doctor = DoctorModel(**doctor.dict())
         db.add(db_doctor)
-        db.commit()
-        db.refresh(db_doctor)
-        logger.info(f"Created new doctor: {db_doctor.name}")
+        await db.commit()
+        cache.invalidate(SPECIALIZATIONS_KEY)
+        await db.refresh(db_doctor)
+        logger.info("Created new doctor: %s", db_doctor.name)
         return db_doctor
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
-        logger.error(f"Error creating doctor: {str(e)}")
+        await db.rollback()
+        logger.error("Error creating doctor: %s", e)
         raise HTTPException(status_code=500, detail="Дәрігер құруда қате орын алды")
 
 @router.put("/{doctor_id}", response_model=Doctor)
-async def update_doctor(doctor_id: int, doctor: DoctorUpdate, db: Session = Depends(get_db)):
+async def update_doctor(doctor_id: int, doctor: DoctorUpdate, db: AsyncSession = Depends(get_db)):
     """Update a doctor"""
     try:
-        db_doctor = db.query(DoctorModel).filter(DoctorModel.id == doctor_id).first()
+        db_doctor = await db.get(DoctorModel, doctor_id)
         if not db_doctor:
             raise HTTPException(status_code=404, detail="Дәрігер табылмады")
         
-        # Check for duplicate email if email is being updated
-        if doctor.email and doctor.email != db_doctor.email:
-            existing = db.query(DoctorModel).filter(DoctorModel.email == doctor.email).first()
-            if existing:
-                raise HTTPException(status_code=400, detail="Бұл электронды пошта әлдеқайда есептелінгі")
-        
         update_data = doctor.dict(exclude_unset=True)
         for field, value in update_data.items():
             setattr(db_doctor, field, value)
         
         db.add(db_doctor)
-        db.commit()
-        db.refresh(db_doctor)
-        logger.info(f"Updated doctor with ID {doctor_id}")
+        await db.commit()
+        if "specialization" in update_data:
+            cache.invalidate(doctor_key(doctor_id), SPECIALIZATIONS_KEY)
+        else:
+            cache.invalidate(doctor_key(doctor_id))
+        await db.refresh(db_doctor)
+        logger.info("Updated doctor with ID %s", doctor_id)
         return db_doctor
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
-        logger.error(f"Error updating doctor {doctor_id}: {str(e)}")
+        await db.rollback()
+        logger.error("Error updating doctor %s: %s", doctor_id, e)
         raise HTTPException(status_code=500, detail="Дәрігерді өндіктеуде қате орын алды")
 
 @router.delete("/{doctor_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_doctor(doctor_id: int, db: Session = Depends(get_db)):
+async def delete_doctor(doctor_id: int, db: AsyncSession = Depends(get_db)):
     """Delete a doctor"""
     try:
-        db_doctor = db.query(DoctorModel).filter(DoctorModel.id == doctor_id).first()
+        db_doctor = await db.get(DoctorModel, doctor_id)
         if not db_doctor:
             raise HTTPException(status_code=404, detail="Дәрігер табылмады")
         
-        db.delete(db_doctor)
-        db.commit()
-        logger.info(f"Deleted doctor with ID {doctor_id}")
+        await db.delete(db_doctor)
+        await db.commit()
+        cache.invalidate(doctor_key(doctor_id), SPECIALIZATIONS_KEY)
+        logger.info("Deleted doctor with ID %s", doctor_id)
         return None
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
-        logger.error(f"Error deleting doctor {doctor_id}: {str(e)}")
+        await db.rollback()
+        logger.error("Error deleting doctor %s: %s", doctor_id, e)
         raise HTTPException(status_code=500, detail="Дәрігерді өшіруде қате орын алды")
 
+@router.post("/import", response_model=ImportResult)
+async def import_doctors(file: UploadFile = File(...), db: AsyncSession = Depends(get_db)):
+    """
+    Import doctors from an uploaded CSV file (UTF-8, header row with name, specialization, email, phone, license_number, bio)
+    
+    Rows are validated and deduplicated (by email and license number) against the database
+    and the rest of the file, then inserted in chunks with a commit after
+    each one. Rejected rows are reported by their data row number.
+    """
+    try:
+        text = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+        report = await import_csv(
+            db, text, IMPORT_SPEC, progress=lambda r: logger.info("Importing doctors: %s", r.progress_line())
+        )
+        logger.info("Imported %s doctors, rejected %s", report.imported, report.rejected)
+        return report.result()
+    except UnicodeDecodeError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Файл UTF-8 кодтауында болуы керек")
+    except Exception as e:
+        await db.rollback()
+        logger.error("Error importing doctors: %s", e)
+        raise HTTPException(status_code=500, detail="Дәрігерлерді импорттауда қате орын алды")
+    finally:
+        # Chunks are committed as they go, so even a failed import may have added specializations
+        cache.invalidate(SPECIALIZATIONS_KEY)
+
+@router.post("/bulk", response_model=BulkResult)
+async def bulk_create_doctors(items: List[Any] = Body(...), db: AsyncSession = Depends(get_db)):
+    """
+    Create many doctors in one transaction
+    
+    Emails and license numbers are checked against the batch and the database
+    with set-based queries before anything is written.
+    """
+    try:
+        report = BulkReport(len(items))
+        valid = validate_batch(items, DoctorCreate, report)
+        first_occurrence(valid, lambda d: d.email, report, DUPLICATE_EMAIL)
+        first_occurrence(valid, lambda d: d.license_number, report, DUPLICATE_LICENSE)
+        taken_emails = await existing_values(db, DoctorModel.email, (d.email for _, d in valid))
+        taken_licenses = await existing_values(db, DoctorModel.license_number, (d.license_number for _, d in valid))
+        
+        accepted = []
+        for index, doctor in valid:
+            if report.failed(index):
+                continue
+            if doctor.email in taken_emails:
+                report.fail(index, DUPLICATE_EMAIL)
+            elif doctor.license_number in taken_licenses:
+                report.fail(index, DUPLICATE_LICENSE)
+            else:
+                accepted.append((index, doctor))
+        
+        ids = await insert_many(db, DoctorModel, [doctor.dict() for _, doctor in accepted])
+        await db.commit()
+        if ids:
+            cache.invalidate(SPECIALIZATIONS_KEY)
+        for (index, _), doctor_id in zip(accepted, ids):
+            report.ok(index, doctor_id)
+        result = report.build()
+        logger.info("Bulk created %s doctors, rejected %s", result.succeeded, result.failed)
+        return result
+    except HTTPException:
+        raise
+    except IntegrityError as e:
+        await db.rollback()
+        logger.error("Bulk doctor insert conflicted: %s", e)
+        raise HTTPException(status_code=409, detail=BATCH_CONFLICT)
+    except Exception as e:
+        await db.rollback()
+        logger.error("Error bulk creating doctors: %s", e)
+        raise HTTPException(status_code=500, detail="Дәрігерлерді топтап құруда қате орын алды")
+
+@router.patch("/bulk", response_model=BulkResult)
+async def bulk_update_doctors(items: List[Any] = Body(...), db: AsyncSession = Depends(get_db)):
+    """Update many doctors (each item carries its `id`) in one transaction"""
+    try:
+        report = BulkReport(len(items))
+        valid = validate_batch(items, DoctorBulkUpdate, report)
+        await check_update_targets(db, DoctorModel, valid, report, "Дәрігер табылмады")
+        
+        accepted = [(index, doctor) for index, doctor in valid if not report.failed(index)]
+        rows = [{"id": doctor.id, **update_fields(doctor)} for _, doctor in accepted]
+        await update_many(db, DoctorModel, [row for row in rows if len(row) > 1])
+        await db.commit()
+        changed = [doctor_key(row["id"]) for row in rows if len(row) > 1]
+        if any("specialization" in row for row in rows):
+            changed.append(SPECIALIZATIONS_KEY)
+        if changed:
+            cache.invalidate(*changed)
+        for index, doctor in accepted:
+            report.ok(index, doctor.id)
+        result = report.build()
+        logger.info("Bulk updated %s doctors, rejected %s", result.succeeded, result.failed)
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        await db.rollback()
+        logger.error("Error bulk updating doctors: %s", e)
+        raise HTTPException(status_code=500, detail="Дәрігерлерді топтап өндіктеуде қате орын алды")
+
 @router.get("/specialization/list", response_model=List[str])
-async def get_specializations(db: Session = Depends(get_db)):
-    """Get all available specializations"""
+async def get_specializations(request: Request, response: Response):
+    """Get all available specializations (cached)"""
     try:
-        specializations = db.query(DoctorModel.specialization).distinct().all()
-        result = [s[0] for s in specializations if s[0]]
-        logger.info(f"Retrieved {len(result)} specializations")
+        specializations = await cache.get_or_load(SPECIALIZATIONS_KEY, load_specializations)
+        unchanged = not_modified(request, response, specializations["etag"])
+        if unchanged:
+            return unchanged
+        result = specializations["items"]
+        logger.info("Retrieved %s specializations", len(result))
         return result
     except Exception as e:
-        logger.error(f"Error retrieving specializations: {str(e)}")
+        logger.error("Error retrieving specializations: %s", e)
         raise HTTPException(status_code=500, detail="Мамандықтарды алуда қате орын алды")
@@ -1,25 +1,45 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
-from typing import List
+from fastapi import APIRouter, Body, Depends, File, HTTPException, Request, Response, UploadFile, status, Query
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from typing import Any, List, Optional, Union
+import io
 import logging
 
-from app.database import get_db
+from app.database import async_engine, get_db
+from app.replica import get_read_db, read_sessionmaker
 from app.models.patient import Patient as PatientModel
-from app.schemas.patient import Patient, PatientCreate, PatientUpdate
+from app.schemas.patient import Patient, PatientCreate, PatientUpdate, PatientBulkUpdate
+from app.schemas.bulk import BulkResult
+from app.schemas.imports import ImportResult
+from app.schemas.page import Page
+from app.pagination import decode_cursor, keyset_page
+from app.search import apply_search, dialect_of
+from app.export import conditional_export
+from app.conditional import check_row, check_stored_row, check_tables
+from app.importer import ImportSpec, import_csv
+from app.bulk import (
+    BATCH_CONFLICT, BulkReport, check_update_targets, existing_values, first_occurrence,
+    insert_many, update_fields, update_many, validate_batch
+)
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-@router.get("/", response_model=List[Patient])
+DUPLICATE_EMAIL = "Бұл электронды пошта әлдеқайда есептелінгі"
+
+IMPORT_SPEC = ImportSpec(PatientModel, PatientCreate, {"email": DUPLICATE_EMAIL})
+
+@router.get("/", response_model=Union[List[Patient], Page[Patient]])
 async def get_patients(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     search: str = Query(None),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get all patients with optional search
@@ -27,109 +47,237 @@ async def get_patients(
     Parameters:
     - skip: Number of records to skip (default 0)
     - limit: Maximum number of records to return (default 100)
-    - search: Search by first name, last name or email
+    - search: Full-text search by first name, last name or email (prefix match, ranked)
+    - cursor: Keyset pagination token; pass an empty value for the first page.
+      The response becomes {"items": [...], "next_cursor": ...} and `skip` is ignored
     """
     try:
-        query = db.query(PatientModel)
+        unchanged = await check_tables(request, response, db, "patients")
+        if unchanged:
+            return unchanged
+        
+        query = select(PatientModel)
         
         if search:
-            query = query.filter(
-                or_(
-                    PatientModel.first_name.ilike(f"%{search}%"),
-                    PatientModel.last_name.ilike(f"%{search}%"),
-                    PatientModel.email.ilike(f"%{search}%")
-                )
-            )
+            # Full-text index; ranked by relevance unless paging by cursor
+            query = apply_search(query, PatientModel, search, dialect_of(db), ranked=cursor is None)
+        
+        query = query.order_by(PatientModel.id)
+        
+        if cursor is None:
+            result = await db.execute(query.offset(skip).limit(limit))
+            patients = result.scalars().all()
+            logger.info("Retrieved %s patients", len(patients))
+            return patients
         
-        patients = query.offset(skip).limit(limit).all()
-        logger.info(f"Retrieved {len(patients)} patients")
-        return patients
+        if cursor:
+            (last_id,) = decode_cursor(cursor, int)
+            query = query.where(PatientModel.id > last_id)
+        
+        result = await db.execute(query.limit(limit + 1))
+        page = keyset_page(result.scalars().all(), limit, lambda p: (p.id,))
+        logger.info("Retrieved %s patients", len(page['items']))
+        return page
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error retrieving patients: {str(e)}")
+        logger.error("Error retrieving patients: %s", e)
         raise HTTPException(status_code=500, detail="Пациенттерді алуда қате орын алды")
 
+@router.get("/export")
+async def export_patients(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    search: str = Query(None),
+    sessions: async_sessionmaker = Depends(read_sessionmaker),
+):
+    """
+    Stream all patients as NDJSON or CSV, in id order
+    
+    Parameters:
+    - format: ndjson (default) or csv
+    - search: Same full-text filter as the list endpoint
+    """
+    query = select(*PatientModel.__table__.columns)
+    if search:
+        query = apply_search(query, PatientModel, search, async_engine.dialect.name, ranked=False)
+    logger.info("Exporting patients")
+    return await conditional_export(
+        request, query.order_by(PatientModel.id), format, "patients", ["patients"], sessions
+    )
+
 @router.get("/{patient_id}", response_model=Patient)
-async def get_patient(patient_id: int, db: Session = Depends(get_db)):
+async def get_patient(patient_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_read_db)):
     """Get a specific patient by ID"""
     try:
-        patient = db.query(PatientModel).filter(PatientModel.id == patient_id).first()
+        unchanged = await check_stored_row(request, response, db, "patients", patient_id, PatientModel)
+        if unchanged:
+            return unchanged
+        patient = await db.get(PatientModel, patient_id)
         if not patient:
             raise HTTPException(status_code=404, detail="Пациент табылмады")
-        logger.info(f"Retrieved patient with ID {patient_id}")
+        unchanged = check_row(request, response, "patients", patient_id, patient.updated_at)
+        if unchanged:
+            return unchanged
+        logger.info("Retrieved patient with ID %s", patient_id)
         return patient
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error retrieving patient {patient_id}: {str(e)}")
+        logger.error("Error retrieving patient %s: %s", patient_id, e)
         raise HTTPException(status_code=500, detail="Пациентті алуда қате орын алды")
 
 @router.post("/", response_model=Patient, status_code=status.HTTP_201_CREATED)
-async def create_patient(patient: PatientCreate, db: Session = Depends(get_db)):
+async def create_patient(patient: PatientCreate, db: AsyncSession = Depends(get_db)):
     """Create a new patient"""
     try:
         # Check for duplicate email
-        existing_patient = db.query(PatientModel).filter(PatientModel.email == patient.email).first()
+        existing_patient = await db.scalar(select(PatientModel).where(PatientModel.email == patient.email))
         if existing_patient:
-            raise HTTPException(status_code=400, detail="Бұл электронды пошта әлдеқайда есептелінгі")
+            raise HTTPException(status_code=400, detail=DUPLICATE_EMAIL)
         
         db_patient = PatientModel(**patient.dict())
         db.add(db_patient)
-        db.commit()
-        db.refresh(db_patient)
-        logger.info(f"Created new patient: {db_patient.first_name} {db_patient.last_name}")
+        await db.commit()
+        await db.refresh(db_patient)
+        logger.info("Created new patient: %s %s", db_patient.first_name, db_patient.last_name)
         return db_patient
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
-        logger.error(f"Error creating patient: {str(e)}")
+        await db.rollback()
+        logger.error("Error creating patient: %s", e)
         raise HTTPException(status_code=500, detail="Пациент құруда қате орын алды")
 
 @router.put("/{patient_id}", response_model=Patient)
-async def update_patient(patient_id: int, patient: PatientUpdate, db: Session = Depends(get_db)):
+async def update_patient(patient_id: int, patient: PatientUpdate, db: AsyncSession = Depends(get_db)):
     """Update a patient"""
     try:
-        db_patient = db.query(PatientModel).filter(PatientModel.id == patient_id).first()
+        db_patient = await db.get(PatientModel, patient_id)
         if not db_patient:
             raise HTTPException(status_code=404, detail="Пациент табылмады")
         
-        # Check for duplicate email if email is being updated
-        if patient.email and patient.email != db_patient.email:
-            existing = db.query(PatientModel).filter(PatientModel.email == patient.email).first()
-            if existing:
-                raise HTTPException(status_code=400, detail="Бұл электронды пошта әлдеқайда есептелінгі")
-        
         update_data = patient.dict(exclude_unset=True)
         for field, value in update_data.items():
             setattr(db_patient, field, value)
         
         db.add(db_patient)
-        db.commit()
-        db.refresh(db_patient)
-        logger.info(f"Updated patient with ID {patient_id}")
+        await db.commit()
+        await db.refresh(db_patient)
+        logger.info("Updated patient with ID %s", patient_id)
         return db_patient
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
-        logger.error(f"Error updating patient {patient_id}: {str(e)}")
+        await db.rollback()
+        logger.error("Error updating patient %s: %s", patient_id, e)
         raise HTTPException(status_code=500, detail="Пациентті өндіктеуде қате орын алды")
 
 @router.delete("/{patient_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_patient(patient_id: int, db: Session = Depends(get_db)):
+async def delete_patient(patient_id: int, db: AsyncSession = Depends(get_db)):
     """Delete a patient"""
     try:
-        db_patient = db.query(PatientModel).filter(PatientModel.id == patient_id).first()
+        db_patient = await db.get(PatientModel, patient_id)
         if not db_patient:
             raise HTTPException(status_code=404, detail="Пациент табылмады")
         
-        db.delete(db_patient)
-        db.commit()
-        logger.info(f"Deleted patient with ID {patient_id}")
+        await db.delete(db_patient)
+        await db.commit()
+        logger.info("Deleted patient with ID %s", patient_id)
         return None
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
-        logger.error(f"Error deleting patient {patient_id}: {str(e)}")
+        await db.rollback()
+        logger.error("Error deleting patient %s: %s", patient_id, e)
         raise HTTPException(status_code=500, detail="Пациентті өшіруде қате орын алды")
+
+@router.post("/import", response_model=ImportResult)
+async def import_patients(file: UploadFile = File(...), db: AsyncSession = Depends(get_db)):
+    """
+    Import patients from an uploaded CSV file (UTF-8, header row with first_name, last_name, email, phone, date_of_birth, address, medical_history, allergies)
+    
+    Rows are validated and deduplicated (by email) against the database
+    and the rest of the file, then inserted in chunks with a commit after
+    each one. Rejected rows are reported by their data row number.
+    """
+    try:
+        text = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+        report = await import_csv(
+            db, text, IMPORT_SPEC, progress=lambda r: logger.info("Importing patients: %s", r.progress_line())
+        )
+        logger.info("Imported %s patients, rejected %s", report.imported, report.rejected)
+        return report.result()
+    except UnicodeDecodeError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Файл UTF-8 кодтауында болуы керек")
+    except Exception as e:
+        await db.rollback()
+        logger.error("Error importing patients: %s", e)
+        raise HTTPException(status_code=500, detail="Пациенттерді импорттауда қате орын алды")
+
+@router.post("/bulk", response_model=BulkResult)
+async def bulk_create_patients(items: List[Any] = Body(...), db: AsyncSession = Depends(get_db)):
+    """
+    Create many patients in one transaction
+    
+    The whole batch is validated first (schema and duplicate emails, checked
+    against the batch and the database in a few set-based queries); accepted
+    rows are inserted together. The report lists the outcome of every item.
+    """
+    try:
+        report = BulkReport(len(items))
+        valid = validate_batch(items, PatientCreate, report)
+        first_occurrence(valid, lambda p: p.email, report, DUPLICATE_EMAIL)
+        taken = await existing_values(db, PatientModel.email, (p.email for _, p in valid))
+        
+        accepted = []
+        for index, patient in valid:
+            if report.failed(index):
+                continue
+            if patient.email in taken:
+                report.fail(index, DUPLICATE_EMAIL)
+                continue
+            accepted.append((index, patient))
+        
+        ids = await insert_many(db, PatientModel, [patient.dict() for _, patient in accepted])
+        await db.commit()
+        for (index, _), patient_id in zip(accepted, ids):
+            report.ok(index, patient_id)
+        result = report.build()
+        logger.info("Bulk created %s patients, rejected %s", result.succeeded, result.failed)
+        return result
+    except HTTPException:
+        raise
+    except IntegrityError as e:
+        await db.rollback()
+        logger.error("Bulk patient insert conflicted: %s", e)
+        raise HTTPException(status_code=409, detail=BATCH_CONFLICT)
+    except Exception as e:
+        await db.rollback()
+        logger.error("Error bulk creating patients: %s", e)
+        raise HTTPException(status_code=500, detail="Пациенттерді топтап құруда қате орын алды")
+
+@router.patch("/bulk", response_model=BulkResult)
+async def bulk_update_patients(items: List[Any] = Body(...), db: AsyncSession = Depends(get_db)):
+    """Update many patients (each item carries its `id`) in one transaction"""
+    try:
+        report = BulkReport(len(items))
+        valid = validate_batch(items, PatientBulkUpdate, report)
+        await check_update_targets(db, PatientModel, valid, report, "Пациент табылмады")
+        
+        accepted = [(index, patient) for index, patient in valid if not report.failed(index)]
+        rows = [{"id": patient.id, **update_fields(patient)} for _, patient in accepted]
+        await update_many(db, PatientModel, [row for row in rows if len(row) > 1])
+        await db.commit()
+        for index, patient in accepted:
+            report.ok(index, patient.id)
+        result = report.build()
+        logger.info("Bulk updated %s patients, rejected %s", result.succeeded, result.failed)
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        await db.rollback()
+        logger.error("Error bulk updating patients: %s", e)
+        raise HTTPException(status_code=500, detail="Пациенттерді топтап өндіктеуде қате орын алды")
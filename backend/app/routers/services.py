@@ -1,25 +1,63 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Body, Depends, HTTPException, Request, Response, status, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from typing import Any, List, Optional, Union
 import logging
 
-from app.database import get_db
+from app.database import AsyncSessionLocal, get_db
+from app.replica import get_read_db
 from app.models.service import Service as ServiceModel
-from app.schemas.service import Service, ServiceCreate, ServiceUpdate
+from app.schemas.service import Service, ServiceCreate, ServiceUpdate, ServiceBulkUpdate
+from app.schemas.bulk import BulkResult
+from app.schemas.page import Page
+from app.pagination import decode_cursor, keyset_page
+from app.search import apply_search, dialect_of
+from app.cache import cache
+from app.conditional import check_row, check_stored_row, check_tables, load_versions, not_modified, versions_etag
+from app.bulk import (
+    BATCH_CONFLICT, BulkReport, check_update_targets, first_occurrence,
+    insert_many, update_fields, update_many, validate_batch
+)
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-@router.get("/", response_model=List[Service])
+DUPLICATE_SERVICE = "Бұл қызмет әлдеқайда есептелінгі"
+NEGATIVE_PRICE = "Баса теріс болуы мүмкін емес"
+INVALID_DURATION = "Ұзақтығы нөлден артық болуы керек"
+
+# Cache keys; see app/cache.py
+AVAILABLE_SERVICES_KEY = "services:available"
+
+def service_key(service_id: int) -> str:
+    return f"services:{service_id}"
+
+async def load_service(service_id: int) -> Optional[dict]:
+    async with AsyncSessionLocal() as db:
+        service = await db.get(ServiceModel, service_id)
+        return Service.model_validate(service).model_dump(mode="json") if service else None
+
+async def load_available_services() -> dict:
+    """Available services with the ETag of the table version they were read at"""
+    async with AsyncSessionLocal() as db:
+        etag = versions_etag(await load_versions(db, ["services"]))
+        services = (await db.scalars(
+            select(ServiceModel).where(ServiceModel.is_available == True).order_by(ServiceModel.id)
+        )).all()
+        return {"etag": etag, "items": [Service.model_validate(s).model_dump(mode="json") for s in services]}
+
+@router.get("/", response_model=Union[List[Service], Page[Service]])
 async def get_services(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     search: str = Query(None),
     available_only: bool = Query(False),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get all services with optional filtering
@@ -27,141 +65,270 @@ async def get_services(
     Parameters:
     - skip: Number of records to skip
     - limit: Maximum number of records to return
-    - search: Search by service name or description
+    - search: Full-text search by service name or description (prefix match, ranked)
     - available_only: Show only available services
+    - cursor: Keyset pagination token; pass an empty value for the first page.
+      The response becomes {"items": [...], "next_cursor": ...} and `skip` is ignored
     """
     try:
-        query = db.query(ServiceModel)
+        unchanged = await check_tables(request, response, db, "services")
+        if unchanged:
+            return unchanged
+        
+        query = select(ServiceModel)
         
         if search:
-            query = query.filter(
-                ServiceModel.name.ilike(f"%{search}%") |
-                ServiceModel.description.ilike(f"%{search}%")
-            )
+            # Full-text index; ranked by relevance unless paging by cursor
+            query = apply_search(query, ServiceModel, search, dialect_of(db), ranked=cursor is None)
         
         if available_only:
-            query = query.filter(ServiceModel.is_available == True)
+            query = query.where(ServiceModel.is_available == True)
         
-        services = query.offset(skip).limit(limit).all()
-        logger.info(f"Retrieved {len(services)} services")
-        return services
+        query = query.order_by(ServiceModel.id)
+        
+        if cursor is None:
+            result = await db.execute(query.offset(skip).limit(limit))
+            services = result.scalars().all()
+            logger.info("Retrieved %s services", len(services))
+            return services
+        
+        if cursor:
+            (last_id,) = decode_cursor(cursor, int)
+            query = query.where(ServiceModel.id > last_id)
+        
+        result = await db.execute(query.limit(limit + 1))
+        page = keyset_page(result.scalars().all(), limit, lambda s: (s.id,))
+        logger.info("Retrieved %s services", len(page['items']))
+        return page
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error retrieving services: {str(e)}")
+        logger.error("Error retrieving services: %s", e)
         raise HTTPException(status_code=500, detail="Қызметтерді алуда қате орын алды")
 
 @router.get("/{service_id}", response_model=Service)
-async def get_service(service_id: int, db: Session = Depends(get_db)):
-    """Get a specific service by ID"""
+async def get_service(service_id: int, request: Request, response: Response):
+    """Get a specific service by ID (cached)"""
     try:
-        service = db.query(ServiceModel).filter(ServiceModel.id == service_id).first()
+        if not cache.has(service_key(service_id)):
+            async with AsyncSessionLocal() as db:
+                unchanged = await check_stored_row(request, response, db, "services", service_id, ServiceModel)
+            if unchanged:
+                return unchanged
+        service = await cache.get_or_load(service_key(service_id), lambda: load_service(service_id))
         if not service:
             raise HTTPException(status_code=404, detail="Қызмет табылмады")
-        logger.info(f"Retrieved service with ID {service_id}")
+        unchanged = check_row(request, response, "services", service_id, service["updated_at"])
+        if unchanged:
+            return unchanged
+        logger.info("Retrieved service with ID %s", service_id)
         return service
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error retrieving service {service_id}: {str(e)}")
+        logger.error("Error retrieving service %s: %s", service_id, e)
         raise HTTPException(status_code=500, detail="Қызметті алуда қате орын алды")
 
 @router.post("/", response_model=Service, status_code=status.HTTP_201_CREATED)
-async def create_service(service: ServiceCreate, db: Session = Depends(get_db)):
+async def create_service(service: ServiceCreate, db: AsyncSession = Depends(get_db)):
     """Create a new service"""
     try:
         # Check for duplicate service name
-        existing_service = db.query(ServiceModel).filter(
-            ServiceModel.name.ilike(service.name)
-        ).first()
+        existing_service = await db.scalar(
+            select(ServiceModel).where(ServiceModel.name.ilike(service.name))
+        )
         if existing_service:
-            raise HTTPException(status_code=400, detail="Бұл қызмет әлдеқайда есептелінгі")
+            raise HTTPException(status_code=400, detail=DUPLICATE_SERVICE)
         
         # Validate price
         if service.price < 0:
-            raise HTTPException(status_code=400, detail="Баса теріс болуы мүмкін емес")
+            raise HTTPException(status_code=400, detail=NEGATIVE_PRICE)
         
         # Validate duration
         if service.duration_minutes <= 0:
-            raise HTTPException(status_code=400, detail="Ұзақтығы нөлден артық болуы керек")
+            raise HTTPException(status_code=400, detail=INVALID_DURATION)
         
         db_service = ServiceModel(**service.dict())
         db.add(db_service)
-        db.commit()
-        db.refresh(db_service)
-        logger.info(f"Created new service: {db_service.name}")
+        await db.commit()
+        cache.invalidate(AVAILABLE_SERVICES_KEY)
+        await db.refresh(db_service)
+        logger.info("Created new service: %s", db_service.name)
         return db_service
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
-        logger.error(f"Error creating service: {str(e)}")
+        await db.rollback()
+        logger.error("Error creating service: %s", e)
         raise HTTPException(status_code=500, detail="Қызмет құруда қате орын алды")
 
 @router.put("/{service_id}", response_model=Service)
-async def update_service(service_id: int, service: ServiceUpdate, db: Session = Depends(get_db)):
+async def update_service(service_id: int, service: ServiceUpdate, db: AsyncSession = Depends(get_db)):
     """Update a service"""
     try:
-        db_service = db.query(ServiceModel).filter(ServiceModel.id == service_id).first()
+        db_service = await db.get(ServiceModel, service_id)
         if not db_service:
             raise HTTPException(status_code=404, detail="Қызмет табылмады")
         
         # Check for duplicate name if name is being updated
         if service.name and service.name != db_service.name:
-            existing = db.query(ServiceModel).filter(
-                ServiceModel.name.ilike(service.name)
-            ).first()
+            existing = await db.scalar(
+                select(ServiceModel).where(ServiceModel.name.ilike(service.name))
+            )
             if existing:
-                raise HTTPException(status_code=400, detail="Бұл қызмет әлдеқайда есептелінгі")
+                raise HTTPException(status_code=400, detail=DUPLICATE_SERVICE)
         
         # Validate price if being updated
         if service.price is not None and service.price < 0:
-            raise HTTPException(status_code=400, detail="Баса теріс болуы мүмкін емес")
+            raise HTTPException(status_code=400, detail=NEGATIVE_PRICE)
         
         # Validate duration if being updated
         if service.duration_minutes is not None and service.duration_minutes <= 0:
-            raise HTTPException(status_code=400, detail="Ұзақтығы нөлден артық болуы керек")
+            raise HTTPException(status_code=400, detail=INVALID_DURATION)
         
         update_data = service.dict(exclude_unset=True)
         for field, value in update_data.items():
             setattr(db_service, field, value)
         
         db.add(db_service)
-        db.commit()
-        db.refresh(db_service)
-        logger.info(f"Updated service with ID {service_id}")
+        await db.commit()
+        cache.invalidate(service_key(service_id), AVAILABLE_SERVICES_KEY)
+        await db.refresh(db_service)
+        logger.info("Updated service with ID %s", service_id)
         return db_service
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
-        logger.error(f"Error updating service {service_id}: {str(e)}")
+        await db.rollback()
+        logger.error("Error updating service %s: %s", service_id, e)
         raise HTTPException(status_code=500, detail="Қызметті өндіктеуде қате орын алды")
 
 @router.delete("/{service_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_service(service_id: int, db: Session = Depends(get_db)):
+async def delete_service(service_id: int, db: AsyncSession = Depends(get_db)):
     """Delete a service"""
     try:
-        db_service = db.query(ServiceModel).filter(ServiceModel.id == service_id).first()
+        db_service = await db.get(ServiceModel, service_id)
         if not db_service:
             raise HTTPException(status_code=404, detail="Қызмет табылмады")
         
-        db.delete(db_service)
-        db.commit()
-        logger.info(f"Deleted service with ID {service_id}")
+        await db.delete(db_service)
+        await db.commit()
+        cache.invalidate(service_key(service_id), AVAILABLE_SERVICES_KEY)
+        logger.info("Deleted service with ID %s", service_id)
         return None
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
-        logger.error(f"Error deleting service {service_id}: {str(e)}")
+        await db.rollback()
+        logger.error("Error deleting service %s: %s", service_id, e)
         raise HTTPException(status_code=500, detail="Қызметті өшіруде қате орын алды")
 
+def service_rule_error(price: Optional[float], duration_minutes: Optional[int]) -> Optional[str]:
+    if price is not None and price < 0:
+        return NEGATIVE_PRICE
+    if duration_minutes is not None and duration_minutes <= 0:
+        return INVALID_DURATION
+    return None
+
+async def service_names(db: AsyncSession) -> dict:
+    """Case-insensitive service name -> id (the services table is small)"""
+    result = await db.execute(select(ServiceModel.name, ServiceModel.id))
+    return {name.casefold(): service_id for name, service_id in result if name}
+
+@router.post("/bulk", response_model=BulkResult)
+async def bulk_create_services(items: List[Any] = Body(...), db: AsyncSession = Depends(get_db)):
+    """Create many services in one transaction; names are unique case-insensitively"""
+    try:
+        report = BulkReport(len(items))
+        valid = validate_batch(items, ServiceCreate, report)
+        first_occurrence(valid, lambda svc: svc.name.casefold(), report, DUPLICATE_SERVICE)
+        taken = await service_names(db)
+        
+        accepted = []
+        for index, service in valid:
+            if report.failed(index):
+                continue
+            error = service_rule_error(service.price, service.duration_minutes)
+            if error is None and service.name.casefold() in taken:
+                error = DUPLICATE_SERVICE
+            if error:
+                report.fail(index, error)
+            else:
+                accepted.append((index, service))
+        
+        ids = await insert_many(db, ServiceModel, [service.dict() for _, service in accepted])
+        await db.commit()
+        if ids:
+            cache.invalidate(AVAILABLE_SERVICES_KEY)
+        for (index, _), service_id in zip(accepted, ids):
+            report.ok(index, service_id)
+        result = report.build()
+        logger.info("Bulk created %s services, rejected %s", result.succeeded, result.failed)
+        return result
+    except HTTPException:
+        raise
+    except IntegrityError as e:
+        await db.rollback()
+        logger.error("Bulk service insert conflicted: %s", e)
+        raise HTTPException(status_code=409, detail=BATCH_CONFLICT)
+    except Exception as e:
+        await db.rollback()
+        logger.error("Error bulk creating services: %s", e)
+        raise HTTPException(status_code=500, detail="Қызметтерді топтап құруда қате орын алды")
+
+@router.patch("/bulk", response_model=BulkResult)
+async def bulk_update_services(items: List[Any] = Body(...), db: AsyncSession = Depends(get_db)):
+    """Update many services (each item carries its `id`) in one transaction"""
+    try:
+        report = BulkReport(len(items))
+        valid = validate_batch(items, ServiceBulkUpdate, report)
+        await check_update_targets(db, ServiceModel, valid, report, "Қызмет табылмады")
+        first_occurrence(
+            valid, lambda svc: svc.name.casefold() if svc.name else None, report, DUPLICATE_SERVICE
+        )
+        taken = await service_names(db)
+        
+        accepted = []
+        for index, service in valid:
+            if report.failed(index):
+                continue
+            error = service_rule_error(service.price, service.duration_minutes)
+            if error is None and service.name and taken.get(service.name.casefold(), service.id) != service.id:
+                error = DUPLICATE_SERVICE
+            if error:
+                report.fail(index, error)
+            else:
+                accepted.append((index, service))
+        
+        rows = [{"id": service.id, **update_fields(service)} for _, service in accepted]
+        await update_many(db, ServiceModel, [row for row in rows if len(row) > 1])
+        await db.commit()
+        changed = [service_key(row["id"]) for row in rows if len(row) > 1]
+        if changed:
+            cache.invalidate(AVAILABLE_SERVICES_KEY, *changed)
+        for index, service in accepted:
+            report.ok(index, service.id)
+        result = report.build()
+        logger.info("Bulk updated %s services, rejected %s", result.succeeded, result.failed)
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        await db.rollback()
+        logger.error("Error bulk updating services: %s", e)
+        raise HTTPException(status_code=500, detail="Қызметтерді топтап өндіктеуде қате орын алды")
+
 @router.get("/available/all", response_model=List[Service])
-async def get_available_services(db: Session = Depends(get_db)):
-    """Get all available services"""
+async def get_available_services(request: Request, response: Response):
+    """Get all available services (cached)"""
     try:
-        services = db.query(ServiceModel).filter(ServiceModel.is_available == True).all()
-        logger.info(f"Retrieved {len(services)} available services")
+        available = await cache.get_or_load(AVAILABLE_SERVICES_KEY, load_available_services)
+        unchanged = not_modified(request, response, available["etag"])
+        if unchanged:
+            return unchanged
+        services = available["items"]
+        logger.info("Retrieved %s available services", len(services))
         return services
     except Exception as e:
-        logger.error(f"Error retrieving available services: {str(e)}")
+        logger.error("Error retrieving available services: %s", e)
         raise HTTPException(status_code=500, detail="Қол жәндеген қызметтерді алуда қате орын алды")
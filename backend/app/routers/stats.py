@@ -0,0 +1,77 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from datetime import date, datetime, timedelta
+import logging
+
+from app.replica import get_read_db
+from app.schemas.stats import DoctorDayCount, Stats
+from app.stats import load_daily, load_summary
+from app.availability import validate_range
+from app.conditional import check_tables
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+STATS_TABLES = ("patients", "doctors", "appointments")
+
+@router.get("/", response_model=Stats)
+async def get_stats(
+    request: Request,
+    response: Response,
+    day: Optional[date] = Query(None),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Dashboard counters: patients, doctors, appointments by status and per doctor for one day
+
+    Parameters:
+    - day: Day of the per-doctor counts (default: today)
+    """
+    try:
+        # The per-doctor block changes at midnight without any write
+        day = day or date.today()
+        unchanged = await check_tables(request, response, db, *STATS_TABLES, variant=day.isoformat())
+        if unchanged:
+            return unchanged
+
+        return await load_summary(db, day)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Error retrieving stats: %s", e)
+        raise HTTPException(status_code=500, detail="Статистиканы алуда қате орын алды")
+
+@router.get("/daily", response_model=List[DoctorDayCount])
+async def get_daily_stats(
+    request: Request,
+    response: Response,
+    date_from: date = Query(..., alias="from"),
+    date_to: date = Query(..., alias="to"),
+    doctor_id: Optional[int] = Query(None),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Appointments per doctor per day
+
+    Parameters:
+    - from / to: Days to report, both inclusive
+    - doctor_id: Only this doctor
+    """
+    try:
+        start = datetime.combine(date_from, datetime.min.time())
+        error = validate_range(start, datetime.combine(date_to, datetime.min.time()) + timedelta(days=1))
+        if error:
+            raise HTTPException(status_code=400, detail=error)
+
+        unchanged = await check_tables(request, response, db, "appointments")
+        if unchanged:
+            return unchanged
+
+        return await load_daily(db, date_from, date_to, doctor_id)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Error retrieving daily stats: %s", e)
+        raise HTTPException(status_code=500, detail="Статистиканы алуда қате орын алды")
@@ -1,11 +1,23 @@
-from app.schemas.doctor import Doctor, DoctorCreate, DoctorUpdate
-from app.schemas.patient import Patient, PatientCreate, PatientUpdate
-from app.schemas.appointment import Appointment, AppointmentCreate, AppointmentUpdate
-from app.schemas.service import Service, ServiceCreate, ServiceUpdate
+from app.schemas.doctor import Doctor, DoctorCreate, DoctorUpdate, DoctorBulkUpdate
+from app.schemas.patient import Patient, PatientCreate, PatientUpdate, PatientBulkUpdate
+from app.schemas.appointment import (
+    Appointment, AppointmentCreate, AppointmentUpdate, AppointmentBulkUpdate,
+    AppointmentExpanded, PatientSummary, DoctorSummary
+)
+from app.schemas.service import Service, ServiceCreate, ServiceUpdate, ServiceBulkUpdate
+from app.schemas.page import Page
+from app.schemas.availability import Slot, DoctorAvailability, FirstAvailableSlot
+from app.schemas.bulk import BulkItemResult, BulkResult
+from app.schemas.imports import ImportReject, ImportResult
 
 __all__ = [
-    "Doctor", "DoctorCreate", "DoctorUpdate",
-    "Patient", "PatientCreate", "PatientUpdate",
-    "Appointment", "AppointmentCreate", "AppointmentUpdate",
-    "Service", "ServiceCreate", "ServiceUpdate"
+    "Doctor", "DoctorCreate", "DoctorUpdate", "DoctorBulkUpdate",
+    "Patient", "PatientCreate", "PatientUpdate", "PatientBulkUpdate",
+    "Appointment", "AppointmentCreate", "AppointmentUpdate", "AppointmentBulkUpdate",
+    "AppointmentExpanded", "PatientSummary", "DoctorSummary",
+    "Service", "ServiceCreate", "ServiceUpdate", "ServiceBulkUpdate",
+    "Page",
+    "Slot", "DoctorAvailability", "FirstAvailableSlot",
+    "BulkItemResult", "BulkResult",
+    "ImportReject", "ImportResult"
 ]
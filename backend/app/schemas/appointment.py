@@ -1,23 +1,53 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional
 from datetime import datetime
 
+from app.booking import MAX_APPOINTMENT_MINUTES as MAX_DURATION
+
 class AppointmentCreate(BaseModel):
     patient_id: int
     doctor_id: int
     appointment_date: datetime
-    duration_minutes: Optional[int] = 30
+    duration_minutes: Optional[int] = Field(30, gt=0, le=MAX_DURATION)
     notes: Optional[str] = None
 
 class AppointmentUpdate(BaseModel):
     appointment_date: Optional[datetime] = None
+    duration_minutes: Optional[int] = Field(None, gt=0, le=MAX_DURATION)
     status: Optional[str] = None
     notes: Optional[str] = None
 
+class AppointmentBulkUpdate(AppointmentUpdate):
+    id: int
+
 class Appointment(AppointmentCreate):
     id: int
+    # Limits apply to writes; rows stored before them must still be readable
+    duration_minutes: Optional[int] = 30
     status: str
     created_at: datetime
+    updated_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+class PatientSummary(BaseModel):
+    id: int
+    first_name: str
+    last_name: str
+    
+    class Config:
+        from_attributes = True
+
+class DoctorSummary(BaseModel):
+    id: int
+    name: str
+    specialization: str
     
     class Config:
         from_attributes = True
+
+class AppointmentExpanded(Appointment):
+    """Appointment with the summaries requested through ?expand= embedded"""
+    patient: Optional[PatientSummary] = None
+    doctor: Optional[DoctorSummary] = None
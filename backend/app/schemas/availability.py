@@ -0,0 +1,19 @@
+from pydantic import BaseModel
+from typing import List
+from datetime import datetime
+
+class Slot(BaseModel):
+    start: datetime
+    end: datetime
+
+class DoctorAvailability(BaseModel):
+    doctor_id: int
+    date_from: datetime
+    date_to: datetime
+    duration_minutes: int
+    slots: List[Slot]
+
+class FirstAvailableSlot(Slot):
+    doctor_id: int
+    doctor_name: str
+    specialization: str
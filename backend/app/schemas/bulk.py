@@ -0,0 +1,13 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+class BulkItemResult(BaseModel):
+    index: int
+    success: bool
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+class BulkResult(BaseModel):
+    succeeded: int
+    failed: int
+    results: List[BulkItemResult]
@@ -1,5 +1,6 @@
 from pydantic import BaseModel, EmailStr
 from typing import Optional, List
+from datetime import datetime
 
 class DoctorCreate(BaseModel):
     name: str
@@ -16,9 +17,15 @@ class DoctorUpdate(BaseModel):
     bio: Optional[str] = None
     is_active: Optional[bool] = None
 
+class DoctorBulkUpdate(DoctorUpdate):
+    id: int
+
 class Doctor(DoctorCreate):
     id: int
+    # Checked as EmailStr when written; re-validating stored addresses on every read dominated list latency
+    email: str
     is_active: bool
+    updated_at: Optional[datetime] = None
     
     class Config:
         from_attributes = True
@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+from typing import List
+
+class ImportReject(BaseModel):
+    row: int
+    error: str
+
+class ImportResult(BaseModel):
+    processed: int
+    imported: int
+    rejected: int
+    seconds: float
+    rows_per_second: float
+    rejects: List[ImportReject]
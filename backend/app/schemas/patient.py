@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr
 from typing import Optional
-from datetime import date
+from datetime import date, datetime
 
 class PatientCreate(BaseModel):
     first_name: str
@@ -21,9 +21,15 @@ class PatientUpdate(BaseModel):
     allergies: Optional[str] = None
     is_active: Optional[bool] = None
 
+class PatientBulkUpdate(PatientUpdate):
+    id: int
+
 class Patient(PatientCreate):
     id: int
+    # Checked as EmailStr when written; re-validating stored addresses on every read dominated list latency
+    email: str
     is_active: bool
+    updated_at: Optional[datetime] = None
     
     class Config:
         from_attributes = True
@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 from typing import Optional
+from datetime import datetime
 
 class ServiceCreate(BaseModel):
     name: str
@@ -14,9 +15,13 @@ class ServiceUpdate(BaseModel):
     duration_minutes: Optional[int] = None
     is_available: Optional[bool] = None
 
+class ServiceBulkUpdate(ServiceUpdate):
+    id: int
+
 class Service(ServiceCreate):
     id: int
     is_available: bool
+    updated_at: Optional[datetime] = None
     
     class Config:
         from_attributes = True
@@ -0,0 +1,19 @@
+from pydantic import BaseModel
+from typing import Dict, List
+from datetime import date
+
+class DoctorDayCount(BaseModel):
+    day: date
+    doctor_id: int
+    total: int
+    by_status: Dict[str, int]
+
+class Stats(BaseModel):
+    patients: int
+    active_patients: int
+    doctors: int
+    active_doctors: int
+    appointments: int
+    appointments_by_status: Dict[str, int]
+    day: date
+    appointments_per_doctor: List[DoctorDayCount]
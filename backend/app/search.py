@@ -0,0 +1,112 @@
+"""
+Full-text search indexes for patients, doctors and services
+
+SQLite uses FTS5 external-content tables kept in sync by triggers;
+PostgreSQL uses a generated tsvector column with a GIN index. Both are
+created by migration (see app/migrations.py), not by create_all.
+"""
+
+import re
+from typing import Optional
+
+from sqlalchemy import Column, Float, Integer, MetaData, Table, func, literal_column, or_, text
+
+# Table -> indexed columns
+SEARCH_INDEXES = {
+    "patients": ("first_name", "last_name", "email"),
+    "doctors": ("name", "email", "specialization"),
+    "services": ("name", "description"),
+}
+
+_fts_metadata = MetaData()
+_fts_tables = {
+    table: Table(f"{table}_fts", _fts_metadata, Column("rowid", Integer), Column("rank", Float))
+    for table in SEARCH_INDEXES
+}
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def create_search_indexes(conn):
+    """Create (and backfill) the search index of every table for the connection's backend"""
+    if conn.dialect.name == "sqlite":
+        for table, columns in SEARCH_INDEXES.items():
+            _create_fts5_index(conn, table, columns)
+    elif conn.dialect.name == "postgresql":
+        for table, columns in SEARCH_INDEXES.items():
+            _create_tsvector_index(conn, table, columns)
+
+
+def _create_fts5_index(conn, table, columns):
+    fts = f"{table}_fts"
+    cols = ", ".join(columns)
+    new_values = ", ".join(f"new.{c}" for c in columns)
+    old_values = ", ".join(f"old.{c}" for c in columns)
+
+    conn.execute(text(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({cols}, content='{table}', content_rowid='id')"
+    ))
+    conn.execute(text(f"""
+        CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN
+            INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_values});
+        END
+    """))
+    conn.execute(text(f"""
+        CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN
+            INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_values});
+        END
+    """))
+    conn.execute(text(f"""
+        CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {table} BEGIN
+            INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_values});
+            INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_values});
+        END
+    """))
+    conn.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+
+
+def _create_tsvector_index(conn, table, columns):
+    document = " || ' ' || ".join(f"coalesce({c}, '')" for c in columns)
+    conn.execute(text(
+        f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        f"GENERATED ALWAYS AS (to_tsvector('simple'::regconfig, {document})) STORED"
+    ))
+    conn.execute(text(
+        f"CREATE INDEX IF NOT EXISTS ix_{table}_search_vector ON {table} USING GIN (search_vector)"
+    ))
+
+
+def tokenize(term: str):
+    return [token.lower() for token in _TOKEN.findall(term or "")]
+
+
+def apply_search(query, model, term: str, dialect: str, ranked: bool = True):
+    """
+    Restrict `query` to rows of `model` matching every token of `term` as a
+    prefix. When `ranked` is set the best matches come first; callers add
+    their own tiebreaker ordering after this.
+    """
+    table = model.__tablename__
+    tokens = tokenize(term)
+
+    if not tokens or dialect not in ("sqlite", "postgresql"):
+        # Nothing indexable in the term (or unknown backend): fall back to substring matching
+        return query.where(or_(*(getattr(model, c).ilike(f"%{term}%") for c in SEARCH_INDEXES[table])))
+
+    if dialect == "sqlite":
+        fts = _fts_tables[table]
+        match = " ".join(f'"{token}"*' for token in tokens)
+        query = query.join(fts, fts.c.rowid == model.id).where(
+            text(f"{fts.name} MATCH :search_match").bindparams(search_match=match)
+        )
+        return query.order_by(fts.c.rank) if ranked else query
+
+    tsquery = func.to_tsquery("simple", " & ".join(f"{token}:*" for token in tokens))
+    vector = literal_column(f"{table}.search_vector")
+    query = query.where(vector.op("@@")(tsquery))
+    return query.order_by(func.ts_rank(vector, tsquery).desc()) if ranked else query
+
+
+def dialect_of(db) -> Optional[str]:
+    """Backend name for a (sync or async) session"""
+    return db.bind.dialect.name if db.bind is not None else None
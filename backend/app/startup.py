@@ -0,0 +1,94 @@
+"""
+Application startup: API routers and the lifespan hook
+
+Importing app.main only builds the app. Work that touches the outside
+world runs in `lifespan`, when the server starts: logging is configured
+there, and with STARTUP_MIGRATE=true tables are created and pending
+migrations applied (otherwise that is `python -m app.migrations`, run once
+per deploy). On shutdown queued log records are written out and the
+engines' pools are closed.
+
+With STARTUP_LAZY_ROUTERS=true the API routers are not imported with
+app.main; LazyRouterMiddleware imports and includes each one on the first
+request under its prefix (all of them for the OpenAPI schema). That takes
+the router, schema and service modules off the import path, which is what
+a worker that restarts often, or a CLI that only needs the app object,
+pays for. Eagerly included routers stay the default.
+"""
+
+import importlib
+import logging
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
+from starlette.concurrency import run_in_threadpool
+
+from app.config import startup_settings
+from app.database import async_engine, engine, read_async_engine
+from app.logs import configure_logging, flush_logging
+
+logger = logging.getLogger(__name__)
+
+# (module, prefix, tags) of every API router, in the order they are included
+ROUTERS = (
+    ("app.routers.doctors", "/api/doctors", ["doctors"]),
+    ("app.routers.patients", "/api/patients", ["patients"]),
+    ("app.routers.appointments", "/api/appointments", ["appointments"]),
+    ("app.routers.services", "/api/services", ["services"]),
+    ("app.routers.stats", "/api/stats", ["stats"]),
+)
+
+
+def include_router(app: FastAPI, module: str, prefix: str, tags: list):
+    app.include_router(importlib.import_module(module).router, prefix=prefix, tags=tags)
+
+
+def include_routers(app: FastAPI):
+    for module, prefix, tags in ROUTERS:
+        include_router(app, module, prefix, tags)
+
+
+class LazyRouterMiddleware:
+    """Pure ASGI middleware: includes a router the first time a request reaches its prefix"""
+
+    def __init__(self, app):
+        self.app = app
+        self.pending = {prefix: (module, tags) for module, prefix, tags in ROUTERS}
+
+    def load(self, fastapi_app: FastAPI, prefix: str):
+        module, tags = self.pending.pop(prefix)
+        include_router(fastapi_app, module, prefix, tags)
+        # The schema is cached on first use; it has to list the new routes
+        fastapi_app.openapi_schema = None
+        logger.info("Loaded router %s", module)
+
+    async def __call__(self, scope, receive, send):
+        if self.pending and scope["type"] == "http":
+            # No await between the check and include_router, so concurrent first requests load a router once
+            path = scope["path"]
+            fastapi_app = scope["app"]
+            if path == fastapi_app.openapi_url:
+                for prefix in list(self.pending):
+                    self.load(fastapi_app, prefix)
+            else:
+                for prefix in list(self.pending):
+                    if path == prefix or path.startswith(prefix + "/"):
+                        self.load(fastapi_app, prefix)
+                        break
+        await self.app(scope, receive, send)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One queue-based handler for the whole app; records are written by a background thread
+    configure_logging()
+    if startup_settings.migrate:
+        from app.migrations import init_db
+
+        await run_in_threadpool(init_db, engine)
+    yield
+    flush_logging()
+    await async_engine.dispose()
+    if read_async_engine is not None:
+        await read_async_engine.dispose()
+    engine.dispose()
@@ -0,0 +1,330 @@
+"""
+Dashboard statistics from incrementally maintained summary tables
+
+`entity_counts` holds total and active rows of patients and doctors,
+`appointment_status_counts` appointments per status and
+`appointment_daily_counts` appointments per doctor, day and status.
+Triggers keep them current on every insert, update and delete, the same
+way `table_versions` is maintained (app/conditional.py), so single-row
+handlers, bulk operations, CSV imports and direct SQL all count. Archived
+appointments (app/archive.py) are counted as well. Reading
+the dashboard is a handful of primary-key lookups whatever the table
+sizes.
+
+Counts are updated in the writing transaction. On PostgreSQL concurrent
+writers of the same counter row (same status, same doctor and day) wait
+for each other until commit.
+
+A rebuild recounts everything from the base tables:
+    python -m app.stats rebuild
+    python -m app.stats check     # compare with a fresh count, exit 1 on drift
+"""
+
+from datetime import date
+from typing import Dict, List, Optional
+
+from sqlalchemy import Column, Date, Integer, MetaData, String, Table, case, delete, func, inspect, select, text, union_all
+
+from app.archive import ARCHIVE_TABLE, appointments_archive
+from app.models.appointment import Appointment
+from app.models.doctor import Doctor
+from app.models.patient import Patient
+
+COUNTED_TABLES = ("patients", "doctors")
+
+metadata = MetaData()
+
+entity_counts = Table(
+    "entity_counts",
+    metadata,
+    Column("table_name", String, primary_key=True),
+    Column("total", Integer, nullable=False),
+    Column("active", Integer, nullable=False),
+)
+
+appointment_status_counts = Table(
+    "appointment_status_counts",
+    metadata,
+    Column("status", String, primary_key=True),
+    Column("count", Integer, nullable=False),
+)
+
+# Day first: the dashboard reads one day across doctors; a doctor's range uses the index below
+appointment_daily_counts = Table(
+    "appointment_daily_counts",
+    metadata,
+    Column("day", Date, primary_key=True),
+    Column("doctor_id", Integer, primary_key=True),
+    Column("status", String, primary_key=True),
+    Column("count", Integer, nullable=False),
+)
+
+SQLITE_APPOINTMENT_TRIGGERS = {
+    "insert": ("AFTER INSERT ON appointments", ("+", "NEW")),
+    "delete": ("AFTER DELETE ON appointments", ("-", "OLD")),
+    "update": ("AFTER UPDATE OF status, doctor_id, appointment_date ON appointments", ("-", "OLD"), ("+", "NEW")),
+}
+
+
+def _sqlite_count(sign: str, row: str) -> str:
+    if sign == "-":
+        return f"""
+            UPDATE appointment_status_counts SET count = count - 1 WHERE status = {row}.status;
+            UPDATE appointment_daily_counts SET count = count - 1
+            WHERE day = date({row}.appointment_date) AND doctor_id = {row}.doctor_id AND status = {row}.status;
+        """
+    return f"""
+        INSERT INTO appointment_status_counts (status, count) SELECT {row}.status, 1 WHERE {row}.status IS NOT NULL
+        ON CONFLICT (status) DO UPDATE SET count = count + 1;
+        INSERT INTO appointment_daily_counts (day, doctor_id, status, count)
+        SELECT date({row}.appointment_date), {row}.doctor_id, {row}.status, 1
+        WHERE {row}.appointment_date IS NOT NULL AND {row}.doctor_id IS NOT NULL AND {row}.status IS NOT NULL
+        ON CONFLICT (day, doctor_id, status) DO UPDATE SET count = count + 1;
+    """
+
+
+def create_stats_tracking(conn):
+    """Summary tables, the triggers that maintain them, and their initial contents"""
+    metadata.create_all(conn)
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_appointment_daily_counts_doctor_day ON appointment_daily_counts (doctor_id, day)"
+    ))
+
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        for name, (event, *changes) in SQLITE_APPOINTMENT_TRIGGERS.items():
+            body = "".join(_sqlite_count(sign, row) for sign, row in changes)
+            conn.execute(text(f"CREATE TRIGGER IF NOT EXISTS appointments_stats_{name} {event} BEGIN {body} END"))
+        for table in COUNTED_TABLES:
+            for name, event, change in (
+                ("insert", "AFTER INSERT", "total = total + 1, active = active + (CASE WHEN NEW.is_active THEN 1 ELSE 0 END)"),
+                ("delete", "AFTER DELETE", "total = total - 1, active = active - (CASE WHEN OLD.is_active THEN 1 ELSE 0 END)"),
+                ("update", "AFTER UPDATE OF is_active",
+                 "active = active + (CASE WHEN NEW.is_active THEN 1 ELSE 0 END) - (CASE WHEN OLD.is_active THEN 1 ELSE 0 END)"),
+            ):
+                conn.execute(text(f"""
+                    CREATE TRIGGER IF NOT EXISTS {table}_stats_{name} {event} ON {table} BEGIN
+                        UPDATE entity_counts SET {change} WHERE table_name = '{table}';
+                    END
+                """))
+    elif dialect == "postgresql":
+        conn.execute(text("""
+            CREATE OR REPLACE FUNCTION count_appointment() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP IN ('DELETE', 'UPDATE') THEN
+                    UPDATE appointment_status_counts SET count = count - 1 WHERE status = OLD.status;
+                    UPDATE appointment_daily_counts SET count = count - 1
+                    WHERE day = OLD.appointment_date::date AND doctor_id = OLD.doctor_id AND status = OLD.status;
+                END IF;
+                IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.status IS NOT NULL THEN
+                    INSERT INTO appointment_status_counts (status, count) VALUES (NEW.status, 1)
+                    ON CONFLICT (status) DO UPDATE SET count = appointment_status_counts.count + 1;
+                    IF NEW.appointment_date IS NOT NULL AND NEW.doctor_id IS NOT NULL THEN
+                        INSERT INTO appointment_daily_counts (day, doctor_id, status, count)
+                        VALUES (NEW.appointment_date::date, NEW.doctor_id, NEW.status, 1)
+                        ON CONFLICT (day, doctor_id, status) DO UPDATE SET count = appointment_daily_counts.count + 1;
+                    END IF;
+                END IF;
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql
+        """))
+        conn.execute(text("""
+            CREATE OR REPLACE FUNCTION count_entity() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP = 'INSERT' THEN
+                    UPDATE entity_counts SET total = total + 1, active = active + (CASE WHEN NEW.is_active THEN 1 ELSE 0 END)
+                    WHERE table_name = TG_TABLE_NAME;
+                ELSIF TG_OP = 'DELETE' THEN
+                    UPDATE entity_counts SET total = total - 1, active = active - (CASE WHEN OLD.is_active THEN 1 ELSE 0 END)
+                    WHERE table_name = TG_TABLE_NAME;
+                ELSIF NEW.is_active IS DISTINCT FROM OLD.is_active THEN
+                    UPDATE entity_counts SET active = active + (CASE WHEN NEW.is_active THEN 1 ELSE -1 END)
+                    WHERE table_name = TG_TABLE_NAME;
+                END IF;
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql
+        """))
+        conn.execute(text("DROP TRIGGER IF EXISTS appointments_stats ON appointments"))
+        conn.execute(text("""
+            CREATE TRIGGER appointments_stats AFTER INSERT OR DELETE OR UPDATE OF status, doctor_id, appointment_date
+            ON appointments FOR EACH ROW EXECUTE FUNCTION count_appointment()
+        """))
+        for table in COUNTED_TABLES:
+            conn.execute(text(f"DROP TRIGGER IF EXISTS {table}_stats ON {table}"))
+            conn.execute(text(f"""
+                CREATE TRIGGER {table}_stats AFTER INSERT OR DELETE OR UPDATE OF is_active
+                ON {table} FOR EACH ROW EXECUTE FUNCTION count_entity()
+            """))
+
+    rebuild_stats(conn)
+
+
+def count_archived_appointments(conn):
+    """Count archive rows like appointments, so moving a row between the two leaves every counter as it was"""
+    if conn.dialect.name == "sqlite":
+        for name, (event, change) in {
+            "insert": (f"AFTER INSERT ON {ARCHIVE_TABLE}", ("+", "NEW")),
+            "delete": (f"AFTER DELETE ON {ARCHIVE_TABLE}", ("-", "OLD")),
+        }.items():
+            conn.execute(text(
+                f"CREATE TRIGGER IF NOT EXISTS {ARCHIVE_TABLE}_stats_{name} {event} BEGIN {_sqlite_count(*change)} END"
+            ))
+    elif conn.dialect.name == "postgresql":
+        conn.execute(text(f"DROP TRIGGER IF EXISTS {ARCHIVE_TABLE}_stats ON {ARCHIVE_TABLE}"))
+        conn.execute(text(f"""
+            CREATE TRIGGER {ARCHIVE_TABLE}_stats AFTER INSERT OR DELETE
+            ON {ARCHIVE_TABLE} FOR EACH ROW EXECUTE FUNCTION count_appointment()
+        """))
+    rebuild_stats(conn)
+
+
+def _counted_appointments(conn):
+    """The rows appointment counters cover: appointments, plus the archive once it exists"""
+    columns = ("appointment_date", "doctor_id", "status")
+    if not inspect(conn).has_table(ARCHIVE_TABLE):
+        return Appointment.__table__
+    return union_all(
+        select(*(Appointment.__table__.c[name] for name in columns)),
+        select(*(appointments_archive.c[name] for name in columns)),
+    ).subquery("counted_appointments")
+
+
+def _recount(conn):
+    """SELECTs computing each summary table from scratch"""
+    appointments = _counted_appointments(conn).c
+    day = func.date(appointments.appointment_date)
+    entities = [
+        select(
+            func.count().label("total"),
+            func.coalesce(func.sum(case((model.is_active, 1), else_=0)), 0).label("active"),
+        ).select_from(model)
+        for model in (Patient, Doctor)
+    ]
+    statuses = (
+        select(appointments.status, func.count())
+        .where(appointments.status.isnot(None))
+        .group_by(appointments.status)
+    )
+    daily = (
+        select(day, appointments.doctor_id, appointments.status, func.count())
+        .where(appointments.appointment_date.isnot(None), appointments.doctor_id.isnot(None), appointments.status.isnot(None))
+        .group_by(day, appointments.doctor_id, appointments.status)
+    )
+    return dict(zip(COUNTED_TABLES, entities)), statuses, daily
+
+
+def rebuild_stats(conn):
+    """Replace the summary tables' contents with a full recount"""
+    if conn.dialect.name == "postgresql":
+        # Hold writers off so no trigger updates a counter between the wipe and the recount
+        tables = "patients, doctors, appointments" + (f", {ARCHIVE_TABLE}" if inspect(conn).has_table(ARCHIVE_TABLE) else "")
+        conn.execute(text(f"LOCK TABLE {tables} IN SHARE MODE"))
+    entities, statuses, daily = _recount(conn)
+    for table in (entity_counts, appointment_status_counts, appointment_daily_counts):
+        conn.execute(delete(table))
+    for table_name, query in entities.items():
+        total, active = conn.execute(query).one()
+        conn.execute(entity_counts.insert().values(table_name=table_name, total=total, active=active))
+    conn.execute(appointment_status_counts.insert().from_select(["status", "count"], statuses))
+    conn.execute(appointment_daily_counts.insert().from_select(["day", "doctor_id", "status", "count"], daily))
+
+
+def check_stats(conn) -> List[str]:
+    """Differences between the summary tables and a fresh count; empty when they agree"""
+    entities, statuses, daily = _recount(conn)
+    problems = []
+
+    stored = {row.table_name: (row.total, row.active) for row in conn.execute(select(entity_counts))}
+    for table_name, query in entities.items():
+        actual = tuple(conn.execute(query).one())
+        if stored.get(table_name) != actual:
+            problems.append(f"{table_name}: stored {stored.get(table_name)}, actual {actual}")
+
+    def compare(name, stored_rows, actual_rows):
+        stored = {tuple(key): count for *key, count in stored_rows if count}
+        actual = {tuple(key): count for *key, count in actual_rows}
+        for key in sorted(set(stored) | set(actual), key=str):
+            if stored.get(key, 0) != actual.get(key, 0):
+                problems.append(f"{name} {key}: stored {stored.get(key, 0)}, actual {actual.get(key, 0)}")
+
+    compare("status", conn.execute(select(appointment_status_counts)), conn.execute(statuses))
+    compare(
+        "daily",
+        ((str(r.day), r.doctor_id, r.status, r.count) for r in conn.execute(select(appointment_daily_counts))),
+        ((str(d), doctor_id, s, c) for d, doctor_id, s, c in conn.execute(daily)),
+    )
+    return problems
+
+
+def _by_day(rows) -> List[dict]:
+    """Group (day, doctor_id, status, count) rows into one entry per doctor and day"""
+    grouped: Dict[tuple, dict] = {}
+    for day, doctor_id, status, count in rows:
+        entry = grouped.setdefault((day, doctor_id), {"day": day, "doctor_id": doctor_id, "total": 0, "by_status": {}})
+        entry["by_status"][status] = count
+        entry["total"] += count
+    return list(grouped.values())
+
+
+async def load_summary(db, day: date) -> dict:
+    """Totals plus every doctor's appointments on `day`"""
+    entities = {
+        row.table_name: row for row in (await db.execute(select(entity_counts))).all()
+    }
+    statuses = {
+        status: count for status, count in (await db.execute(select(appointment_status_counts))).all() if count
+    }
+    per_doctor = await db.execute(
+        select(appointment_daily_counts.c.day, appointment_daily_counts.c.doctor_id,
+               appointment_daily_counts.c.status, appointment_daily_counts.c.count)
+        .where(appointment_daily_counts.c.day == day, appointment_daily_counts.c.count > 0)
+        .order_by(appointment_daily_counts.c.doctor_id)
+    )
+    patients, doctors = entities.get("patients"), entities.get("doctors")
+    return {
+        "patients": patients.total if patients else 0,
+        "active_patients": patients.active if patients else 0,
+        "doctors": doctors.total if doctors else 0,
+        "active_doctors": doctors.active if doctors else 0,
+        "appointments": sum(statuses.values()),
+        "appointments_by_status": statuses,
+        "day": day,
+        "appointments_per_doctor": _by_day(per_doctor.all()),
+    }
+
+
+async def load_daily(db, date_from: date, date_to: date, doctor_id: Optional[int] = None) -> List[dict]:
+    """Appointments per doctor per day in [date_from, date_to]"""
+    daily = appointment_daily_counts.c
+    query = (
+        select(daily.day, daily.doctor_id, daily.status, daily.count)
+        .where(daily.day >= date_from, daily.day <= date_to, daily.count > 0)
+        .order_by(daily.day, daily.doctor_id)
+    )
+    if doctor_id is not None:
+        query = query.where(daily.doctor_id == doctor_id)
+    return _by_day((await db.execute(query)).all())
+
+
+if __name__ == "__main__":
+    import logging
+    import sys
+
+    from app.database import engine
+
+    logging.basicConfig(level=logging.INFO)
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "rebuild":
+        with engine.begin() as conn:
+            rebuild_stats(conn)
+        logging.info("Statistics rebuilt")
+    elif command == "check":
+        with engine.connect() as conn:
+            problems = check_stats(conn)
+        for problem in problems:
+            print(problem)
+        sys.exit(1 if problems else 0)
+    else:
+        sys.exit("usage: python -m app.stats rebuild|check")
@@ -0,0 +1,94 @@
+"""
+Archive benchmark: per-doctor and per-patient reads before and after archival
+
+Generates several years of appointments with app.datagen, times the
+per-doctor and per-patient endpoints, moves everything past the horizon
+with app.archive (reporting rows/s), then times the same requests on the
+hot table and with ?include_archived=true. Reports the median in-process
+request time and the number of rows returned.
+
+    python -m benchmarks.archive --patients 20000 --days 1095 --horizon-days 365
+"""
+
+import argparse
+import json
+import os
+import statistics
+import time
+from datetime import date, datetime, timedelta
+
+
+def measure(client, url: str, repeat: int) -> dict:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get(url)
+        samples.append(time.perf_counter() - started)
+    body = response.json()
+    rows = len(body["items"]) if isinstance(body, dict) else len(body)
+    return {"request_ms": round(statistics.median(samples) * 1000, 2), "rows": rows}
+
+
+def main(args):
+    os.makedirs(os.path.dirname(os.path.abspath(args.db)), exist_ok=True)
+    for path in (args.db, f"{args.db}-wal", f"{args.db}-shm"):
+        if os.path.exists(path):
+            os.remove(path)
+    # app.database reads DATABASE_URL on import
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(args.db)}"
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import func, select
+
+    from app.archive import archive_appointments
+    from app.database import engine
+    from app.datagen import Plan, generate
+    from app.main import app
+    from app.models.appointment import Appointment
+
+    as_of = date.today()
+    counts = generate(engine, Plan(args.doctors, args.patients, args.appointments_per_day, args.days, args.seed, as_of=as_of))
+    with engine.connect() as conn:
+        doctor_id, patient_id = (
+            conn.execute(select(column).group_by(column).order_by(func.count().desc()).limit(1)).scalar()
+            for column in (Appointment.doctor_id, Appointment.patient_id)
+        )
+
+    client = TestClient(app)
+    urls = {
+        "doctor": f"/api/appointments/doctor/{doctor_id}",
+        "patient": f"/api/appointments/patient/{patient_id}",
+        "doctor_page": f"/api/appointments/?doctor_id={doctor_id}&cursor=&limit=100",
+    }
+    results = {"before": {name: measure(client, url, args.repeat) for name, url in urls.items()}}
+
+    started = time.perf_counter()
+    moved = archive_appointments(
+        engine, datetime.combine(as_of, datetime.min.time()) - timedelta(days=args.horizon_days), args.batch_size
+    )
+    seconds = time.perf_counter() - started
+
+    results["hot"] = {name: measure(client, url, args.repeat) for name, url in urls.items()}
+    results["include_archived"] = {
+        name: measure(client, f"{url}{'&' if '?' in url else '?'}include_archived=true", args.repeat)
+        for name, url in urls.items()
+    }
+    print(json.dumps({
+        "dataset": counts,
+        "archive": {"moved": moved, "seconds": round(seconds, 2), "rows_per_second": round(moved / seconds) if seconds else None},
+        "results": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--doctors", type=int, default=20)
+    parser.add_argument("--patients", type=int, default=20000)
+    parser.add_argument("--appointments-per-day", type=int, default=8)
+    parser.add_argument("--days", type=int, default=1095)
+    parser.add_argument("--horizon-days", type=int, default=365)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--db", default="./bench_data/bench_archive.db")
+    main(parser.parse_args())
@@ -0,0 +1,99 @@
+"""
+Double-booking race: fire many simultaneous bookings for one doctor slot
+
+Exactly one request must succeed (201); every other one must be rejected
+with 409. Runs in-process against a fresh SQLite database by default, or
+against a running server with --url.
+
+    python -m benchmarks.booking_race --requests 300
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+
+import httpx
+
+
+async def race(client: httpx.AsyncClient, requests: int, overlap: bool):
+    run = uuid.uuid4().hex[:8]
+    doctor = (await client.post("/api/doctors/", json={
+        "name": f"Race Doctor {run}",
+        "specialization": "Кардиолог",
+        "email": f"race-{run}@bench.example.com",
+        "phone": "+7 (700) 000-0000",
+        "license_number": f"RACE-{run}",
+    })).json()
+    patient = (await client.post("/api/patients/", json={
+        "first_name": "Race",
+        "last_name": run,
+        "email": f"race-patient-{run}@bench.example.com",
+        "phone": "+7 (700) 000-0000",
+        "date_of_birth": "1990-01-01",
+        "address": "Алматы қ.",
+    })).json()
+
+    slot = (datetime.now() + timedelta(days=3)).replace(hour=10, minute=0, second=0, microsecond=0)
+
+    def payload(i):
+        # With --overlap every request starts at a different minute inside the same half hour
+        start = slot + timedelta(minutes=i % 30) if overlap else slot
+        return {
+            "patient_id": patient["id"],
+            "doctor_id": doctor["id"],
+            "appointment_date": start.isoformat(),
+            "duration_minutes": 30,
+        }
+
+    started = time.perf_counter()
+    responses = await asyncio.gather(
+        *(client.post("/api/appointments/", json=payload(i)) for i in range(requests)),
+        return_exceptions=True,
+    )
+    elapsed = time.perf_counter() - started
+
+    statuses = Counter(
+        r.status_code if isinstance(r, httpx.Response) else type(r).__name__ for r in responses
+    )
+    booked = (await client.get(f"/api/appointments/doctor/{doctor['id']}")).json()
+    return {
+        "requests": requests,
+        "elapsed_s": round(elapsed, 2),
+        "statuses": {str(k): v for k, v in sorted(statuses.items(), key=str)},
+        "booked": len(booked),
+        "ok": statuses.get(201) == 1 and statuses.get(409) == requests - 1 and len(booked) == 1,
+    }
+
+
+async def main(args):
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=120,
+                                   limits=httpx.Limits(max_connections=args.requests))
+    else:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/race.db"
+        from app.database import engine
+        from app.main import app
+        from app.migrations import init_db
+
+        init_db(engine)
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://race", timeout=120)
+
+    async with client:
+        report = await race(client, args.requests, args.overlap)
+    print(json.dumps(report, indent=2))
+    return 0 if report["ok"] else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--url", help="Running server; default is an in-process app on a temporary database")
+    parser.add_argument("--overlap", action="store_true", help="Use overlapping, not identical, start times")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,94 @@
+"""
+Columnar benchmark: payload size and server CPU per appointment page
+
+Generates a dataset with app.datagen, then fetches a max-size page
+(limit=1000) of the appointment list and one doctor's full list as
+regular JSON, ?format=columnar and MessagePack (Accept:
+application/msgpack, when msgpack is installed), with and without
+?expand=patient,doctor. Reports per variant:
+
+- body size without compression and as sent by GZipMiddleware,
+- median in-process request time,
+- CPU time per page (process time over the repeats; the in-process client
+  is the same for every variant, so differences are the server's).
+
+    python -m benchmarks.columnar --patients 20000 --db ./bench_data/bench_columnar.db
+"""
+
+import argparse
+import json
+import os
+import statistics
+import time
+from datetime import date
+
+
+def measure(client, url: str, headers: dict, repeat: int) -> dict:
+    samples = []
+    cpu_started = time.process_time()
+    for _ in range(repeat):
+        started = time.perf_counter()
+        client.get(url, headers=headers)
+        samples.append(time.perf_counter() - started)
+    cpu = (time.process_time() - cpu_started) / repeat
+    return {"request_ms": round(statistics.median(samples) * 1000, 2), "cpu_ms": round(cpu * 1000, 2)}
+
+
+def main(args):
+    os.makedirs(os.path.dirname(os.path.abspath(args.db)), exist_ok=True)
+    for path in (args.db, f"{args.db}-wal", f"{args.db}-shm"):
+        if os.path.exists(path):
+            os.remove(path)
+    # app.database reads DATABASE_URL on import
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(args.db)}"
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import func, select
+
+    from app.columnar import msgpack
+    from app.database import engine
+    from app.datagen import Plan, generate
+    from app.main import app
+    from app.models.appointment import Appointment
+
+    counts = generate(engine, Plan(args.doctors, args.patients, 8, args.days, args.seed, as_of=date(2026, 1, 15)))
+    with engine.connect() as conn:
+        busiest = conn.execute(
+            select(Appointment.doctor_id).group_by(Appointment.doctor_id).order_by(func.count().desc()).limit(1)
+        ).scalar()
+
+    client = TestClient(app)
+    encodings = {"json": ({}, ""), "columnar": ({}, "format=columnar")}
+    if msgpack is not None:
+        encodings["msgpack"] = ({"Accept": "application/msgpack"}, "")
+
+    results = []
+    for path, limit in (("/api/appointments/", "limit=1000"), (f"/api/appointments/doctor/{busiest}", "")):
+        for expand in ("", "expand=patient,doctor"):
+            for name, (headers, query) in encodings.items():
+                url = f"{path}?{'&'.join(q for q in (limit, query, expand) if q)}".rstrip("?")
+                plain = client.get(url, headers={**headers, "Accept-Encoding": "identity"})
+                gzipped = client.get(url, headers={**headers, "Accept-Encoding": "gzip"})
+                results.append({
+                    "endpoint": url,
+                    "encoding": name,
+                    "status": plain.status_code,
+                    "bytes": {
+                        "identity": len(plain.content),
+                        "gzip": int(gzipped.headers.get("content-length", len(gzipped.content))),
+                    },
+                    **measure(client, url, {**headers, "Accept-Encoding": "identity"}, args.repeat),
+                })
+
+    print(json.dumps({"dataset": counts, "msgpack": msgpack is not None, "results": results}, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--doctors", type=int, default=20)
+    parser.add_argument("--patients", type=int, default=20000)
+    parser.add_argument("--days", type=int, default=120)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--db", default="./bench_data/bench_columnar.db")
+    main(parser.parse_args())
@@ -0,0 +1,137 @@
+"""
+Concurrency benchmark: requests/sec under a mixed read/write load
+
+Runs against an already started server, e.g.:
+
+    python -m uvicorn app.main:app --port 8000
+    python -m benchmarks.concurrency --url http://127.0.0.1:8000 --concurrency 50 --duration 15
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import httpx
+
+# (operation name, weight)
+MIX = [
+    ("list_appointments", 50),
+    ("get_doctor", 20),
+    ("search_patients", 15),
+    ("create_appointment", 15),
+]
+
+
+async def seed(client: httpx.AsyncClient, doctors: int, patients: int):
+    """Create the doctors and patients the load phase works with"""
+    run = uuid.uuid4().hex[:8]
+    doctor_ids, patient_ids = [], []
+    for i in range(doctors):
+        response = await client.post("/api/doctors/", json={
+            "name": f"Bench Doctor {run}-{i}",
+            "specialization": random.choice(["Кардиолог", "Невролог", "Ортопед"]),
+            "email": f"doctor-{run}-{i}@bench.example.com",
+            "phone": "+7 (700) 000-0000",
+            "license_number": f"BENCH-{run}-{i}",
+        })
+        response.raise_for_status()
+        doctor_ids.append(response.json()["id"])
+    for i in range(patients):
+        response = await client.post("/api/patients/", json={
+            "first_name": f"Bench{i}",
+            "last_name": f"Patient{run}",
+            "email": f"patient-{run}-{i}@bench.example.com",
+            "phone": "+7 (700) 000-0000",
+            "date_of_birth": "1990-01-01",
+            "address": "Алматы қ.",
+        })
+        response.raise_for_status()
+        patient_ids.append(response.json()["id"])
+    return doctor_ids, patient_ids
+
+
+async def run_operation(client, name, doctor_ids, patient_ids):
+    if name == "list_appointments":
+        return await client.get("/api/appointments/", params={"limit": 100})
+    if name == "get_doctor":
+        return await client.get(f"/api/doctors/{random.choice(doctor_ids)}")
+    if name == "search_patients":
+        return await client.get("/api/patients/", params={"search": "Bench", "limit": 50})
+    return await client.post("/api/appointments/", json={
+        "patient_id": random.choice(patient_ids),
+        "doctor_id": random.choice(doctor_ids),
+        "appointment_date": (datetime.now() + timedelta(days=random.randint(1, 365),
+                                                        minutes=random.randint(0, 10_000))).isoformat(),
+        "duration_minutes": 30,
+    })
+
+
+async def worker(client, deadline, doctor_ids, patient_ids, samples, errors):
+    names = [name for name, _ in MIX]
+    weights = [weight for _, weight in MIX]
+    while time.perf_counter() < deadline:
+        name = random.choices(names, weights)[0]
+        started = time.perf_counter()
+        try:
+            response = await run_operation(client, name, doctor_ids, patient_ids)
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            ok = False
+        samples.setdefault(name, []).append(time.perf_counter() - started)
+        if not ok:
+            errors[name] = errors.get(name, 0) + 1
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def main(args):
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=60) as client:
+        doctor_ids, patient_ids = await seed(client, args.doctors, args.patients)
+
+        samples, errors = {}, {}
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*(
+            worker(client, deadline, doctor_ids, patient_ids, samples, errors)
+            for _ in range(args.concurrency)
+        ))
+        elapsed = time.perf_counter() - started
+
+    total = sum(len(v) for v in samples.values())
+    report = {
+        "url": args.url,
+        "concurrency": args.concurrency,
+        "duration_s": round(elapsed, 2),
+        "requests": total,
+        "requests_per_sec": round(total / elapsed, 1),
+        "errors": sum(errors.values()),
+        "operations": {
+            name: {
+                "count": len(values),
+                "errors": errors.get(name, 0),
+                "p50_ms": round(statistics.median(values) * 1000, 1),
+                "p95_ms": round(percentile(values, 95) * 1000, 1),
+            }
+            for name, values in sorted(samples.items())
+        },
+    }
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--doctors", type=int, default=10)
+    parser.add_argument("--patients", type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
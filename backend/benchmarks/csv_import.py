@@ -0,0 +1,89 @@
+"""
+CSV import benchmark: rows/sec of the streaming importer
+
+Writes a synthetic patients CSV (with a share of duplicate and invalid
+rows), imports it into a fresh SQLite database through app.importer and
+reports throughput and peak RSS.
+
+    python -m benchmarks.csv_import --rows 1000000 --db ./bench_data/bench_import.db
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import os
+import random
+import resource
+import time
+
+COLUMNS = ["first_name", "last_name", "email", "phone", "date_of_birth", "address", "allergies"]
+FIRST_NAMES = ["Нұрлан", "Айнара", "Барлас", "Гүлнар", "Ерсултан", "Айгерім", "Дамир", "Асель", "John", "Maria"]
+LAST_NAMES = ["Сәрсембаев", "Досова", "Кәрім", "Әлеуова", "Қоңғырбаев", "Ахметов", "Смагулова", "Smith"]
+
+
+def write_csv(path: str, rows: int, duplicate_share: float, invalid_share: float, seed: int = 42):
+    rng = random.Random(seed)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        for i in range(rows):
+            email = f"patient{i}@example.com"
+            roll = rng.random()
+            if roll < duplicate_share and i:
+                email = f"patient{rng.randrange(i)}@example.com"
+            elif roll < duplicate_share + invalid_share:
+                email = f"patient{i}-at-example.com"
+            writer.writerow([
+                rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES), email, "+7 (700) 000-0000",
+                f"19{rng.randint(40, 99)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                "Алматы қ.", "",
+            ])
+
+
+def main(args):
+    os.makedirs(os.path.dirname(os.path.abspath(args.db)), exist_ok=True)
+    os.makedirs(os.path.dirname(os.path.abspath(args.csv)), exist_ok=True)
+    for path in (args.db, f"{args.db}-wal", f"{args.db}-shm"):
+        if os.path.exists(path):
+            os.remove(path)
+    # app.database reads DATABASE_URL on import
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(args.db)}"
+
+    from app.database import AsyncSessionLocal, engine
+    from app.importer import import_csv
+    from app.migrations import init_db
+    from app.routers.patients import IMPORT_SPEC
+
+    init_db(engine)
+
+    started = time.perf_counter()
+    write_csv(args.csv, args.rows, args.duplicates, args.invalid)
+    generate_s = time.perf_counter() - started
+
+    async def run():
+        with open(args.csv, newline="", encoding="utf-8") as text:
+            async with AsyncSessionLocal() as db:
+                return await import_csv(db, text, IMPORT_SPEC, chunk_size=args.chunk_size)
+
+    report = asyncio.run(run())
+    result = report.result()
+    result.pop("rejects")
+    print(json.dumps({
+        "rows": args.rows,
+        "chunk_size": args.chunk_size,
+        "generate_csv_s": round(generate_s, 2),
+        **result,
+        "max_rss_mib": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--csv", default="./bench_data/bench_import.csv")
+    parser.add_argument("--db", default="./bench_data/bench_import.db")
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--duplicates", type=float, default=0.01, help="Share of rows repeating an earlier email")
+    parser.add_argument("--invalid", type=float, default=0.005, help="Share of rows with an invalid email")
+    main(parser.parse_args())
@@ -0,0 +1,100 @@
+"""
+Export benchmark: peak memory of the streaming export vs loading everything
+
+Builds a SQLite database with N patients, then streams
+/api/patients/export through the ASGI app (bytes are counted and thrown
+away, as a slow client would) and compares the traced peak with
+materialising the same rows as ORM objects and one JSON document.
+
+    python -m benchmarks.export --patients 1000000 --db ./bench_data/bench_export.db
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+import tracemalloc
+
+
+async def stream_endpoint(app, path: str, query_string: bytes = b""):
+    """Drive one GET through the ASGI app; returns (status, bytes received)"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": query_string,
+        "root_path": "", "headers": [(b"host", b"bench")], "client": ("bench", 0), "server": ("bench", 80),
+    }
+    received = {"status": None, "bytes": 0}
+    requested = False
+    finished = asyncio.Event()
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            received["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            received["bytes"] += len(message.get("body", b""))
+            if not message.get("more_body", False):
+                finished.set()
+
+    await app(scope, receive, send)
+    return received["status"], received["bytes"]
+
+
+def measure(label, func):
+    tracemalloc.start()
+    started = time.perf_counter()
+    detail = func()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"label": label, "seconds": round(elapsed, 2), "peak_mib": round(peak / 2**20, 1), **detail}
+
+
+def main(args):
+    os.makedirs(os.path.dirname(os.path.abspath(args.db)), exist_ok=True)
+    for path in (args.db, f"{args.db}-wal", f"{args.db}-shm"):
+        if os.path.exists(path):
+            os.remove(path)
+    # app.database reads DATABASE_URL on import
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(args.db)}"
+
+    from sqlalchemy import select
+    from sqlalchemy.orm import Session
+
+    from app.main import app
+    from app.models.patient import Patient
+    from benchmarks.search import build
+
+    engine, insert_s, _ = build(args.db, args.patients)
+
+    results = []
+    for fmt in ("ndjson", "csv"):
+        def run_export(fmt=fmt):
+            status, size = asyncio.run(stream_endpoint(app, "/api/patients/export", f"format={fmt}".encode()))
+            return {"status": status, "mib_sent": round(size / 2**20, 1)}
+        results.append(measure(f"streaming export ({fmt})", run_export))
+
+    def load_all():
+        with Session(engine) as session:
+            patients = session.execute(select(Patient).order_by(Patient.id)).scalars().all()
+            columns = [c.name for c in Patient.__table__.columns]
+            body = json.dumps([{c: getattr(p, c) for c in columns} for p in patients], default=str)
+        return {"status": None, "mib_sent": round(len(body.encode()) / 2**20, 1)}
+    results.append(measure("load all + json.dumps", load_all))
+
+    print(json.dumps({"patients": args.patients, "insert_s": round(insert_s, 2), "results": results}, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--patients", type=int, default=200000)
+    parser.add_argument("--db", default="./bench_data/bench_export.db")
+    main(parser.parse_args())
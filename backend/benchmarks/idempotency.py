@@ -0,0 +1,109 @@
+"""
+Idempotency-Key overhead: creates without a key, with a fresh key, and replays
+
+Times POST /api/patients/ in-process on a fresh SQLite database: without
+the header, with a new key per request (claim + store), and repeating one
+key (replay of the stored response). Then fires --storm simultaneous
+duplicates of one appointment booking and checks that exactly one row was
+created and every other request got the same response.
+
+    python -m benchmarks.idempotency --requests 500 --storm 200
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+import httpx
+
+
+def patient(i: int) -> dict:
+    return {
+        "first_name": "Bench",
+        "last_name": f"Patient {i}",
+        "email": f"idem-{i}@bench.example.com",
+        "phone": "+7 (700) 000-0000",
+        "date_of_birth": "1990-01-01",
+        "address": "Алматы қ.",
+    }
+
+
+async def measure(client: httpx.AsyncClient, requests: int, body, key=None) -> dict:
+    samples = []
+    statuses = Counter()
+    for i in range(requests):
+        headers = {"Idempotency-Key": key(i)} if key else {}
+        started = time.perf_counter()
+        response = await client.post("/api/patients/", json=body(i), headers=headers)
+        samples.append(time.perf_counter() - started)
+        statuses[response.status_code] += 1
+    return {
+        "request_ms": round(statistics.median(samples) * 1000, 3),
+        "statuses": {str(k): v for k, v in sorted(statuses.items())},
+    }
+
+
+async def storm(client: httpx.AsyncClient, requests: int) -> dict:
+    doctor = (await client.post("/api/doctors/", json={
+        "name": "Storm Doctor",
+        "specialization": "Кардиолог",
+        "email": "storm@bench.example.com",
+        "phone": "+7 (700) 000-0000",
+        "license_number": "STORM-1",
+    })).json()
+    owner = (await client.post("/api/patients/", json=patient(-1))).json()
+    payload = {
+        "patient_id": owner["id"],
+        "doctor_id": doctor["id"],
+        "appointment_date": (datetime.now() + timedelta(days=3)).replace(hour=10, minute=0, second=0, microsecond=0).isoformat(),
+        "duration_minutes": 30,
+    }
+    started = time.perf_counter()
+    responses = await asyncio.gather(*(
+        client.post("/api/appointments/", json=payload, headers={"Idempotency-Key": "storm-1"}) for _ in range(requests)
+    ))
+    elapsed = time.perf_counter() - started
+    booked = (await client.get(f"/api/appointments/doctor/{doctor['id']}")).json()
+    return {
+        "requests": requests,
+        "elapsed_s": round(elapsed, 2),
+        "statuses": {str(k): v for k, v in sorted(Counter(r.status_code for r in responses).items())},
+        "replayed": sum(r.headers.get("idempotent-replayed") == "true" for r in responses),
+        "distinct_bodies": len({r.content for r in responses}),
+        "booked": len(booked),
+        "ok": len(booked) == 1 and all(r.status_code == 201 for r in responses) and len({r.content for r in responses}) == 1,
+    }
+
+
+async def main(args):
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/idempotency.db"
+    os.environ.setdefault("LOG_FILE", os.devnull)
+    from app.database import engine
+    from app.main import app
+    from app.migrations import init_db
+
+    init_db(engine)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=120) as client:
+        n = args.requests
+        report = {
+            "no_key": await measure(client, n, lambda i: patient(i)),
+            "new_key": await measure(client, n, lambda i: patient(n + i), lambda i: f"create-{i}"),
+            "replay": await measure(client, n, lambda i: patient(2 * n), lambda i: "replay"),
+            "storm": await storm(client, args.storm),
+        }
+    print(json.dumps(report, indent=2))
+    return 0 if report["storm"]["ok"] else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--storm", type=int, default=200, help="Simultaneous duplicates of one booking")
+    sys.exit(asyncio.run(main(parser.parse_args())))
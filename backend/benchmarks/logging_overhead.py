@@ -0,0 +1,117 @@
+"""
+Logging overhead benchmark: cost of logging inside the request path
+
+Runs the same in-process requests under several logging setups and
+reports the mean request time and its overhead over logging disabled:
+
+- sync: the previous setup, a plain-text handler formatting and writing
+  every record (router INFO logs plus an access line) in the request thread,
+- queue: app.logs with every record kept (LOG_SUCCESS_SAMPLE_RATE=1),
+- queue+sampled: app.logs with the default success sample rate,
+- disabled: logging.disable(), the lower bound.
+
+It also times a bare `logger.info` call in each setup, which is what the
+request thread pays per record.
+
+    python -m benchmarks.logging_overhead --requests 10000 --log-file ./bench_data/bench_logging.log
+"""
+
+import argparse
+import json
+import logging
+import os
+import statistics
+import time
+
+
+def time_requests(client, urls, requests: int) -> float:
+    """Mean microseconds per request"""
+    started = time.perf_counter()
+    for i in range(requests):
+        client.get(urls[i % len(urls)])
+    return (time.perf_counter() - started) / requests * 1e6
+
+
+def time_log_calls(calls: int) -> float:
+    """Mean microseconds per logger.info call"""
+    logger = logging.getLogger("app.routers.bench")
+    started = time.perf_counter()
+    for i in range(calls):
+        logger.info("Retrieved %s patients", i)
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+def main(args):
+    os.makedirs(os.path.dirname(os.path.abspath(args.db)), exist_ok=True)
+    os.makedirs(os.path.dirname(os.path.abspath(args.log_file)), exist_ok=True)
+    for path in (args.db, f"{args.db}-wal", f"{args.db}-shm"):
+        if os.path.exists(path):
+            os.remove(path)
+    # app.database reads DATABASE_URL on import
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(args.db)}"
+
+    from fastapi.testclient import TestClient
+
+    from app.config import LogSettings, log_settings
+    from app.database import engine
+    from app.datagen import Plan, generate
+    from app.logs import configure_logging, flush_logging
+    from app.main import app
+
+    generate(engine, Plan(10, 1000, 6, 30, 42))
+    client = TestClient(app)
+    urls = ["/api/patients/1", "/api/patients/?limit=10", "/api/doctors/2", "/api/appointments/?limit=10"]
+    # The test client logs every request itself
+    logging.getLogger("httpx").propagate = False
+
+    def sync_setup():
+        configure_logging(LogSettings(file=args.log_file, success_sample_rate=1.0))
+        flush_logging()
+        handler = logging.FileHandler(args.log_file, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(levelname)s:%(name)s:%(message)s"))
+        logging.getLogger().handlers = [handler]
+
+    setups = {
+        "disabled": lambda: (configure_logging(LogSettings(file=args.log_file)), logging.disable(logging.CRITICAL)),
+        "sync": sync_setup,
+        "queue": lambda: configure_logging(LogSettings(file=args.log_file, success_sample_rate=1.0)),
+        "queue+sampled": lambda: configure_logging(LogSettings(file=args.log_file)),
+    }
+
+    # Setups take turns over several rounds so drift (caches, the OS) hits them all alike; the median round counts
+    samples = {name: {"request_us": [], "log_call_us": []} for name in setups}
+    for name in setups:
+        for url in urls:
+            client.get(url)
+    for _ in range(args.rounds):
+        for name, setup in setups.items():
+            logging.disable(logging.NOTSET)
+            setup()
+            samples[name]["request_us"].append(time_requests(client, urls, args.requests // args.rounds))
+            samples[name]["log_call_us"].append(time_log_calls(args.calls))
+            flush_logging()
+    logging.disable(logging.NOTSET)
+    results = {
+        name: {key: round(statistics.median(values), 2) for key, values in measured.items()}
+        for name, measured in samples.items()
+    }
+
+    baseline = results["disabled"]["request_us"]
+    for result in results.values():
+        result["overhead_us"] = round(result["request_us"] - baseline, 1)
+    print(json.dumps({
+        "requests": args.requests,
+        "success_sample_rate": log_settings.success_sample_rate,
+        "log_file": args.log_file,
+        "results": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--calls", type=int, default=20000, help="logger.info calls per setup and round")
+    parser.add_argument("--log-file", default="./bench_data/bench_logging.log")
+    parser.add_argument("--db", default="./bench_data/bench_logging.db")
+    main(parser.parse_args())
@@ -0,0 +1,122 @@
+"""
+Search benchmark: full-text index vs the old ilike('%term%') scan
+
+Builds a SQLite database with N patients, creates the FTS index through
+the regular migrations and times both query paths for a few terms.
+
+    python -m benchmarks.search --patients 1000000 --db ./bench_data/bench_search.db
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import time
+
+from sqlalchemy import create_engine, event, or_, select
+from sqlalchemy.orm import Session
+
+FIRST_NAMES = ["Нұрлан", "Айнара", "Барлас", "Гүлнар", "Ерсултан", "Айгерім", "Дамир", "Асель", "John", "Maria"]
+LAST_NAMES = ["Сәрсембаев", "Досова", "Кәрім", "Әлеуова", "Қоңғырбаев", "Ахметов", "Смагулова", "Smith"]
+
+
+def build(db_path: str, patients: int, chunk: int = 20000):
+    from app.database import Base, apply_sqlite_pragmas
+    from app.migrations import upgrade
+    from app.models.patient import Patient
+
+    engine = create_engine(f"sqlite:///{db_path}")
+    event.listen(engine, "connect", apply_sqlite_pragmas)
+    Base.metadata.create_all(engine)
+
+    rng = random.Random(42)
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        for offset in range(0, patients, chunk):
+            rows = []
+            for i in range(offset, min(offset + chunk, patients)):
+                first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+                rows.append({
+                    "first_name": first,
+                    "last_name": f"Rare{i}" if i % 1000 == 0 else last,
+                    "email": f"patient{i}@example.com",
+                    "phone": "+7 (700) 000-0000",
+                    "address": "Алматы қ.",
+                    "is_active": True,
+                })
+            conn.execute(Patient.__table__.insert(), rows)
+    insert_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    upgrade(engine)
+    index_s = time.perf_counter() - started
+    return engine, insert_s, index_s
+
+
+def timed(session, query, repeat):
+    samples = []
+    rows = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = len(session.execute(query).all())
+        samples.append(time.perf_counter() - started)
+    return round(statistics.median(samples) * 1000, 2), rows
+
+
+def main(args):
+    from app.models.patient import Patient
+    from app.search import apply_search
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.db)), exist_ok=True)
+    if os.path.exists(args.db):
+        os.remove(args.db)
+    engine, insert_s, index_s = build(args.db, args.patients)
+
+    terms = [
+        ("common first name", "Нұрлан"),
+        ("prefix", "Айг"),
+        ("rare last name", f"Rare{(args.patients // 2) // 1000 * 1000}"),
+        ("email", f"patient{args.patients - 1}@example.com"),
+        ("no match", "Zzyzx"),
+    ]
+    results = []
+    with Session(engine) as session:
+        for label, term in terms:
+            base = select(Patient)
+            ilike_query = base.where(or_(
+                Patient.first_name.ilike(f"%{term}%"),
+                Patient.last_name.ilike(f"%{term}%"),
+                Patient.email.ilike(f"%{term}%"),
+            )).order_by(Patient.id).limit(args.limit)
+            fts_query = apply_search(base, Patient, term, "sqlite").order_by(Patient.id).limit(args.limit)
+            unranked_query = apply_search(base, Patient, term, "sqlite", ranked=False).order_by(Patient.id).limit(args.limit)
+            ilike_ms, ilike_rows = timed(session, ilike_query, args.repeat)
+            fts_ms, fts_rows = timed(session, fts_query, args.repeat)
+            unranked_ms, _ = timed(session, unranked_query, args.repeat)
+            results.append({
+                "case": label,
+                "term": term,
+                "ilike_ms": ilike_ms,
+                "ilike_rows": ilike_rows,
+                "fts_ms": fts_ms,
+                "fts_rows": fts_rows,
+                "fts_unranked_ms": unranked_ms,
+            })
+
+    print(json.dumps({
+        "patients": args.patients,
+        "insert_s": round(insert_s, 1),
+        "fts_build_s": round(index_s, 1),
+        "limit": args.limit,
+        "results": results,
+    }, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--patients", type=int, default=1_000_000)
+    parser.add_argument("--db", default="./bench_data/bench_search.db")
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    main(parser.parse_args())
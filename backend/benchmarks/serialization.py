@@ -0,0 +1,137 @@
+"""
+Serialization benchmark: JSON encode time and bytes on the wire per resource
+
+Seeds N rows of every resource (patients with a few hundred characters of
+medical history), fetches a max-size page (limit=1000) of each list
+endpoint and reports:
+
+- encode time of that page with json.dumps (FastAPI's JSONResponse) and
+  orjson (ORJSONResponse, the app default),
+- body size without compression and as sent by GZipMiddleware, plus the
+  cost of gzip at a few levels,
+- median in-process request time with and without Accept-Encoding: gzip.
+
+    python -m benchmarks.serialization --rows 1000 --db ./bench_data/bench_serialization.db
+"""
+
+import argparse
+import gzip
+import json
+import os
+import random
+import statistics
+import time
+from datetime import date, datetime, timedelta
+
+HISTORY = (
+    "Артериялық гипертензия II дәреже, 2015 жылдан бақылауда. Жыл сайын кардиолог кеңесі. "
+    "Аппендэктомия (2009). Қант диабеті жоқ. Отбасылық анамнез: әкесінде миокард инфарктісі. "
+    "Соңғы ЭКГ: синус ритмі, ЖСЖ 72/мин. Қабылдайтын дәрілер: лизиноприл 10 мг, аторвастатин 20 мг. "
+)
+
+
+def seed(engine, rows: int):
+    from app.models.appointment import Appointment
+    from app.models.doctor import Doctor
+    from app.models.patient import Patient
+    from app.models.service import Service
+
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(Doctor.__table__.insert(), [{
+            "name": f"Дәрігер {i}", "specialization": rng.choice(["Кардиолог", "Невролог", "Терапевт"]),
+            "email": f"doctor{i}@example.com", "phone": "+7 (700) 000-0000", "license_number": f"LIC-{i:06d}",
+            "bio": "Жоғары санатты дәрігер, 15 жыл тәжірибе.", "is_active": True, "updated_at": now,
+        } for i in range(rows)])
+        conn.execute(Patient.__table__.insert(), [{
+            "first_name": "Айгерім", "last_name": f"Досова{i}", "email": f"patient{i}@example.com",
+            "phone": "+7 (700) 000-0000", "date_of_birth": date(1960, 1, 1) + timedelta(days=rng.randrange(20000)),
+            "address": "Алматы қ., Абай даңғылы 10", "medical_history": HISTORY * rng.randint(1, 3),
+            "allergies": "Пенициллин", "is_active": True, "updated_at": now,
+        } for i in range(rows)])
+        conn.execute(Service.__table__.insert(), [{
+            "name": f"Кеңес {i}", "description": "Маманның бастапқы кеңесі мен тексеруі.",
+            "price": 5000.0 + i, "duration_minutes": 30, "is_available": True, "updated_at": now,
+        } for i in range(rows)])
+        # One doctor per appointment hour: never overlaps
+        conn.execute(Appointment.__table__.insert(), [{
+            "patient_id": rng.randint(1, rows), "doctor_id": i % rows + 1,
+            "appointment_date": now + timedelta(hours=i // rows + 1), "duration_minutes": 30,
+            "status": "scheduled", "notes": "Жоспарлы тексеру", "created_at": now, "updated_at": now,
+        } for i in range(rows)])
+
+
+def median_ms(func, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return round(statistics.median(samples) * 1000, 2)
+
+
+def main(args):
+    os.makedirs(os.path.dirname(os.path.abspath(args.db)), exist_ok=True)
+    for path in (args.db, f"{args.db}-wal", f"{args.db}-shm"):
+        if os.path.exists(path):
+            os.remove(path)
+    # app.database reads DATABASE_URL on import
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(args.db)}"
+
+    from fastapi.responses import JSONResponse, ORJSONResponse
+    from fastapi.testclient import TestClient
+
+    from app.config import response_settings
+    from app.database import engine
+    from app.main import app
+    from app.migrations import init_db
+
+    init_db(engine)
+    seed(engine, args.rows)
+    client = TestClient(app)
+    plain = {"Accept-Encoding": "identity"}
+    compressed = {"Accept-Encoding": "gzip"}
+
+    results = []
+    for path in ("/api/patients/", "/api/doctors/", "/api/services/", "/api/appointments/",
+                 "/api/appointments/?expand=patient,doctor"):
+        url = f"{path}{'&' if '?' in path else '?'}limit=1000"
+        response = client.get(url, headers=plain)
+        body = response.content
+        content = json.loads(body)
+        gzipped = client.get(url, headers=compressed)
+
+        results.append({
+            "endpoint": url,
+            "items": len(content),
+            "encode_ms": {
+                "json": median_ms(lambda: JSONResponse(content), args.repeat),
+                "orjson": median_ms(lambda: ORJSONResponse(content), args.repeat),
+            },
+            "bytes": {
+                "identity": len(body),
+                "gzip (as sent)": int(gzipped.headers.get("content-length", len(gzipped.content))),
+                "content_encoding": gzipped.headers.get("content-encoding"),
+            },
+            "gzip_ms_by_level": {
+                level: median_ms(lambda level=level: gzip.compress(body, level), args.repeat)
+                for level in (1, response_settings.gzip_level, 9)
+            },
+            "gzip_bytes_by_level": {level: len(gzip.compress(body, level)) for level in (1, response_settings.gzip_level, 9)},
+            "request_ms": {
+                "identity": median_ms(lambda: client.get(url, headers=plain), args.repeat),
+                "gzip": median_ms(lambda: client.get(url, headers=compressed), args.repeat),
+            },
+        })
+
+    print(json.dumps({"rows": args.rows, "gzip_level": response_settings.gzip_level, "results": results},
+                     indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000, help="Rows of each resource (pages are capped at 1000)")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--db", default="./bench_data/bench_serialization.db")
+    main(parser.parse_args())
@@ -0,0 +1,119 @@
+"""
+Startup benchmark: cold import and first-request latency, with a budget
+
+Each run is a fresh interpreter (nothing cached in sys.modules) that
+imports app.main, runs the lifespan startup and sends one request through
+the ASGI app; eager and lazy (STARTUP_LAZY_ROUTERS=true) router modes are
+measured in turns. The database is created and migrated once beforehand,
+as `python -m app.migrations` would in a deploy. Reports the median of
+`--runs` per mode:
+
+- import_ms: `import app.main`,
+- startup_ms: the lifespan startup (logging; no migrations),
+- first_request_ms: the first request, lazy router import included,
+- process_ms: interpreter start to first response, as seen from outside.
+
+Only reports by default. Given --budget-import-ms and/or
+--budget-first-request-ms, exits with status 1 when the eager (default)
+mode is over them, so it can gate a CI job; pick the budgets from a
+baseline run on the CI machine, since timings differ between hosts.
+
+    python -m benchmarks.startup --runs 7 --path "/api/appointments/?limit=10"
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def child(path: str):
+    """One cold start, run in a fresh interpreter; prints its timings as JSON"""
+    import asyncio
+
+    import httpx
+
+    started = time.perf_counter()
+    from app.main import app
+    imported = time.perf_counter()
+
+    async def start_and_request():
+        async with app.router.lifespan_context(app):
+            ready = time.perf_counter()
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://startup") as client:
+                response = await client.get(path)
+            return ready, time.perf_counter(), response.status_code
+
+    ready, answered, status = asyncio.run(start_and_request())
+    print(json.dumps({
+        "import_ms": (imported - started) * 1000,
+        "startup_ms": (ready - imported) * 1000,
+        "first_request_ms": (answered - ready) * 1000,
+        "status": status,
+    }))
+
+
+def cold_start(path: str, env: dict) -> dict:
+    started = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.startup", "--child", "--path", path],
+        env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    timings = json.loads(output.strip().splitlines()[-1])
+    timings["process_ms"] = (time.perf_counter() - started) * 1000
+    return timings
+
+
+def main(args) -> int:
+    db = os.path.join(tempfile.mkdtemp(), "startup.db")
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{db}", "LOG_FILE": os.devnull, "STARTUP_MIGRATE": "false"}
+    env.pop("ASYNC_DATABASE_URL", None)
+    subprocess.run([sys.executable, "-m", "app.migrations"], env=env, capture_output=True, check=True)
+
+    modes = {"eager": {**env, "STARTUP_LAZY_ROUTERS": "false"}, "lazy": {**env, "STARTUP_LAZY_ROUTERS": "true"}}
+    samples = {mode: [] for mode in modes}
+    # Modes take turns so drift (page cache, CPU frequency) hits both alike
+    for _ in range(args.runs):
+        for mode, mode_env in modes.items():
+            samples[mode].append(cold_start(args.path, mode_env))
+
+    results = {}
+    for mode, runs in samples.items():
+        results[mode] = {
+            key: round(statistics.median(run[key] for run in runs), 1)
+            for key in ("import_ms", "startup_ms", "first_request_ms", "process_ms")
+        }
+        results[mode]["status"] = runs[-1]["status"]
+
+    eager = results["eager"]
+    over = [
+        f"{key} {eager[key]} > {budget}"
+        for key, budget in (("import_ms", args.budget_import_ms), ("first_request_ms", args.budget_first_request_ms))
+        if budget is not None and eager[key] > budget
+    ]
+    print(json.dumps({
+        "runs": args.runs,
+        "path": args.path,
+        "budget": {"import_ms": args.budget_import_ms, "first_request_ms": args.budget_first_request_ms},
+        "results": results,
+        "over_budget": over,
+    }, indent=2))
+    return 1 if over else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--path", default="/api/appointments/?limit=10", help="The first request")
+    parser.add_argument("--budget-import-ms", type=float, default=None, help="Fail above this median eager import time")
+    parser.add_argument("--budget-first-request-ms", type=float, default=None, help="Fail above this median eager first request time")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.path)
+    else:
+        sys.exit(main(args))
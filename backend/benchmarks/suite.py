@@ -0,0 +1,637 @@
+"""
+Benchmark suite: every /api endpoint against a synthetic dataset
+
+Builds (once, then reuses) a SQLite database of the requested size, copies
+it for each run so every run starts from the same data, and drives every
+endpoint of app/routers/ with two drivers:
+
+- inprocess: one request at a time through the ASGI app (httpx in-process
+  transport); handler and database cost without any network
+- load: CONCURRENCY connections against a uvicorn server started on a copy
+  of the same database
+
+Per endpoint it reports p50/p95/p99/mean latency and throughput as JSON.
+
+    python -m benchmarks.suite run --size 100k --out before.json
+    python -m benchmarks.suite run --size 100k --out after.json
+    python -m benchmarks.suite compare before.json after.json --threshold 10
+
+`compare` prints the differences and exits with status 1 when an endpoint
+got slower (p50 or p95) or lost throughput by more than the threshold.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+from benchmarks.concurrency import percentile
+
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+SPECIALIZATIONS = ["Кардиолог", "Невролог", "Терапевт", "Ортопед", "Педиатр", "Окулист"]
+FIRST_NAMES = ["Нұрлан", "Айнара", "Барлас", "Гүлнар", "Ерсултан", "Айгерім", "Дамир", "Асель"]
+LAST_NAMES = ["Сәрсембаев", "Досова", "Кәрім", "Әлеуова", "Қоңғырбаев", "Ахметов", "Смагулова"]
+SERVICES = 200
+# Appointments per doctor per working day in the generated schedule
+SLOTS_PER_DAY = 8
+
+
+# ---------------------------------------------------------------- dataset
+
+@dataclass
+class Dataset:
+    patients: int
+    appointments: int
+    doctors: int
+    services: int
+    seed: int
+
+    @classmethod
+    def of_size(cls, patients: int, appointments: int, seed: int) -> "Dataset":
+        return cls(patients, appointments, max(10, patients // 100), SERVICES, seed)
+
+
+def build_dataset(path: str, dataset: Dataset, chunk: int = 20000):
+    """Write the dataset into a fresh SQLite file; indexes, triggers and guards come from the migrations after the load"""
+    from sqlalchemy import create_engine, event
+
+    from app.database import Base, apply_sqlite_pragmas
+    from app.migrations import upgrade
+    from app.models.appointment import Appointment
+    from app.models.doctor import Doctor
+    from app.models.patient import Patient
+    from app.models.service import Service
+
+    for stale in (path, f"{path}-wal", f"{path}-shm"):
+        if os.path.exists(stale):
+            os.remove(stale)
+    engine = create_engine(f"sqlite:///{path}")
+    event.listen(engine, "connect", apply_sqlite_pragmas)
+    Base.metadata.create_all(engine)
+
+    rng = random.Random(dataset.seed)
+    now = datetime.utcnow().replace(microsecond=0)
+    first_day = datetime.combine(date.today() - timedelta(days=90), datetime.min.time()) + timedelta(hours=9)
+
+    def insert(table, count, row):
+        with engine.begin() as conn:
+            for offset in range(0, count, chunk):
+                conn.execute(table.insert(), [row(i) for i in range(offset, min(offset + chunk, count))])
+
+    insert(Doctor.__table__, dataset.doctors, lambda i: {
+        "name": f"Дәрігер {rng.choice(LAST_NAMES)} {i}", "specialization": SPECIALIZATIONS[i % len(SPECIALIZATIONS)],
+        "email": f"doctor{i}@bench.example.com", "phone": "+7 (700) 000-0000", "license_number": f"LIC-{i:07d}",
+        "bio": "Жоғары санатты дәрігер.", "is_active": True, "updated_at": now,
+    })
+    insert(Patient.__table__, dataset.patients, lambda i: {
+        "first_name": rng.choice(FIRST_NAMES), "last_name": rng.choice(LAST_NAMES),
+        "email": f"patient{i}@bench.example.com", "phone": "+7 (700) 000-0000",
+        "date_of_birth": date(1950, 1, 1) + timedelta(days=rng.randrange(25000)),
+        "address": "Алматы қ.", "medical_history": "Созылмалы ауру жоқ." if i % 3 else None,
+        "is_active": True, "updated_at": now,
+    })
+    insert(Service.__table__, dataset.services, lambda i: {
+        "name": f"Қызмет {i}", "description": "Маман кеңесі.", "price": 3000.0 + 50 * i,
+        "duration_minutes": 30, "is_available": i % 10 != 0, "updated_at": now,
+    })
+
+    def appointment(i):
+        # Doctor i % doctors takes its k-th slot: hourly, SLOTS_PER_DAY a day, so bookings never overlap
+        k = i // dataset.doctors
+        start = first_day + timedelta(days=k // SLOTS_PER_DAY, hours=k % SLOTS_PER_DAY)
+        past = start < now
+        return {
+            "patient_id": rng.randint(1, dataset.patients), "doctor_id": i % dataset.doctors + 1,
+            "appointment_date": start, "duration_minutes": 30,
+            "status": rng.choice(["completed", "completed", "cancelled"]) if past else "scheduled",
+            "notes": None, "created_at": now, "updated_at": now,
+        }
+    insert(Appointment.__table__, dataset.appointments, appointment)
+
+    upgrade(engine)
+    engine.dispose()
+
+
+def prepare_database(directory: str, dataset: Dataset) -> str:
+    """Path of the template database for `dataset`, built unless an identical one exists"""
+    os.makedirs(directory, exist_ok=True)
+    name = f"bench_{dataset.patients}p_{dataset.appointments}a_{dataset.seed}"
+    path = os.path.join(directory, f"{name}.db")
+    meta_path = f"{path}.json"
+    meta = dataset.__dict__
+    if os.path.exists(path) and os.path.exists(meta_path):
+        with open(meta_path) as f:
+            if json.load(f) == meta:
+                return path
+    started = time.perf_counter()
+    print(f"Building {path} ...", file=sys.stderr)
+    build_dataset(path, dataset)
+    with open(meta_path, "w") as f:
+        json.dump(meta, f)
+    print(f"Built in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    return path
+
+
+def working_copy(template: str, name: str) -> str:
+    path = os.path.join(os.path.dirname(template), name)
+    for stale in (path, f"{path}-wal", f"{path}-shm"):
+        if os.path.exists(stale):
+            os.remove(stale)
+    shutil.copyfile(template, path)
+    return path
+
+
+# ---------------------------------------------------------------- scenarios
+
+class Context:
+    """What scenarios know about the dataset, plus unique values for writes"""
+
+    def __init__(self, dataset: Dataset, seed: int):
+        self.dataset = dataset
+        self.rng = random.Random(seed)
+        self.run = uuid.uuid4().hex[:8]
+        self.counter = 0
+        # Far enough ahead that created bookings never meet the generated schedule
+        self.future = datetime.combine(date.today() + timedelta(days=3650), datetime.min.time())
+
+    def unique(self) -> int:
+        self.counter += 1
+        return self.counter
+
+    def patient_id(self) -> int:
+        return self.rng.randint(1, self.dataset.patients)
+
+    def doctor_id(self) -> int:
+        return self.rng.randint(1, self.dataset.doctors)
+
+    def appointment_id(self) -> int:
+        return self.rng.randint(1, self.dataset.appointments)
+
+    def service_id(self) -> int:
+        return self.rng.randint(1, self.dataset.services)
+
+    def patient(self) -> dict:
+        n = self.unique()
+        return {
+            "first_name": "Bench", "last_name": f"Patient{n}", "email": f"p-{self.run}-{n}@bench.example.com",
+            "phone": "+7 (700) 000-0000", "date_of_birth": "1990-01-01", "address": "Алматы қ.",
+        }
+
+    def doctor(self) -> dict:
+        n = self.unique()
+        return {
+            "name": f"Bench Doctor {n}", "specialization": self.rng.choice(SPECIALIZATIONS),
+            "email": f"d-{self.run}-{n}@bench.example.com", "phone": "+7 (700) 000-0000",
+            "license_number": f"B-{self.run}-{n}",
+        }
+
+    def appointment(self) -> dict:
+        # One hour per created booking: unique across doctors, so never a conflict
+        return {
+            "patient_id": self.patient_id(), "doctor_id": self.doctor_id(),
+            "appointment_date": (self.future + timedelta(hours=self.unique())).isoformat(),
+            "duration_minutes": 30,
+        }
+
+    def service(self) -> dict:
+        return {"name": f"Bench service {self.unique()}", "description": "—", "price": 5000.0, "duration_minutes": 30}
+
+    def csv(self, make: Callable[[], dict], rows: int) -> bytes:
+        items = [make() for _ in range(rows)]
+        lines = [",".join(items[0])] + [",".join(str(v) for v in item.values()) for item in items]
+        return ("\n".join(lines) + "\n").encode()
+
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    route: str
+    call: Callable[[httpx.AsyncClient, Context, Any], Awaitable[httpx.Response]]
+    # Untimed setup returning the fixture one call consumes (e.g. the row a DELETE removes)
+    prepare: Optional[Callable[[httpx.AsyncClient, Context], Awaitable[Any]]] = None
+
+
+def _created(path: str, payload: Callable[[Context], dict]):
+    async def prepare(client, ctx):
+        response = await client.post(path, json=payload(ctx))
+        response.raise_for_status()
+        return response.json()["id"]
+    return prepare
+
+
+def _week(ctx: Context) -> dict:
+    start = datetime.combine(date.today() + timedelta(days=1), datetime.min.time())
+    return {"from": start.isoformat(), "to": (start + timedelta(days=7)).isoformat()}
+
+
+SCENARIOS: List[Scenario] = [
+    # patients
+    Scenario("patients.list", "GET", "/api/patients/", lambda c, x, _: c.get("/api/patients/", params={"limit": 100})),
+    Scenario("patients.list_offset_deep", "GET", "/api/patients/",
+             lambda c, x, _: c.get("/api/patients/", params={"limit": 100, "skip": x.dataset.patients // 2})),
+    Scenario("patients.list_cursor", "GET", "/api/patients/",
+             lambda c, x, _: c.get("/api/patients/", params={"limit": 100, "cursor": ""})),
+    Scenario("patients.search", "GET", "/api/patients/",
+             lambda c, x, _: c.get("/api/patients/", params={"search": x.rng.choice(LAST_NAMES), "limit": 50})),
+    Scenario("patients.get", "GET", "/api/patients/{patient_id}", lambda c, x, _: c.get(f"/api/patients/{x.patient_id()}")),
+    Scenario("patients.export", "GET", "/api/patients/export",
+             lambda c, x, _: c.get("/api/patients/export", params={"search": "patient1@bench.example.com"})),
+    Scenario("patients.create", "POST", "/api/patients/", lambda c, x, _: c.post("/api/patients/", json=x.patient())),
+    Scenario("patients.update", "PUT", "/api/patients/{patient_id}",
+             lambda c, x, _: c.put(f"/api/patients/{x.patient_id()}", json={"address": f"Астана {x.unique()}"})),
+    Scenario("patients.delete", "DELETE", "/api/patients/{patient_id}",
+             lambda c, x, pid: c.delete(f"/api/patients/{pid}"), _created("/api/patients/", Context.patient)),
+    Scenario("patients.bulk_create", "POST", "/api/patients/bulk",
+             lambda c, x, _: c.post("/api/patients/bulk", json=[x.patient() for _ in range(20)])),
+    Scenario("patients.bulk_update", "PATCH", "/api/patients/bulk",
+             lambda c, x, _: c.patch("/api/patients/bulk", json=[{"id": x.patient_id(), "allergies": "—"} for _ in range(20)])),
+    Scenario("patients.import", "POST", "/api/patients/import",
+             lambda c, x, _: c.post("/api/patients/import", files={"file": ("p.csv", x.csv(x.patient, 50), "text/csv")})),
+    # doctors
+    Scenario("doctors.list", "GET", "/api/doctors/", lambda c, x, _: c.get("/api/doctors/", params={"limit": 100})),
+    Scenario("doctors.by_specialization", "GET", "/api/doctors/",
+             lambda c, x, _: c.get("/api/doctors/", params={"specialization": x.rng.choice(SPECIALIZATIONS), "limit": 100})),
+    Scenario("doctors.get", "GET", "/api/doctors/{doctor_id}", lambda c, x, _: c.get(f"/api/doctors/{x.doctor_id()}")),
+    Scenario("doctors.availability", "GET", "/api/doctors/{doctor_id}/availability",
+             lambda c, x, _: c.get(f"/api/doctors/{x.doctor_id()}/availability", params=_week(x))),
+    Scenario("doctors.first_available", "GET", "/api/doctors/availability/first",
+             lambda c, x, _: c.get("/api/doctors/availability/first",
+                                   params={"specialization": x.rng.choice(SPECIALIZATIONS), **_week(x)})),
+    Scenario("doctors.specializations", "GET", "/api/doctors/specialization/list",
+             lambda c, x, _: c.get("/api/doctors/specialization/list")),
+    Scenario("doctors.create", "POST", "/api/doctors/", lambda c, x, _: c.post("/api/doctors/", json=x.doctor())),
+    Scenario("doctors.update", "PUT", "/api/doctors/{doctor_id}",
+             lambda c, x, _: c.put(f"/api/doctors/{x.doctor_id()}", json={"bio": f"Bio {x.unique()}"})),
+    Scenario("doctors.delete", "DELETE", "/api/doctors/{doctor_id}",
+             lambda c, x, did: c.delete(f"/api/doctors/{did}"), _created("/api/doctors/", Context.doctor)),
+    Scenario("doctors.bulk_create", "POST", "/api/doctors/bulk",
+             lambda c, x, _: c.post("/api/doctors/bulk", json=[x.doctor() for _ in range(20)])),
+    Scenario("doctors.bulk_update", "PATCH", "/api/doctors/bulk",
+             lambda c, x, _: c.patch("/api/doctors/bulk", json=[{"id": x.doctor_id(), "bio": "—"} for _ in range(20)])),
+    Scenario("doctors.import", "POST", "/api/doctors/import",
+             lambda c, x, _: c.post("/api/doctors/import", files={"file": ("d.csv", x.csv(x.doctor, 50), "text/csv")})),
+    # appointments
+    Scenario("appointments.list", "GET", "/api/appointments/",
+             lambda c, x, _: c.get("/api/appointments/", params={"limit": 100})),
+    Scenario("appointments.list_expanded", "GET", "/api/appointments/",
+             lambda c, x, _: c.get("/api/appointments/", params={"limit": 100, "expand": "patient,doctor"})),
+    Scenario("appointments.filter_status_range", "GET", "/api/appointments/",
+             lambda c, x, _: c.get("/api/appointments/", params={"status": "scheduled", "limit": 100, **{
+                 "date_from": _week(x)["from"], "date_to": _week(x)["to"]}})),
+    Scenario("appointments.get", "GET", "/api/appointments/{appointment_id}",
+             lambda c, x, _: c.get(f"/api/appointments/{x.appointment_id()}")),
+    Scenario("appointments.by_doctor", "GET", "/api/appointments/doctor/{doctor_id}",
+             lambda c, x, _: c.get(f"/api/appointments/doctor/{x.doctor_id()}")),
+    Scenario("appointments.by_patient", "GET", "/api/appointments/patient/{patient_id}",
+             lambda c, x, _: c.get(f"/api/appointments/patient/{x.patient_id()}")),
+    Scenario("appointments.export", "GET", "/api/appointments/export",
+             lambda c, x, _: c.get("/api/appointments/export", params={"doctor_id": x.doctor_id(), "format": "csv"})),
+    Scenario("appointments.create", "POST", "/api/appointments/",
+             lambda c, x, _: c.post("/api/appointments/", json=x.appointment())),
+    Scenario("appointments.update", "PUT", "/api/appointments/{appointment_id}",
+             lambda c, x, _: c.put(f"/api/appointments/{x.appointment_id()}", json={"notes": f"Bench {x.unique()}"})),
+    Scenario("appointments.delete", "DELETE", "/api/appointments/{appointment_id}",
+             lambda c, x, aid: c.delete(f"/api/appointments/{aid}"), _created("/api/appointments/", Context.appointment)),
+    Scenario("appointments.bulk_create", "POST", "/api/appointments/bulk",
+             lambda c, x, _: c.post("/api/appointments/bulk", json=[x.appointment() for _ in range(20)])),
+    Scenario("appointments.bulk_update", "PATCH", "/api/appointments/bulk",
+             lambda c, x, _: c.patch("/api/appointments/bulk",
+                                     json=[{"id": x.appointment_id(), "notes": "—"} for _ in range(20)])),
+    # services
+    Scenario("services.list", "GET", "/api/services/", lambda c, x, _: c.get("/api/services/", params={"limit": 100})),
+    Scenario("services.get", "GET", "/api/services/{service_id}", lambda c, x, _: c.get(f"/api/services/{x.service_id()}")),
+    Scenario("services.available", "GET", "/api/services/available/all", lambda c, x, _: c.get("/api/services/available/all")),
+    Scenario("services.create", "POST", "/api/services/", lambda c, x, _: c.post("/api/services/", json=x.service())),
+    Scenario("services.update", "PUT", "/api/services/{service_id}",
+             lambda c, x, _: c.put(f"/api/services/{x.service_id()}", json={"price": 5000.0 + x.unique()})),
+    Scenario("services.delete", "DELETE", "/api/services/{service_id}",
+             lambda c, x, sid: c.delete(f"/api/services/{sid}"), _created("/api/services/", Context.service)),
+    Scenario("services.bulk_create", "POST", "/api/services/bulk",
+             lambda c, x, _: c.post("/api/services/bulk", json=[x.service() for _ in range(20)])),
+    Scenario("services.bulk_update", "PATCH", "/api/services/bulk",
+             lambda c, x, _: c.patch("/api/services/bulk", json=[{"id": x.service_id(), "price": 4000.0} for _ in range(20)])),
+
+    Scenario("stats.summary", "GET", "/api/stats/", lambda c, x, _: c.get("/api/stats/")),
+    Scenario("stats.daily", "GET", "/api/stats/daily",
+             lambda c, x, _: c.get("/api/stats/daily", params={
+                 "from": (date.today() - timedelta(days=30)).isoformat(), "to": date.today().isoformat()})),
+]
+
+
+def uncovered_routes(app) -> List[str]:
+    """Router endpoints no scenario exercises (the suite is meant to cover all of them)"""
+    covered = {(s.method, s.route) for s in SCENARIOS}
+    missing = []
+    for route in app.routes:
+        if not getattr(route, "path", "").startswith("/api/") or route.path.startswith(("/api/health", "/api/debug")):
+            continue
+        for method in sorted(getattr(route, "methods", ()) or ()):
+            if method != "HEAD" and (method, route.path) not in covered:
+                missing.append(f"{method} {route.path}")
+    return missing
+
+
+# ---------------------------------------------------------------- drivers
+
+@dataclass
+class Samples:
+    latencies: List[float] = field(default_factory=list)
+    errors: int = 0
+    statuses: Dict[str, int] = field(default_factory=dict)
+    elapsed: float = 0.0
+
+    def record(self, seconds: float, response: Optional[httpx.Response]):
+        self.latencies.append(seconds)
+        status = str(response.status_code) if response is not None else "error"
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if response is None or response.status_code >= 400:
+            self.errors += 1
+
+    def summary(self) -> dict:
+        values = self.latencies
+        if not values:
+            return {"count": 0, "errors": self.errors, "statuses": self.statuses}
+        return {
+            "count": len(values),
+            "errors": self.errors,
+            "statuses": self.statuses,
+            "p50_ms": round(statistics.median(values) * 1000, 3),
+            "p95_ms": round(percentile(values, 95) * 1000, 3),
+            "p99_ms": round(percentile(values, 99) * 1000, 3),
+            "mean_ms": round(statistics.fmean(values) * 1000, 3),
+            "rps": round(len(values) / self.elapsed, 1) if self.elapsed else None,
+        }
+
+
+async def _timed(scenario: Scenario, client, ctx, fixture, samples: Samples):
+    started = time.perf_counter()
+    try:
+        response = await scenario.call(client, ctx, fixture)
+        await response.aread()
+    except httpx.HTTPError:
+        response = None
+    samples.record(time.perf_counter() - started, response)
+
+
+async def run_inprocess(scenarios: List[Scenario], ctx: Context, requests: int, warmup: int) -> dict:
+    """Sequential requests through the ASGI app in this process"""
+    from app.main import app
+
+    results = {}
+    async with httpx.AsyncClient(app=app, base_url="http://bench", timeout=300) as client:
+        for scenario in scenarios:
+            fixtures = [await scenario.prepare(client, ctx) for _ in range(warmup + requests)] if scenario.prepare else None
+            for i in range(warmup):
+                await _timed(scenario, client, ctx, fixtures[i] if fixtures else None, Samples())
+            samples = Samples()
+            started = time.perf_counter()
+            for i in range(requests):
+                await _timed(scenario, client, ctx, fixtures[warmup + i] if fixtures else None, samples)
+            samples.elapsed = time.perf_counter() - started
+            results[scenario.name] = samples.summary()
+            print(f"  inprocess {scenario.name}: {results[scenario.name].get('p50_ms')} ms p50", file=sys.stderr)
+    return results
+
+
+async def run_load(scenarios: List[Scenario], ctx: Context, url: str, concurrency: int, seconds: float,
+                   fixture_pool: int) -> dict:
+    """CONCURRENCY connections hammering one endpoint at a time for SECONDS each"""
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    results = {}
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=300) as client:
+        for scenario in scenarios:
+            fixtures = [await scenario.prepare(client, ctx) for _ in range(fixture_pool)] if scenario.prepare else None
+            samples = Samples()
+            deadline = time.perf_counter() + seconds
+
+            async def worker():
+                while time.perf_counter() < deadline:
+                    if fixtures is not None and not fixtures:
+                        return
+                    await _timed(scenario, client, ctx, fixtures.pop() if fixtures is not None else None, samples)
+
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+            samples.elapsed = time.perf_counter() - started
+            results[scenario.name] = samples.summary()
+            print(f"  load {scenario.name}: {results[scenario.name].get('rps')} req/s", file=sys.stderr)
+    return results
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(database: str, port: int, workers: int, log_path: str) -> subprocess.Popen:
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{os.path.abspath(database)}"}
+    env.pop("ASYNC_DATABASE_URL", None)
+    log = open(log_path, "w")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.suite", "serve", "--port", str(port), "--workers", str(workers)],
+        env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Benchmark server exited with {process.returncode}, see {log_path}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/api/health", timeout=1).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"Benchmark server did not start, see {log_path}")
+
+
+def serve(args):
+    """Run the app under uvicorn with request logging down to warnings, as the load driver's target"""
+    import uvicorn
+
+    logging.disable(logging.INFO)
+    uvicorn.run("app.main:app", host="127.0.0.1", port=args.port, workers=args.workers, log_level="warning")
+
+
+# ---------------------------------------------------------------- run / compare
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    patients = args.patients or SIZES[args.size]
+    dataset = Dataset.of_size(patients, args.appointments or patients, args.seed)
+    # app.database reads DATABASE_URL on import (the dataset build imports it too); the file is copied in below
+    os.makedirs(args.data_dir, exist_ok=True)
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(os.path.join(args.data_dir, 'inprocess.db'))}"
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+    template = prepare_database(args.data_dir, dataset)
+    scenarios = [s for s in SCENARIOS if not args.only or any(term in s.name for term in args.only.split(","))]
+    drivers = args.drivers.split(",")
+
+    report = {
+        "meta": {
+            "started_at": datetime.utcnow().isoformat(timespec="seconds"),
+            "git": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "dataset": dataset.__dict__,
+            "inprocess": {"requests": args.requests, "warmup": args.warmup},
+            "load": {"concurrency": args.concurrency, "seconds": args.seconds, "workers": args.workers},
+        },
+        "results": {},
+    }
+
+    if "inprocess" in drivers:
+        working_copy(template, "inprocess.db")
+        from app.main import app
+
+        logging.disable(logging.INFO)
+        missing = uncovered_routes(app)
+        if missing:
+            print(f"Warning: endpoints without a scenario: {', '.join(missing)}", file=sys.stderr)
+        report["meta"]["uncovered"] = missing
+        report["results"]["inprocess"] = asyncio.run(
+            run_inprocess(scenarios, Context(dataset, args.seed), args.requests, args.warmup)
+        )
+
+    if "load" in drivers:
+        port = _free_port()
+        log_path = os.path.join(args.data_dir, "server.log")
+        server = start_server(working_copy(template, "load.db"), port, args.workers, log_path)
+        try:
+            report["results"]["load"] = asyncio.run(run_load(
+                scenarios, Context(dataset, args.seed), f"http://127.0.0.1:{port}",
+                args.concurrency, args.seconds, args.fixture_pool,
+            ))
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    print(output)
+
+
+def compare_reports(before: dict, after: dict, threshold: float, min_ms: float) -> dict:
+    """Per driver/endpoint changes; a regression is a p50/p95 rise or a throughput drop past `threshold` percent"""
+    changes, regressions = [], []
+    for driver, endpoints in after["results"].items():
+        for name, new in endpoints.items():
+            old = before["results"].get(driver, {}).get(name)
+            if not old or not old.get("count") or not new.get("count"):
+                continue
+            entry = {"driver": driver, "endpoint": name}
+            flagged = []
+            for metric in ("p50_ms", "p95_ms", "p99_ms"):
+                delta = new[metric] - old[metric]
+                pct = delta / old[metric] * 100 if old[metric] else 0.0
+                entry[metric] = {"before": old[metric], "after": new[metric], "change_pct": round(pct, 1)}
+                if metric != "p99_ms" and pct > threshold and delta > min_ms:
+                    flagged.append(metric)
+            if old.get("rps") and new.get("rps"):
+                pct = (new["rps"] - old["rps"]) / old["rps"] * 100
+                entry["rps"] = {"before": old["rps"], "after": new["rps"], "change_pct": round(pct, 1)}
+                if -pct > threshold:
+                    flagged.append("rps")
+            if new["errors"] > old["errors"]:
+                flagged.append("errors")
+            entry["regressed"] = flagged
+            changes.append(entry)
+            if flagged:
+                regressions.append(f"{driver} {name}: {', '.join(flagged)}")
+    return {
+        "before": before["meta"].get("git"),
+        "after": after["meta"].get("git"),
+        "threshold_pct": threshold,
+        "regressions": regressions,
+        "changes": changes,
+    }
+
+
+def compare(args):
+    with open(args.before, encoding="utf-8") as f:
+        before = json.load(f)
+    with open(args.after, encoding="utf-8") as f:
+        after = json.load(f)
+    if before["meta"].get("dataset") != after["meta"].get("dataset"):
+        print("Warning: the two runs used different datasets", file=sys.stderr)
+    result = compare_reports(before, after, args.threshold, args.min_ms)
+
+    for entry in result["changes"]:
+        marker = "REGRESSION" if entry["regressed"] else ""
+        rps = entry.get("rps", {})
+        print(f"{entry['driver']:<9} {entry['endpoint']:<34} "
+              f"p50 {entry['p50_ms']['before']:>9.2f} -> {entry['p50_ms']['after']:>9.2f} ({entry['p50_ms']['change_pct']:+6.1f}%)  "
+              f"p95 {entry['p95_ms']['change_pct']:+6.1f}%  rps {rps.get('change_pct', 0.0):+6.1f}%  {marker}",
+              file=sys.stderr)
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    sys.exit(1 if result["regressions"] else 0)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Build/reuse the dataset and benchmark every endpoint")
+    run_parser.add_argument("--size", choices=sorted(SIZES), default="10k",
+                            help="Patients and appointments in the dataset")
+    run_parser.add_argument("--patients", type=int, help="Override the number of patients")
+    run_parser.add_argument("--appointments", type=int, help="Override the number of appointments")
+    run_parser.add_argument("--seed", type=int, default=42)
+    run_parser.add_argument("--data-dir", default="./bench_data", help="Where datasets and working copies live")
+    run_parser.add_argument("--drivers", default="inprocess,load")
+    run_parser.add_argument("--only", help="Comma separated substrings of scenario names to run")
+    run_parser.add_argument("--requests", type=int, default=200, help="In-process requests per endpoint")
+    run_parser.add_argument("--warmup", type=int, default=10)
+    run_parser.add_argument("--concurrency", type=int, default=32, help="Load driver connections")
+    run_parser.add_argument("--seconds", type=float, default=10.0, help="Load driver time per endpoint")
+    run_parser.add_argument("--workers", type=int, default=1, help="uvicorn workers of the load target")
+    run_parser.add_argument("--fixture-pool", type=int, default=2000,
+                            help="Rows created up front for DELETE endpoints under load")
+    run_parser.add_argument("--out", help="Also write the JSON report here")
+    run_parser.set_defaults(func=run)
+
+    compare_parser = commands.add_parser("compare", help="Flag regressions between two reports")
+    compare_parser.add_argument("before")
+    compare_parser.add_argument("after")
+    compare_parser.add_argument("--threshold", type=float, default=10.0, help="Percent change that counts")
+    compare_parser.add_argument("--min-ms", type=float, default=0.5,
+                                help="Ignore latency changes smaller than this (noise on fast endpoints)")
+    compare_parser.set_defaults(func=compare)
+
+    serve_parser = commands.add_parser("serve", help=argparse.SUPPRESS)
+    serve_parser.add_argument("--port", type=int, required=True)
+    serve_parser.add_argument("--workers", type=int, default=1)
+    serve_parser.set_defaults(func=serve)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,8 @@ function Appointments() {
   const [appointments, setAppointments] = useState([])
   const [doctors, setDoctors] = useState([])
   const [patients, setPatients] = useState([])
+  // An empty list is a valid answer, so "fetched" is tracked separately
+  const [formOptionsLoaded, setFormOptionsLoaded] = useState(false)
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState(null)
   const [editingId, setEditingId] = useState(null)
@@ -28,19 +30,31 @@ function Appointments() {
     try {
       setLoading(true)
       setError(null)
-      const [appRes, docRes, patRes] = await Promise.all([
-        appointmentsAPI.getAll(),
+      // Patient and doctor names come embedded in each appointment
+      const appRes = await appointmentsAPI.getAll(0, 100, 'patient,doctor')
+      setAppointments(appRes.data)
+    } catch (error) {
+      console.error('Error fetching data:', error)
+      setError('Деректерді жүктеуде қате орын алды')
+    } finally {
+      setLoading(false)
+    }
+  }
+
+  // The full patient and doctor lists are only needed for the form selects
+  const fetchFormOptions = async () => {
+    if (formOptionsLoaded) return
+    try {
+      const [docRes, patRes] = await Promise.all([
         doctorsAPI.getAll(),
         patientsAPI.getAll()
       ])
-      setAppointments(appRes.data)
       setDoctors(docRes.data)
       setPatients(patRes.data)
+      setFormOptionsLoaded(true)
     } catch (error) {
-      console.error('Error fetching data:', error)
+      console.error('Error fetching form options:', error)
       setError('Деректерді жүктеуде қате орын алды')
-    } finally {
-      setLoading(false)
     }
   }
 
@@ -82,6 +96,7 @@ function Appointments() {
       notes: appointment.notes || ''
     })
     setShowForm(true)
+    fetchFormOptions()
   }
 
   const handleDelete = async (id) => {
@@ -136,6 +151,7 @@ function Appointments() {
         </select>
         <button className="btn-primary" onClick={() => {
           resetForm()
+          if (!showForm) fetchFormOptions()
           setShowForm(!showForm)
         }}>
           {showForm ? 'Бас тарту' : '➕ Тағайын реттеу'}
@@ -219,8 +235,7 @@ function Appointments() {
           <p className="no-data">Тағайындаулар табылмады</p>
         ) : (
           filteredAppointments.map(apt => {
-            const doctor = doctors.find(d => d.id === apt.doctor_id)
-            const patient = patients.find(p => p.id === apt.patient_id)
+            const { doctor, patient } = apt
             const statusText = apt.status === 'scheduled' ? 'Сәбепте' : apt.status === 'completed' ? 'Аяқталды' : 'Болдырылды'
             return (
               <div key={apt.id} className="appointment-card">
@@ -26,13 +26,13 @@ export const patientsAPI = {
 
 // Appointments
 export const appointmentsAPI = {
-  getAll: (skip = 0, limit = 100) => api.get('/appointments', { params: { skip, limit } }),
+  getAll: (skip = 0, limit = 100, expand) => api.get('/appointments', { params: { skip, limit, expand } }),
   getById: (id) => api.get(`/appointments/${id}`),
   create: (data) => api.post('/appointments', data),
   update: (id, data) => api.put(`/appointments/${id}`, data),
   delete: (id) => api.delete(`/appointments/${id}`),
-  getByDoctor: (doctorId) => api.get(`/appointments/doctor/${doctorId}`),
-  getByPatient: (patientId) => api.get(`/appointments/patient/${patientId}`),
+  getByDoctor: (doctorId, expand) => api.get(`/appointments/doctor/${doctorId}`, { params: { expand } }),
+  getByPatient: (patientId, expand) => api.get(`/appointments/patient/${patientId}`, { params: { expand } }),
 }
 
 // Services